@@ -1,5 +1,11 @@
 # backend/auth.py
+import asyncio
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 import jwt  # PyJWT
@@ -24,6 +30,39 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
+# PBKDF2 en su propio pool acotado: un aluvión de logins no agota el threadpool
+# de FastAPI (hashlib libera el GIL durante el cálculo).
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+AUTH_HASH_MAX_PENDING = int(os.getenv("AUTH_HASH_MAX_PENDING", "32"))
+
+_hash_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="auth-hash")
+_hash_pending = 0
+
+
+class AuthBusy(Exception):
+    """Hay AUTH_HASH_MAX_PENDING hashes en curso o esperando."""
+
+
+async def _run_hash(fn, *args):
+    global _hash_pending
+    if _hash_pending >= AUTH_HASH_MAX_PENDING:
+        raise AuthBusy()
+
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash(hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await _run_hash(verify_password, password, password_hash)
+
+
 def create_access_token(subject: str) -> str:
     now = datetime.utcnow()
     exp = now + timedelta(minutes=JWT_EXPIRES_MIN)
@@ -34,3 +73,64 @@ def create_access_token(subject: str) -> str:
     }
     # PyJWT devuelve un str en v2.x
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
+
+
+# Caché de tokens ya verificados: las páginas mandan ráfagas con el mismo bearer
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+AUTH_TOKEN_CACHE_TTL_S = float(os.getenv("AUTH_TOKEN_CACHE_TTL_S", "300"))
+
+
+class TokenCache:
+    """
+    LRU acotado token → (sub, exp) de tokens con firma ya verificada.
+    La clave es el sha256 del token (no se guarda el token en memoria).
+    Una entrada vale hasta min(exp, guardado + ttl): nunca se sirve pasado exp.
+    """
+
+    def __init__(self, max_size: int = AUTH_TOKEN_CACHE_SIZE, ttl_s: float = AUTH_TOKEN_CACHE_TTL_S):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[str, float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> str | None:
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                sub, exp, valid_until = entry
+                if now < exp and now < valid_until:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return sub
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, sub: str, exp: float) -> None:
+        if self.max_size <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (sub, float(exp), time.time() + self.ttl_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache()
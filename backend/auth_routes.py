@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from sqlalchemy import select
 from sqlalchemy.orm import Session
-import time
+import asyncio
 import logging
 
 import jwt  # PyJWT
@@ -10,9 +11,11 @@ from jwt import InvalidTokenError
 
 from db import engine
 from auth import (
-    hash_password,
-    verify_password,
+    AuthBusy,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
+    token_cache,
     JWT_SECRET,
     JWT_ALG,
 )
@@ -23,6 +26,10 @@ security_logger = logging.getLogger("security")
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# Pequeño delay defensivo contra brute force (sin ocupar hilos)
+LOGIN_FAILURE_DELAY_S = 0.1
+AUTH_RETRY_AFTER_S = 2
+
 
 class RegisterPayload(BaseModel):
     model_config = ConfigDict(
@@ -76,6 +83,10 @@ def get_current_user_email(authorization: str | None = Header(default=None)) ->
             detail="Invalid token format",
         )
 
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(
             token,
@@ -103,6 +114,11 @@ def get_current_user_email(authorization: str | None = Header(default=None)) ->
             detail="Invalid token",
         )
 
+    try:
+        token_cache.put(token, str(email), float(payload["exp"]))
+    except (TypeError, ValueError):
+        pass
+
     return str(email)
 
 
@@ -115,8 +131,42 @@ def me(email: str = Depends(get_current_user_email)):
     return {"email": email}
 
 
+def _get_user(email: str) -> User | None:
+    with Session(engine) as session:
+        return session.scalar(select(User).where(User.email == email))
+
+
+def _create_user(email: str, password_hash: str) -> User:
+    with Session(engine) as session:
+        existing = session.scalar(select(User).where(User.email == email))
+        if existing:
+            security_logger.warning(f"Registration attempt with existing email: {email[:3]}***")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Email already exists",
+            )
+
+        u = User(email=email, password_hash=password_hash)
+        session.add(u)
+        session.commit()
+        session.refresh(u)
+        return u
+
+
+async def _hash_or_busy(coro):
+    try:
+        return await coro
+    except AuthBusy:
+        security_logger.warning("Auth hashing pool saturated")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, retry later",
+            headers={"Retry-After": str(AUTH_RETRY_AFTER_S)},
+        )
+
+
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(payload: RegisterPayload):
+async def register(payload: RegisterPayload):
     # Validação adicional de email
     if not payload.email or len(payload.email) > 255:
         raise HTTPException(
@@ -130,52 +180,43 @@ def register(payload: RegisterPayload):
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Password too weak. Choose a stronger password.",
         )
-    
-    with Session(engine) as session:
-        existing = session.scalar(select(User).where(User.email == payload.email))
-        if existing:
-            security_logger.warning(f"Registration attempt with existing email: {payload.email[:3]}***")
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Email already exists",
-            )
 
-        u = User(
-            email=payload.email,
-            password_hash=hash_password(payload.password),
+    # Se comprueba antes de hashear para no gastar PBKDF2 en emails repetidos;
+    # _create_user lo vuelve a comprobar dentro de su sesión.
+    if await run_in_threadpool(_get_user, payload.email) is not None:
+        security_logger.warning(f"Registration attempt with existing email: {payload.email[:3]}***")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email already exists",
         )
-        session.add(u)
-        session.commit()
-        session.refresh(u)
 
-        return {"id": u.id, "email": u.email}
+    password_hash = await _hash_or_busy(hash_password_async(payload.password))
+    u = await run_in_threadpool(_create_user, payload.email, password_hash)
+
+    return {"id": u.id, "email": u.email}
 
 
 @router.post("/login")
-def login(payload: LoginPayload):
-    # Pequeño delay defensivo contra brute force
-    login_delay = 0.1
-    
-    with Session(engine) as session:
-        u = session.scalar(select(User).where(User.email == payload.email))
-        if u is None:
-            security_logger.warning(f"Login attempt with non-existent email: {payload.email[:3]}***")
-            # Delay para evitar timing attacks
-            time.sleep(login_delay)
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid email or password",
-            )
+async def login(payload: LoginPayload):
+    u = await run_in_threadpool(_get_user, payload.email)
+    if u is None:
+        security_logger.warning(f"Login attempt with non-existent email: {payload.email[:3]}***")
+        # Delay para evitar timing attacks
+        await asyncio.sleep(LOGIN_FAILURE_DELAY_S)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid email or password",
+        )
 
-        if not verify_password(payload.password, u.password_hash):
-            security_logger.warning(f"Failed login attempt for user: {u.email[:3]}***")
-            # Delay para desalentar brute force
-            time.sleep(login_delay)
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid email or password",
-            )
+    if not await _hash_or_busy(verify_password_async(payload.password, u.password_hash)):
+        security_logger.warning(f"Failed login attempt for user: {u.email[:3]}***")
+        # Delay para desalentar brute force
+        await asyncio.sleep(LOGIN_FAILURE_DELAY_S)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid email or password",
+        )
 
-        token = create_access_token(subject=u.email)
-        security_logger.info(f"Successful login for user: {u.email[:3]}***")
-        return {"access_token": token, "token_type": "bearer"}
+    token = create_access_token(subject=u.email)
+    security_logger.info(f"Successful login for user: {u.email[:3]}***")
+    return {"access_token": token, "token_type": "bearer"}
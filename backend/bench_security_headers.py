@@ -0,0 +1,90 @@
+# backend/bench_security_headers.py
+"""
+Benchmark de las cabeceras de seguridad: ASGI puro frente a @app.middleware("http").
+
+    python bench_security_headers.py            # 2000 peticiones por ronda, mejor de 3
+    python bench_security_headers.py -n 10000
+
+No forma parte de los tests: los tiempos dependen de la máquina.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from security_headers import SECURITY_HEADERS, SecurityHeadersMiddleware
+
+SCOPE = {
+    "type": "http",
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/",
+    "raw_path": b"/",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"testserver")],
+    "client": ("127.0.0.1", 1234),
+    "server": ("testserver", 80),
+}
+
+
+async def _endpoint(request):
+    return PlainTextResponse("ok")
+
+
+async def _add_headers(request, call_next):
+    response = await call_next(request)
+    for name, value in SECURITY_HEADERS.items():
+        response.headers[name] = value
+    return response
+
+
+async def _call(app) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(dict(SCOPE), receive, send)
+
+
+async def _bench(app, n: int) -> float:
+    for _ in range(50):
+        await _call(app)
+    started = time.perf_counter()
+    for _ in range(n):
+        await _call(app)
+    return (time.perf_counter() - started) / n
+
+
+async def _run(n: int, rounds: int) -> dict[str, float]:
+    routes = [Route("/", _endpoint)]
+    apps = {
+        "BaseHTTPMiddleware": Starlette(routes=routes, middleware=[Middleware(BaseHTTPMiddleware, dispatch=_add_headers)]),
+        "ASGI": Starlette(routes=routes, middleware=[Middleware(SecurityHeadersMiddleware)]),
+    }
+    # Mejor de varias rondas para cada uno
+    return {name: min([await _bench(app, n) for _ in range(rounds)]) for name, app in apps.items()}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de SecurityHeadersMiddleware")
+    parser.add_argument("-n", type=int, default=2000, help="peticiones por ronda")
+    parser.add_argument("--rounds", type=int, default=3, help="rondas por middleware (se queda la mejor)")
+    args = parser.parse_args(argv)
+
+    for name, per_request in asyncio.run(_run(args.n, args.rounds)).items():
+        print(f"{name}: {per_request * 1e6:.1f} µs/req")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
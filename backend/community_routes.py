@@ -1,12 +1,23 @@
 # backend/community_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from pydantic import BaseModel
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth_routes import get_current_user_email
-from db import engine
+from community_search import apply_search
+from db import async_engine
+from etags import cache_headers, etag_matches, not_modified, strong_etag
+from fast_json import FastJSONResponse
 from models import CommunityPost, Drone, DroneDump
+from pagination import (
+  before_updated,
+  clamp_limit,
+  cursor_int,
+  decode_cursor,
+  set_next_cursor,
+  split_page,
+)
 
 router = APIRouter(prefix="/community", tags=["community"])
 
@@ -49,6 +60,62 @@ def _dump_to_public_dict(x: DroneDump) -> dict:
   }
 
 
+async def _public_dumps_by_drone(session: AsyncSession, drone_ids: list[int], per_drone: int = 3) -> dict[int, list[DroneDump]]:
+  """
+  Dumps públicos más recientes (máx per_drone) de cada dron, en UNA sola query.
+  Usa ROW_NUMBER() particionado por drone_id (MySQL 8+ / SQLite 3.25+).
+  """
+  if not drone_ids:
+    return {}
+
+  rn = func.row_number().over(
+    partition_by=DroneDump.drone_id,
+    order_by=(DroneDump.created_at.desc(), DroneDump.id.desc()),
+  ).label("rn")
+
+  ranked = (
+    select(DroneDump.id.label("dump_id"), rn)
+    .where(DroneDump.drone_id.in_(drone_ids))
+    .where(DroneDump.is_public == True)  # noqa: E712
+    .subquery()
+  )
+
+  stmt = (
+    select(DroneDump)
+    .join(ranked, ranked.c.dump_id == DroneDump.id)
+    .where(ranked.c.rn <= per_drone)
+    .order_by(DroneDump.drone_id, ranked.c.rn)
+  )
+
+  grouped: dict[int, list[DroneDump]] = {}
+  for x in await session.scalars(stmt):
+    grouped.setdefault(x.drone_id, []).append(x)
+  return grouped
+
+
+def _dumps_version_columns() -> list:
+  """
+  Huella de los dumps públicos, como columnas extra de la query del feed
+  (subconsultas escalares: la BD las evalúa una vez): max(updated_at) cambia con
+  la visibilidad y el nº de públicos con los borrados.
+  """
+  return [
+    select(func.max(DroneDump.updated_at)).scalar_subquery(),
+    select(func.count(DroneDump.id)).where(DroneDump.is_public == True).scalar_subquery(),  # noqa: E712
+  ]
+
+
+def _post_to_public_dict(post: CommunityPost) -> dict:
+  return {
+    "id": post.id,
+    "title": post.title,
+    "public_note": post.public_note,
+    "is_public": bool(post.is_public),
+    "created_at": post.created_at.isoformat() if post.created_at else None,
+    "updated_at": post.updated_at.isoformat() if post.updated_at else None,
+  }
+
+
 class PostUpsert(BaseModel):
   drone_id: int
   title: str | None = None
@@ -60,89 +127,109 @@ class DumpVisibility(BaseModel):
   is_public: bool
 
 
-@router.get("/feed")
-def feed(q: str | None = None, limit: int = 24, offset: int = 0):
+@router.get("/feed", response_class=FastJSONResponse)
+async def feed(
+  request: Request,
+  q: str | None = None,
+  limit: int = 24,
+  offset: int = 0,
+  cursor: str | None = None,
+):
   """
   Feed público de comunidad.
   Devuelve publicaciones publicadas (community_posts.is_public=1) con:
   - drone (datos)
   - dumps públicos (máx 3) del dron
+  Con q: filtra y ordena por relevancia en la BD (ver community_search).
+  Paginación: cursor opaco (cabecera X-Next-Cursor); offset se mantiene por compatibilidad.
+  ETag a partir de la página y la huella de los dumps públicos (If-None-Match → 304).
   """
-  q_norm = (q or "").strip().lower()
-  limit = max(1, min(int(limit), 50))
+  q_norm = (q or "").strip()
+  limit = clamp_limit(limit, 50)
   offset = max(0, int(offset))
+  after = decode_cursor(cursor)
 
-  with Session(engine) as session:
+  async with AsyncSession(async_engine, expire_on_commit=False) as session:
     stmt = (
       select(CommunityPost, Drone)
       .join(Drone, Drone.id == CommunityPost.drone_id)
       .where(CommunityPost.is_public == True)  # noqa: E712
       .order_by(CommunityPost.updated_at.desc(), CommunityPost.id.desc())
-      .limit(limit)
-      .offset(offset)
     )
 
-    rows = session.execute(stmt).all()
-
-    items: list[dict] = []
-    for post, drone in rows:
-      dumps = session.scalars(
-        select(DroneDump)
-        .where(DroneDump.drone_id == drone.id)
-        .where(DroneDump.is_public == True)  # noqa: E712
-        .order_by(DroneDump.created_at.desc(), DroneDump.id.desc())
-        .limit(3)
-      ).all()
-
-      item = {
-        "post": {
-          "id": post.id,
-          "title": post.title,
-          "public_note": post.public_note,
-          "is_public": bool(post.is_public),
-          "created_at": post.created_at.isoformat() if post.created_at else None,
-          "updated_at": post.updated_at.isoformat() if post.updated_at else None,
-        },
+    # Búsqueda en BD (FULLTEXT / FTS5) antes de paginar
+    if q_norm:
+      stmt = apply_search(stmt, async_engine.dialect.name, q_norm)
+
+    # Sin búsqueda: keyset sobre (updated_at, id). Con búsqueda el orden es por
+    # relevancia, así que el cursor lleva el offset.
+    if after is not None:
+      if q_norm:
+        offset = cursor_int(after, "o")
+      else:
+        stmt = stmt.where(before_updated(CommunityPost.updated_at, CommunityPost.id, after))
+        offset = 0
+
+    stmt = stmt.add_columns(*_dumps_version_columns())
+    rows, has_more = split_page((await session.execute(stmt.limit(limit + 1).offset(offset))).all(), limit)
+
+    items: list[dict] = [
+      {
+        "post": _post_to_public_dict(post),
         "owner": {"handle": _mask_email(post.owner_email)},
         "drone": _drone_to_public_dict(drone),
-        "dumps": [_dump_to_public_dict(x) for x in dumps],
       }
-      items.append(item)
+      for post, drone, *_ in rows
+    ]
 
-    # filtro simple por texto (MVP)
-    if q_norm:
-      def _match(it: dict) -> bool:
-        drone = it.get("drone") or {}
-        post = it.get("post") or {}
-        owner = it.get("owner") or {}
-        hay = " ".join(
-          [
-            str(drone.get("id", "")),
-            str(drone.get("name", "") or ""),
-            str(drone.get("comment", "") or ""),
-            str(post.get("title", "") or ""),
-            str(post.get("public_note", "") or ""),
-            str(owner.get("handle", "") or ""),
-          ]
-        ).lower()
-        return q_norm in hay
-
-      items = [it for it in items if _match(it)]
-
-    return items
+    # ETag: parámetros + publicaciones/drones de la página + huella de dumps.
+    # Si coincide, 304 sin consultar dumps ni serializar.
+    dumps_version = list(rows[0][2:]) if rows else None
+    etag = strong_etag("feed", q_norm, limit, offset, cursor, has_more, items, dumps_version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+      return not_modified(etag, private=False)
+
+    dumps_by_drone = await _public_dumps_by_drone(session, [row[1].id for row in rows])
+    for item in items:
+      item["dumps"] = [_dump_to_public_dict(x) for x in dumps_by_drone.get(item["drone"]["id"], [])]
+
+  # Items ya pre-formados (sólo str/int/bool/None): se serializan sin jsonable_encoder
+  response = FastJSONResponse(items, headers=cache_headers(etag, private=False))
+  if has_more:
+    last_post = rows[-1][0]
+    set_next_cursor(
+      response,
+      {"o": offset + limit} if q_norm else {"u": last_post.updated_at.isoformat(), "id": last_post.id},
+    )
+  return response
 
 
 @router.get("/me")
-def my_posts(user_email: str = Depends(get_current_user_email)):
+async def my_posts(
+  response: Response,
+  limit: int = 100,
+  cursor: str | None = None,
+  user_email: str = Depends(get_current_user_email),
+):
   """
   Publicaciones del usuario autenticado (para gestionarlas desde Manage).
+  Paginado por cursor (cabecera X-Next-Cursor).
   """
-  with Session(engine) as session:
-    posts = session.scalars(
+  limit = clamp_limit(limit, 200)
+  after = decode_cursor(cursor)
+
+  async with AsyncSession(async_engine, expire_on_commit=False) as session:
+    stmt = (
       select(CommunityPost)
       .where(CommunityPost.owner_email == user_email)
       .order_by(CommunityPost.updated_at.desc(), CommunityPost.id.desc())
-    ).all()
+    )
+    if after is not None:
+      stmt = stmt.where(before_updated(CommunityPost.updated_at, CommunityPost.id, after))
+
+    posts, has_more = split_page((await session.scalars(stmt.limit(limit + 1))).all(), limit)
+    if has_more:
+      set_next_cursor(response, {"u": posts[-1].updated_at.isoformat(), "id": posts[-1].id})
 
     return [
       {
@@ -159,18 +246,18 @@ def my_posts(user_email: str = Depends(get_current_user_email)):
 
 
 @router.post("/posts", status_code=status.HTTP_201_CREATED)
-def upsert_post(payload: PostUpsert, user_email: str = Depends(get_current_user_email)):
+async def upsert_post(payload: PostUpsert, user_email: str = Depends(get_current_user_email)):
   """
   Crea o actualiza la publicación (1 por dron+owner).
   """
-  with Session(engine) as session:
-    drone = session.get(Drone, payload.drone_id)
+  async with AsyncSession(async_engine, expire_on_commit=False) as session:
+    drone = await session.get(Drone, payload.drone_id)
     if drone is None:
       raise HTTPException(status_code=404, detail="Drone not found")
     if drone.owner_email != user_email:
       raise HTTPException(status_code=403, detail="Not your drone")
 
-    existing = session.scalar(
+    existing = await session.scalar(
       select(CommunityPost).where(
         CommunityPost.drone_id == payload.drone_id,
         CommunityPost.owner_email == user_email,
@@ -189,19 +276,18 @@ def upsert_post(payload: PostUpsert, user_email: str = Depends(get_current_user_
         is_public=bool(payload.is_public),
       )
       session.add(post)
-      session.commit()
-      session.refresh(post)
+      await session.commit()
       return {"id": post.id}
 
     existing.title = title
     existing.public_note = note
     existing.is_public = bool(payload.is_public)
-    session.commit()
+    await session.commit()
     return {"id": existing.id}
 
 
 @router.patch("/dumps/{dump_id}")
-def set_dump_visibility(
+async def set_dump_visibility(
   dump_id: int,
   payload: DumpVisibility,
   user_email: str = Depends(get_current_user_email),
@@ -209,12 +295,12 @@ def set_dump_visibility(
   """
   Marca un dump como público/privado (solo dueño del dron).
   """
-  with Session(engine) as session:
-    dump = session.get(DroneDump, dump_id)
+  async with AsyncSession(async_engine, expire_on_commit=False) as session:
+    dump = await session.get(DroneDump, dump_id)
     if dump is None:
       raise HTTPException(status_code=404, detail="Dump not found")
 
-    drone = session.get(Drone, dump.drone_id)
+    drone = await session.get(Drone, dump.drone_id)
     if drone is None:
       raise HTTPException(status_code=404, detail="Drone not found")
 
@@ -222,5 +308,5 @@ def set_dump_visibility(
       raise HTTPException(status_code=403, detail="Not your dump")
 
     dump.is_public = bool(payload.is_public)
-    session.commit()
+    await session.commit()
     return {"id": dump.id, "is_public": bool(dump.is_public)}
@@ -0,0 +1,176 @@
+# backend/community_search.py
+"""
+Búsqueda de texto del feed de comunidad, resuelta en la BD.
+
+- MySQL: índices FULLTEXT en drones(name, comment) y community_posts(title, public_note),
+  consultados con MATCH ... AGAINST en modo booleano.
+- SQLite: tabla virtual FTS5 (community_post_fts, rowid = community_posts.id)
+  mantenida con triggers.
+- Otros motores: LIKE (sin ranking).
+
+Los índices se crean (si faltan) tras cada Base.metadata.create_all.
+"""
+import re
+
+from sqlalchemy import Float, Integer, and_, event, inspect, literal, or_, text
+from sqlalchemy.dialects.mysql import match as mysql_match
+
+from models import Base, CommunityPost, Drone
+
+FTS_TABLE = "community_post_fts"
+
+# Letras del email que enseña el alias público del autor (community_routes._mask_email)
+HANDLE_CHARS = 2
+
+MYSQL_FULLTEXT_INDEXES = (
+    ("drones", "ft_drones_name_comment", ("name", "comment")),
+    ("community_posts", "ft_community_posts_title_note", ("title", "public_note")),
+)
+
+_FTS_COLUMNS = "rowid, title, public_note, drone_name, drone_comment"
+
+_SQLITE_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+      title, public_note, drone_name, drone_comment,
+      tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS community_posts_fts_ai AFTER INSERT ON community_posts BEGIN
+      INSERT INTO {FTS_TABLE}({_FTS_COLUMNS})
+      SELECT NEW.id, NEW.title, NEW.public_note, d.name, d.comment FROM drones d WHERE d.id = NEW.drone_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS community_posts_fts_au AFTER UPDATE ON community_posts BEGIN
+      DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;
+      INSERT INTO {FTS_TABLE}({_FTS_COLUMNS})
+      SELECT NEW.id, NEW.title, NEW.public_note, d.name, d.comment FROM drones d WHERE d.id = NEW.drone_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS community_posts_fts_ad AFTER DELETE ON community_posts BEGIN
+      DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS drones_fts_au AFTER UPDATE OF name, comment ON drones BEGIN
+      DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM community_posts WHERE drone_id = NEW.id);
+      INSERT INTO {FTS_TABLE}({_FTS_COLUMNS})
+      SELECT p.id, p.title, p.public_note, NEW.name, NEW.comment FROM community_posts p WHERE p.drone_id = NEW.id;
+    END
+    """,
+)
+
+
+def _ensure_sqlite_fts(conn) -> None:
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+
+    for ddl in _SQLITE_DDL:
+        conn.execute(text(ddl))
+
+    if not exists:
+        # Índice nuevo sobre una BD que ya tenía publicaciones
+        conn.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE}({_FTS_COLUMNS}) "
+                "SELECT p.id, p.title, p.public_note, d.name, d.comment "
+                "FROM community_posts p JOIN drones d ON d.id = p.drone_id"
+            )
+        )
+
+
+def _ensure_mysql_fulltext(conn) -> None:
+    insp = inspect(conn)
+    for table, name, cols in MYSQL_FULLTEXT_INDEXES:
+        existing = {ix["name"] for ix in insp.get_indexes(table)}
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} ({', '.join(cols)})"))
+
+
+def ensure_search_indexes(conn) -> None:
+    """Crea los índices de texto completo si no existen (idempotente)."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        _ensure_sqlite_fts(conn)
+    elif dialect in ("mysql", "mariadb"):
+        _ensure_mysql_fulltext(conn)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    ensure_search_indexes(connection)
+
+
+def search_terms(q: str) -> list[str]:
+    """Palabras de la búsqueda (sin operadores: se descartan símbolos)."""
+    return re.findall(r"\w+", q or "", flags=re.UNICODE)[:16]
+
+
+def _handle_match(q: str):
+    """
+    Coincidencia con el alias público del autor ('pu…' = 2 primeras letras del email).
+    Prefijo sobre owner_email (indexado), limitado a esas 2 letras para no permitir
+    adivinar el email completo.
+    """
+    handle = q.strip().rstrip("…").lower()
+    if not (1 <= len(handle) <= HANDLE_CHARS) or not re.fullmatch(r"[\w.+-]+", handle):
+        return literal(False)
+    return CommunityPost.owner_email.startswith(handle, autoescape=True)
+
+
+def apply_search(stmt, dialect: str, q: str):
+    """
+    Añade a una select(CommunityPost, Drone) el filtro de búsqueda y la
+    ordenación por relevancia (antes que updated_at/id).
+    Todas las palabras deben aparecer (como prefijo) en dron o publicación;
+    también casan el id exacto del dron y el alias del autor (sin ranking).
+    """
+    terms = search_terms(q)
+    if not terms:
+        return stmt.where(literal(False))
+
+    id_match = Drone.id == int(q.strip()) if q.strip().isdigit() else literal(False)
+    exact_match = or_(id_match, _handle_match(q))
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{t}"*' for t in terms)
+        hits = (
+            text(f"SELECT rowid AS post_id, -bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match")
+            .bindparams(match=match)
+            .columns(post_id=Integer, score=Float)
+            .subquery("search_hits")
+        )
+        return (
+            stmt.outerjoin(hits, hits.c.post_id == CommunityPost.id)
+            .where(or_(hits.c.post_id.isnot(None), exact_match))
+            .order_by(None)
+            .order_by(hits.c.score.desc(), CommunityPost.updated_at.desc(), CommunityPost.id.desc())
+        )
+
+    if dialect in ("mysql", "mariadb"):
+        # Cada índice FULLTEXT es de una tabla: se puntúa por separado y se suma.
+        # Cada palabra puede aparecer en cualquiera de las dos tablas.
+        def _score(t: str):
+            return (
+                mysql_match(Drone.name, Drone.comment, against=f"{t}*").in_boolean_mode()
+                + mysql_match(CommunityPost.title, CommunityPost.public_note, against=f"{t}*").in_boolean_mode()
+            )
+
+        scores = [_score(t) for t in terms]
+        relevance = scores[0]
+        for sc in scores[1:]:
+            relevance = relevance + sc
+        return (
+            stmt.where(or_(and_(*[sc > 0 for sc in scores]), exact_match))
+            .order_by(None)
+            .order_by(relevance.desc(), CommunityPost.updated_at.desc(), CommunityPost.id.desc())
+        )
+
+    cols = (Drone.name, Drone.comment, CommunityPost.title, CommunityPost.public_note)
+    per_term = [or_(*[c.ilike(f"%{t}%") for c in cols]) for t in terms]
+    return stmt.where(or_(and_(*per_term), exact_match))
@@ -0,0 +1,183 @@
+# backend/compression.py
+"""
+Compresión de respuestas (brotli si el cliente lo acepta y está instalado; si no, gzip).
+
+Middleware ASGI puro:
+- sólo comprime a partir de COMPRESS_MIN_BYTES y tipos de texto (JSON, text/*)
+- respeta respuestas que ya traen Content-Encoding y las descargas con Range
+- las respuestas en streaming se comprimen por trozos, sin acumularlas
+- el ETag pasa a ser "<etag>-br" / "<etag>-gz": una representación distinta
+  necesita otro ETag fuerte (strip_encoding_suffix lo quita al comparar)
+"""
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+
+def strip_encoding_suffix(etag: str) -> str:
+    for suffix in ETAG_SUFFIXES.values():
+        if etag.endswith(suffix + '"'):
+            return etag[: -len(suffix) - 1] + '"'
+    return etag
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    accepted = _accepted(accept_encoding or "")
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._finish = self._c.process, self._c.finish
+        else:
+            # wbits=31: formato gzip (cabecera + CRC)
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress, self._finish = self._c.compress, self._c.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        if_none_match = ""
+        for k, v in scope.get("headers", ()):
+            if k == b"accept-encoding":
+                accept = v.decode("latin-1")
+            elif k == b"if-none-match":
+                if_none_match = v.decode("latin-1")
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor: _Compressor | None = None
+        passthrough = False
+
+        async def _send(message):
+            nonlocal start, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start = message
+                headers = {k.lower(): v for k, v in message.get("headers", ())}
+                ctype = headers.get(b"content-type", b"").decode("latin-1").lower()
+                passthrough = (
+                    b"content-encoding" in headers
+                    # Descargas con Range: los bytes pedidos son del fichero sin comprimir
+                    or headers.get(b"accept-ranges") == b"bytes"
+                    or b"content-range" in headers
+                    or not ctype.startswith(COMPRESSIBLE_TYPES)
+                    or message["status"] in (204, 206, 304)
+                )
+                if passthrough:
+                    if message["status"] == 304:
+                        message = self._not_modified_start(message, encoding, if_none_match)
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if compressor is None:
+                # Primer trozo: respuesta completa y pequeña → sin comprimir
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                if not more:
+                    # Cuerpo completo en un mensaje: se conoce el Content-Length final
+                    data = compressor.compress(body) + compressor.finish()
+                    await send(self._compressed_start(start, encoding, len(data)))
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send(self._compressed_start(start, encoding, None))
+
+            data = compressor.compress(body)
+            if not more:
+                data += compressor.finish()
+            if data or not more:
+                await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, _send)
+
+    @staticmethod
+    def _not_modified_start(start: dict, encoding: str, if_none_match: str) -> dict:
+        """El 304 lleva el ETag de la representación que tiene el cliente (con sufijo si era comprimida)."""
+        headers = []
+        for k, v in start.get("headers", ()):
+            if k.lower() == b"etag":
+                etag = v.decode("latin-1")
+                tagged = etag[:-1] + ETAG_SUFFIXES[encoding] + '"'
+                if tagged in if_none_match:
+                    v = tagged.encode("latin-1")
+            headers.append((k, v))
+        return {**start, "headers": headers}
+
+    @staticmethod
+    def _compressed_start(start: dict, encoding: str, length: int | None) -> dict:
+        headers = []
+        vary = None
+        for k, v in start.get("headers", ()):
+            name = k.lower()
+            if name == b"content-length":
+                continue
+            if name == b"etag":
+                etag = v.decode("latin-1")
+                if etag.endswith('"') and not etag.startswith("W/"):
+                    v = (etag[:-1] + ETAG_SUFFIXES[encoding] + '"').encode("latin-1")
+            if name == b"vary":
+                vary = v
+                continue
+            headers.append((k, v))
+
+        headers.append((b"content-encoding", encoding.encode("latin-1")))
+        headers.append((b"vary", (vary + b", Accept-Encoding") if vary else b"Accept-Encoding"))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode("latin-1")))
+        return {**start, "headers": headers}
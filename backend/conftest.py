@@ -1,23 +1,28 @@
 import os
 import pytest
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
 # Crear un nuevo engine para cada test
 @pytest.fixture(scope="function")
-def test_engine():
-    """Fixture que crea un nuevo engine SQLite en memoria para cada test."""
-    TEST_SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+def test_engine(tmp_path):
+    """
+    Fixture que crea un nuevo engine SQLite para cada test.
+    En fichero (no :memory: + StaticPool) para que cada sesión tenga su propia
+    conexión: los trabajos en segundo plano corren a la vez que las peticiones.
+    """
+    TEST_SQLALCHEMY_DATABASE_URL = f"sqlite:///{tmp_path / 'test.db'}"
     
     engine_test = create_engine(
         TEST_SQLALCHEMY_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
+        connect_args={"check_same_thread": False, "timeout": 30},
     )
     
     from models import Base
+    import community_search  # noqa: F401  (FTS5 del feed tras create_all)
     Base.metadata.create_all(bind=engine_test)
     
     yield engine_test
@@ -26,6 +31,22 @@ def test_engine():
     engine_test.dispose()
 
 
+@pytest.fixture(scope="function")
+def test_async_engine(test_engine):
+    """
+    Engine async (aiosqlite) sobre el mismo fichero que test_engine.
+    NullPool: cada TestClient tiene su propio event loop y las conexiones
+    aiosqlite no pueden pasar de un loop a otro.
+    """
+    engine_async = create_async_engine(
+        test_engine.url.set(drivername="sqlite+aiosqlite"),
+        connect_args={"timeout": 30},
+        poolclass=NullPool,
+    )
+    yield engine_async
+    engine_async.sync_engine.dispose()
+
+
 @pytest.fixture(scope="function")
 def db(test_engine):
     """Fixture que proporciona una sesión para acceder a la BD de test."""
@@ -40,7 +61,7 @@ def db(test_engine):
 
 
 @pytest.fixture(scope="function")
-def client(test_engine, monkeypatch):
+def client(test_engine, test_async_engine, monkeypatch):
     """Fixture que proporciona TestClient con BD de test limpia."""
     from main import app
     from db import engine as original_engine
@@ -48,8 +69,32 @@ def client(test_engine, monkeypatch):
     # Reemplazar el engine global con el de test
     monkeypatch.setattr("db.engine", test_engine)
     monkeypatch.setattr("auth_routes.engine", test_engine)
-    monkeypatch.setattr("community_routes.engine", test_engine)
     monkeypatch.setattr("main.engine", test_engine)
+    monkeypatch.setattr("db.async_engine", test_async_engine)
+    monkeypatch.setattr("community_routes.async_engine", test_async_engine)
+    monkeypatch.setattr("main.async_engine", test_async_engine)
 
     with TestClient(app) as test_client:
         yield test_client
+
+
+@pytest.fixture(scope="function")
+def dumps_dir(tmp_path, monkeypatch):
+    """Fixture que redirige uploads/dumps a un directorio temporal."""
+    base = tmp_path / "backend"
+    dumps = base / "uploads" / "dumps"
+    dumps.mkdir(parents=True)
+
+    monkeypatch.setattr("main.BASE_DIR", base)
+    monkeypatch.setattr("main.UPLOADS_DIR", base / "uploads")
+    monkeypatch.setattr("main.DUMPS_DIR", dumps)
+    return dumps
+
+
+@pytest.fixture(scope="function")
+def auth_headers(client):
+    """Fixture que registra un usuario y devuelve la cabecera Authorization."""
+    creds = {"email": "pilot@example.com", "password": "SecurePass123"}  # pragma: allowlist secret
+    client.post("/auth/register", json=creds)
+    token = client.post("/auth/login", json=creds).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
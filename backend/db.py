@@ -1,9 +1,14 @@
 # backend/db.py
 import os
+from contextlib import contextmanager
+
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from models import Base
 import user_models  # noqa: F401  (asegura que se registren modelos de usuarios)
+import community_search  # noqa: F401  (índices de texto completo tras create_all)
 
 load_dotenv()
 
@@ -11,11 +16,119 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL no está definida en el .env")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Pool de conexiones (MySQL). La concurrencia de las rutas async queda acotada
+# por DB_POOL_SIZE + DB_MAX_OVERFLOW conexiones, no por hilos.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+
+# Driver async equivalente al síncrono de DATABASE_URL
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url: str) -> str:
+    """URL para create_async_engine a partir de la síncrona (ASYNC_DATABASE_URL la fuerza)."""
+    u = make_url(url)
+    driver = ASYNC_DRIVERS.get(u.drivername)
+    if driver is None:
+        raise RuntimeError(f"No hay driver async para {u.drivername}: define ASYNC_DATABASE_URL")
+    return u.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def pool_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE_S,
+        "pool_timeout": DB_POOL_TIMEOUT_S,
+    }
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+
+# Síncrono: auth, trabajos de parseo en segundo plano y create_tables
+engine = create_engine(DATABASE_URL, pool_pre_ping=True, **pool_options(DATABASE_URL))
+
+# Async: rutas de drones, dumps y comunidad
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True, **pool_options(ASYNC_DATABASE_URL))
+
+# Arranque rápido: con DB_SKIP_SCHEMA_CHECK=1 la API no revisa el esquema al arrancar
+# (se migra aparte con `python migrate.py`, una vez por despliegue).
+SKIP_SCHEMA_CHECK = os.getenv("DB_SKIP_SCHEMA_CHECK", "").strip().lower() in ("1", "true", "yes")
+SCHEMA_LOCK_NAME = "tfm_drones_schema"
+SCHEMA_LOCK_TIMEOUT_S = int(os.getenv("DB_SCHEMA_LOCK_TIMEOUT_S", "60"))
 
 def test_connection():
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
 
+def schema_changes(conn) -> list[tuple[str, str, object]]:
+    """
+    Diferencias entre los modelos y la BD que create_tables sabe aplicar:
+    ("table", nombre, Table) | ("column", tabla, Column) | ("index", tabla, Index).
+    """
+    insp = inspect(conn)
+    changes: list[tuple[str, str, object]] = []
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            changes.append(("table", table.name, table))
+            continue
+
+        existing_cols = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name not in existing_cols and col.nullable:
+                changes.append(("column", table.name, col))
+
+        existing_ix = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for ix in table.indexes:
+            if ix.name not in existing_ix:
+                changes.append(("index", table.name, ix))
+    return changes
+
+
+def add_missing_columns(conn) -> None:
+    """
+    create_all no altera tablas que ya existen: añade las columnas nuevas
+    (sólo nullable) y los índices que falten.
+    """
+    for kind, table_name, obj in schema_changes(conn):
+        if kind == "column":
+            col_type = obj.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {obj.name} {col_type} NULL"))
+        elif kind == "index":
+            obj.create(conn)
+
+
+@contextmanager
+def schema_lock(conn, timeout_s: int = SCHEMA_LOCK_TIMEOUT_S):
+    """
+    Serializa la DDL entre procesos (varios workers de uvicorn arrancando a la vez).
+    MySQL: GET_LOCK con nombre, ligado a la conexión. SQLite ya serializa las escrituras.
+    """
+    if conn.dialect.name not in ("mysql", "mariadb"):
+        yield
+        return
+
+    got = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), {"name": SCHEMA_LOCK_NAME, "timeout": timeout_s}).scalar()
+    if got != 1:
+        raise RuntimeError("No se pudo obtener el lock de esquema (¿otra migración en curso?)")
+    try:
+        yield
+    finally:
+        conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": SCHEMA_LOCK_NAME})
+
+
 def create_tables():
-    Base.metadata.create_all(engine)
+    """Crea tablas y aplica columnas/índices que falten (idempotente)."""
+    with engine.connect() as lock_conn, schema_lock(lock_conn):
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            add_missing_columns(conn)
@@ -0,0 +1,87 @@
+# backend/dump_diff.py
+"""
+Diff entre dos dumps parseados (salida de parse_betaflight_like).
+
+Cada sección se convierte en un dict clave → valor y se compara con
+operaciones de conjuntos sobre las claves: sólo se devuelven las entradas
+añadidas, quitadas o cambiadas.
+"""
+from dump_parser import extract_structured, split_set_line
+
+
+def _scope_key(name: str) -> int | str:
+    # Perfil numérico → su índice; con nombre → el nombre tal cual (con None se pisarían entre sí)
+    return int(name) if str(name).isdigit() else name
+
+
+def _keyed_settings(parsed: dict) -> dict:
+    settings = parsed.get("settings") or {}
+    scoped = [("global", None, settings.get("global") or [])]
+    for scope, section in (("profile", "profiles"), ("rateprofile", "rateprofiles")):
+        scoped += [(scope, _scope_key(name), lines) for name, lines in (settings.get(section) or {}).items()]
+
+    keyed = {}
+    for scope, scope_index, lines in scoped:
+        for line in lines:
+            kv = split_set_line(line)
+            if kv is not None:
+                keyed[(scope, scope_index, kv[0])] = kv[1]
+    return keyed
+
+
+def _keyed(parsed: dict) -> dict[str, dict]:
+    rows = extract_structured(parsed)
+    return {
+        "settings": _keyed_settings(parsed),
+        "resources": {(r["function"], r["resource_index"]): r["pin"] for r in rows["resources"]},
+        "aux": {
+            (r["slot"],): {k: v for k, v in r.items() if k != "slot"}
+            for r in rows["aux"]
+        },
+        "features": {(r["name"],): r["enabled"] for r in rows["features"]},
+        "meta": {(k,): v for k, v in (parsed.get("meta") or {}).items() if v is not None},
+    }
+
+
+# Nombres de los campos de cada clave en la respuesta
+_KEY_FIELDS = {
+    "settings": ("scope", "scope_index", "key"),
+    "resources": ("function", "resource_index"),
+    "aux": ("slot",),
+    "features": ("name",),
+    "meta": ("field",),
+}
+
+
+def _diff_section(section: str, a: dict, b: dict) -> dict:
+    fields = _KEY_FIELDS[section]
+
+    def _entry(key: tuple, **values) -> dict:
+        return {**dict(zip(fields, key)), **values}
+
+    a_keys, b_keys = a.keys(), b.keys()
+    return {
+        "added": [_entry(k, value=b[k]) for k in sorted(b_keys - a_keys, key=_sort_key)],
+        "removed": [_entry(k, value=a[k]) for k in sorted(a_keys - b_keys, key=_sort_key)],
+        "changed": [
+            _entry(k, **{"from": a[k], "to": b[k]})
+            for k in sorted(a_keys & b_keys, key=_sort_key)
+            if a[k] != b[k]
+        ],
+    }
+
+
+def _sort_key(key: tuple) -> tuple:
+    # scope_index puede ser None (global) o el nombre de un perfil no numérico
+    return tuple("" if v is None else str(v).zfill(6) if isinstance(v, int) else v for v in key)
+
+
+def diff_parsed(a: dict, b: dict) -> dict:
+    """Diff de b respecto a a (added = está en b y no en a)."""
+    ka, kb = _keyed(a), _keyed(b)
+    out = {section: _diff_section(section, ka[section], kb[section]) for section in _KEY_FIELDS}
+    out["summary"] = {
+        kind: sum(len(out[section][kind]) for section in _KEY_FIELDS)
+        for kind in ("added", "removed", "changed")
+    }
+    return out
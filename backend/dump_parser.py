@@ -0,0 +1,486 @@
+# backend/dump_parser.py
+"""
+Parser de dumps Betaflight y lectura en streaming de ficheros gzip/zip/xz/zstd/planos.
+
+Sin dependencias de FastAPI ni de la BD: se puede ejecutar en otro proceso.
+Los errores se señalan con DumpError (código HTTP + detalle), que la API
+convierte en HTTPException.
+"""
+import gzip
+import hashlib
+import io
+import lzma
+import re
+import tarfile
+import zipfile
+import zlib
+from contextlib import closing, contextmanager
+from pathlib import Path, PurePosixPath
+from uuid import uuid4
+from typing import BinaryIO, Iterable, Iterator
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard es opcional
+    zstandard = None
+
+
+# Subir cuando cambie la salida de parse_betaflight_like (invalida la caché de parseos)
+# 2: al cachear también se rellenan las tablas dump_settings/resources/aux/features
+PARSER_VERSION = "2"
+
+MAX_OTHER_COMMANDS = 800
+
+# Tamaño de los buffers de lectura/decodificación en streaming
+READ_CHUNK_BYTES = 64 * 1024
+
+# Ventana máxima de zstd: acota la memoria del descompresor aunque el frame pida más
+ZSTD_MAX_WINDOW_BYTES = 8 * 1024 * 1024
+
+
+class DumpError(Exception):
+    """Dump ilegible o demasiado grande."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class _LimitedReader(io.RawIOBase):
+    """Envuelve un stream binario y corta al superar max_bytes (evita zip/gzip bombs)."""
+
+    def __init__(self, raw: BinaryIO, max_bytes: int):
+        self._raw = raw
+        self._remaining = max_bytes
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self._raw.read(len(b))
+        if len(data) > self._remaining:
+            raise DumpError(413, "Dump too large")
+        self._remaining -= len(data)
+        n = len(data)
+        b[:n] = data
+        return n
+
+
+# Formato por firma (magic bytes), no por extensión
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"PK\x03\x04", "zip"),
+    (b"PK\x05\x06", "zip"),  # zip vacío
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+# Extensiones de ficheros comprimidos → formato que deben tener
+EXT_FORMATS = {".gz": "gzip", ".zip": "zip", ".xz": "xz", ".zst": "zstd"}
+
+_ARCHIVE_ERRORS = (OSError, EOFError, zlib.error, zipfile.BadZipFile, lzma.LZMAError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+def detect_format(file_path: Path) -> str:
+    """gzip / zip / xz / zstd según la cabecera del fichero; "plain" si no es ninguno."""
+    with open(file_path, "rb") as f:
+        head = f.read(8)
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return "plain"
+
+
+@contextmanager
+def _open_decompressed(file_path: Path, fmt: str) -> Iterator[BinaryIO]:
+    """Stream descomprimido sobre el fichero abierto (lectura por trozos, sin cargarlo)."""
+    if fmt == "gzip":
+        with gzip.open(file_path, "rb") as raw:
+            yield raw
+    elif fmt == "xz":
+        with lzma.open(file_path, "rb") as raw:
+            yield raw
+    elif fmt == "zstd":
+        if zstandard is None:
+            raise DumpError(400, "zstd dumps are not supported")
+        dctx = zstandard.ZstdDecompressor(max_window_size=ZSTD_MAX_WINDOW_BYTES)
+        with open(file_path, "rb") as fh, dctx.stream_reader(fh, read_across_frames=True) as raw:
+            yield raw
+    elif fmt == "zip":
+        with zipfile.ZipFile(file_path) as zf:
+            # Sólo 1 fichero dentro (defensivo)
+            names = [n for n in zf.namelist() if not n.endswith("/")]
+            if not names:
+                raise DumpError(400, "Empty zip dump")
+            if len(names) > 1:
+                raise DumpError(400, "Zip with multiple files is not allowed")
+            with zf.open(names[0]) as raw:
+                yield raw
+    else:
+        # .sql/.dump/.txt → tal cual
+        with open(file_path, "rb") as raw:
+            yield raw
+
+
+@contextmanager
+def open_dump_stream(file_path: Path, ext: str, max_bytes: int) -> Iterator[BinaryIO]:
+    """
+    Abre el fichero guardado y devuelve un stream binario YA descomprimido,
+    limitado a max_bytes. No carga el fichero en memoria.
+
+    El formato sale de los magic bytes (un .txt que en realidad es gzip se
+    descomprime); una extensión comprimida que no cuadra con la firma es un
+    fichero corrupto. Los errores del descompresor, también los que salen al
+    leer el stream, se convierten en DumpError(400).
+    """
+    fmt = detect_format(file_path)
+    expected = EXT_FORMATS.get(ext)
+    if expected is not None and fmt != expected:
+        raise DumpError(400, f"Invalid {expected} dump")
+
+    try:
+        with _open_decompressed(file_path, fmt) as raw:
+            yield io.BufferedReader(_LimitedReader(raw, max_bytes), READ_CHUNK_BYTES)
+    except DumpError:
+        raise
+    except _ARCHIVE_ERRORS:
+        if fmt == "plain":
+            raise
+        raise DumpError(400, f"Invalid {fmt} dump")
+
+
+def iter_text_lines(stream: BinaryIO) -> Iterator[str]:
+    """
+    Decodifica en incremental (UTF-8, errores → U+FFFD) y devuelve línea a línea.
+    Corta igual que str.splitlines() sobre el texto completo.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
+    try:
+        for chunk in text:
+            # newline="" corta en \n, \r y \r\n; splitlines() cubre el resto (\x0c, \u2028...)
+            yield from chunk.splitlines()
+    finally:
+        text.detach()
+
+
+def parse_dump_file(file_path: Path, ext: str, max_bytes: int) -> dict:
+    """Parsea un dump desde disco en streaming (memoria ~ tamaño de buffer)."""
+    with open_dump_stream(file_path, ext, max_bytes) as stream:
+        return parse_betaflight_lines(iter_text_lines(stream))
+
+
+def iter_dump_chunks(file_path: Path, ext: str, max_bytes: int, chunk_size: int | None = None) -> Iterator[bytes]:
+    """Contenido descomprimido del dump, por trozos (para descargas)."""
+    chunk_size = chunk_size or READ_CHUNK_BYTES
+    with open_dump_stream(file_path, ext, max_bytes) as stream:
+        while chunk := stream.read(chunk_size):
+            yield chunk
+
+
+def _archive_members(file_path: Path) -> Iterator[tuple[str, BinaryIO]]:
+    """(nombre, stream) de cada fichero regular de un zip o de un tar (.tar/.tar.gz/.tar.xz...)."""
+    if detect_format(file_path) == "zip":
+        with zipfile.ZipFile(file_path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    with zf.open(info) as raw:
+                        yield info.filename, raw
+        return
+
+    if not tarfile.is_tarfile(file_path):
+        raise DumpError(400, "Unsupported archive")
+    # Modo stream ("r|*"): el tar se lee una vez de principio a fin, sin índice en memoria
+    with tarfile.open(file_path, "r|*") as tf:
+        for member in tf:
+            if member.isfile():
+                yield member.name, tf.extractfile(member)
+
+
+def copy_archive_entries(
+    file_path: Path,
+    dest_dir: Path,
+    allowed_exts: set[str],
+    max_entry_bytes: int,
+    max_total_bytes: int,
+    max_entries: int,
+) -> list[dict]:
+    """
+    Extrae los ficheros de un zip/tar a dest_dir (con nombres aleatorios) calculando
+    su sha256, por trozos. Devuelve un informe por entrada:
+    {"name", "path", "bytes", "sha256", "error"} (path None si no se extrajo).
+
+    Una entrada con extensión no admitida o mayor que max_entry_bytes sólo se marca
+    con error. Pasarse de max_total_bytes o de max_entries, o un archivo corrupto,
+    invalida todo: se borra lo extraído y se lanza DumpError.
+    """
+    report: list[dict] = []
+    total = 0
+    try:
+        with closing(_archive_members(file_path)) as members:
+            for member_name, raw in members:
+                name = PurePosixPath(member_name.replace("\\", "/")).name
+                # Metadatos de macOS (__MACOSX/, ._fichero): no son dumps
+                if not name or name.startswith("._") or "__MACOSX/" in member_name:
+                    continue
+                if len(report) >= max_entries:
+                    raise DumpError(400, "Too many files in archive")
+
+                entry = {"name": name, "path": None, "bytes": 0, "sha256": None, "error": None}
+                report.append(entry)
+                ext = Path(name).suffix.lower()
+                if ext not in allowed_exts:
+                    entry["error"] = f"Unsupported file extension: {ext}"
+                    continue
+
+                limit = min(max_entry_bytes, max_total_bytes - total)
+                dest = entry["path"] = dest_dir / uuid4().hex
+                digest = hashlib.sha256()
+                size = 0
+                with dest.open("wb") as out:
+                    while chunk := raw.read(READ_CHUNK_BYTES):
+                        size += len(chunk)
+                        if size > limit:
+                            break
+                        digest.update(chunk)
+                        out.write(chunk)
+                if size > limit:
+                    dest.unlink(missing_ok=True)
+                    entry["path"] = None
+                    if limit < max_entry_bytes:
+                        raise DumpError(413, "Archive too large")
+                    entry["error"] = "Dump too large"
+                    continue
+
+                total += size
+                entry.update(bytes=size, sha256=digest.hexdigest())
+    except BaseException as e:
+        for entry in report:
+            if entry["path"] is not None:
+                entry["path"].unlink(missing_ok=True)
+        if isinstance(e, _ARCHIVE_ERRORS + (tarfile.TarError,)) and not isinstance(e, DumpError):
+            raise DumpError(400, "Invalid archive") from e
+        raise
+    return report
+
+
+def parse_betaflight_like(text: str) -> dict:
+    """Parsea un dump ya decodificado (ver parse_betaflight_lines)."""
+    return parse_betaflight_lines((text or "").splitlines())
+
+
+def parse_betaflight_lines(lines: Iterable[str]) -> dict:
+    """
+    Parser “Betaflight-like” defensivo:
+    - detecta líneas típicas: '# version', '# resources', 'resource', 'set', 'profile', 'rateprofile', 'aux'
+    - agrupa por secciones
+    Consume las líneas de una en una (vale un generador: no necesita el texto entero).
+    """
+
+    version = None
+    board = None
+    build = None
+
+    resource_lines: list[str] = []
+    aux_lines: list[str] = []
+    global_settings: list[str] = []
+    profile_settings: dict[str, list[str]] = {}
+    rateprofile_settings: dict[str, list[str]] = {}
+    other_cmds: list[str] = []
+    warnings: list[str] = []
+
+    current_profile = None
+    current_rateprofile = None
+
+    recognized = 0
+    unknown = 0
+    lines_total = 0
+
+    for raw in lines:
+        lines_total += 1
+        line = raw.strip()
+        if not line:
+            continue
+
+        if line.startswith("#"):
+            # comentarios
+            if line.lower().startswith("# version"):
+                version = line
+                recognized += 1
+            elif line.lower().startswith("# board"):
+                board = line
+                recognized += 1
+            elif line.lower().startswith("# build"):
+                build = line
+                recognized += 1
+            continue
+
+        low = line.lower()
+
+        if low.startswith("profile "):
+            current_profile = line.split(" ", 1)[1].strip() or "0"
+            current_rateprofile = None
+            profile_settings.setdefault(current_profile, [])
+            recognized += 1
+            continue
+
+        if low.startswith("rateprofile "):
+            current_rateprofile = line.split(" ", 1)[1].strip() or "0"
+            current_profile = None
+            rateprofile_settings.setdefault(current_rateprofile, [])
+            recognized += 1
+            continue
+
+        if low.startswith("resource ") or low.startswith("resource\t"):
+            resource_lines.append(line)
+            recognized += 1
+            continue
+
+        if low.startswith("aux ") or low.startswith("aux\t"):
+            aux_lines.append(line)
+            recognized += 1
+            continue
+
+        if low.startswith("set "):
+            # settings global o por perfil
+            if current_profile is not None:
+                profile_settings.setdefault(current_profile, []).append(line)
+            elif current_rateprofile is not None:
+                rateprofile_settings.setdefault(current_rateprofile, []).append(line)
+            else:
+                global_settings.append(line)
+            recognized += 1
+            continue
+
+        # Otros comandos típicos
+        if any(low.startswith(p) for p in ("feature ", "map ", "serial ", "rate ", "rxrange ", "vtxtable ", "smix ", "mmix ")):
+            if len(other_cmds) < MAX_OTHER_COMMANDS:
+                other_cmds.append(line)
+            recognized += 1
+            continue
+
+        unknown += 1
+        if unknown <= 20:
+            warnings.append(f"Unknown line: {line}")
+
+    return {
+        "meta": {
+            "version": version,
+            "board": board,
+            "build": build,
+        },
+        "resources": resource_lines,
+        "modes": {"aux": aux_lines},
+        "settings": {
+            "global": global_settings,
+            "profiles": profile_settings,
+            "rateprofiles": rateprofile_settings,
+        },
+        "other_commands": other_cmds,
+        "warnings": warnings,
+        "stats": {
+            "lines_total": lines_total,
+            "recognized": recognized,
+            "unknown": unknown,
+            "profiles_detected": sorted(profile_settings.keys(), key=lambda x: int(x) if str(x).isdigit() else 9999),
+            "rateprofiles_detected": sorted(rateprofile_settings.keys(), key=lambda x: int(x) if str(x).isdigit() else 9999),
+        },
+    }
+
+
+
+_NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def _scope_index(name: str) -> int | None:
+    return int(name) if str(name).isdigit() else None
+
+
+def parse_number(value: str) -> float | None:
+    """Valor numérico de un setting ('250', '-1.5') o None."""
+    return float(value) if _NUMBER_RE.match(value) else None
+
+
+def split_set_line(line: str) -> tuple[str, str] | None:
+    """'set key = value' → ('key', 'value')."""
+    body = line[4:] if line.lower().startswith("set ") else line
+    if "=" not in body:
+        return None
+    key, value = body.split("=", 1)
+    key = key.strip().lower()
+    if not key:
+        return None
+    return key, value.strip()
+
+
+def extract_structured(parsed: dict) -> dict[str, list[dict]]:
+    """
+    Convierte la salida de parse_betaflight_like en filas para las tablas
+    dump_settings / dump_resources / dump_aux_modes / dump_features.
+    Las líneas que no encajan en el formato esperado se ignoran.
+    """
+    settings_out: list[dict] = []
+    settings = parsed.get("settings") or {}
+
+    scoped = [("global", None, settings.get("global") or [])]
+    scoped += [("profile", _scope_index(k), v) for k, v in (settings.get("profiles") or {}).items()]
+    scoped += [("rateprofile", _scope_index(k), v) for k, v in (settings.get("rateprofiles") or {}).items()]
+
+    for scope, scope_index, lines in scoped:
+        for line in lines:
+            kv = split_set_line(line)
+            if kv is None:
+                continue
+            key, value = kv
+            settings_out.append(
+                {
+                    "scope": scope,
+                    "scope_index": scope_index,
+                    "key": key[:64],
+                    "value": value[:255],
+                    "value_num": parse_number(value),
+                }
+            )
+
+    resources_out: list[dict] = []
+    for line in parsed.get("resources") or []:
+        parts = line.split()
+        if len(parts) >= 4 and parts[2].isdigit():
+            resources_out.append(
+                {"function": parts[1].upper()[:32], "resource_index": int(parts[2]), "pin": parts[3].upper()[:16]}
+            )
+
+    aux_out: list[dict] = []
+    for line in (parsed.get("modes") or {}).get("aux") or []:
+        nums = line.split()[1:]
+        if len(nums) < 5 or not all(_NUMBER_RE.match(n) and "." not in n for n in nums[:7]):
+            continue
+        vals = [int(n) for n in nums[:7]]
+        aux_out.append(
+            {
+                "slot": vals[0],
+                "mode_id": vals[1],
+                "channel": vals[2],
+                "range_low": vals[3],
+                "range_high": vals[4],
+                "logic": vals[5] if len(vals) > 5 else None,
+                "linked_to": vals[6] if len(vals) > 6 else None,
+            }
+        )
+
+    features_out: list[dict] = []
+    for line in parsed.get("other_commands") or []:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].lower() == "feature":
+            name = parts[1]
+            enabled = not name.startswith("-")
+            features_out.append({"name": name.lstrip("-").upper()[:64], "enabled": enabled})
+
+    return {
+        "settings": settings_out,
+        "resources": resources_out,
+        "aux": aux_out,
+        "features": features_out,
+    }
@@ -0,0 +1,38 @@
+# backend/etags.py
+"""
+ETags fuertes y GET condicional (If-None-Match → 304).
+
+Los ETags se calculan a partir de entradas estables (ids, fechas, versión del
+parser, parámetros de la página), no del cuerpo ya serializado, para poder
+responder 304 sin construir la respuesta.
+"""
+import hashlib
+import json
+
+from fastapi import Response, status
+
+from compression import strip_encoding_suffix
+
+
+def strong_etag(*parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    # W/ y el sufijo de compresión (-gz/-br) no cambian la identidad del recurso
+    return any(strip_encoding_suffix(c.removeprefix("W/")) == etag for c in candidates)
+
+
+def cache_headers(etag: str, private: bool = True) -> dict:
+    # no-cache: el navegador guarda la respuesta pero revalida siempre (304 si no cambió)
+    return {"ETag": etag, "Cache-Control": "private, no-cache" if private else "no-cache"}
+
+
+def not_modified(etag: str, private: bool = True) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, private))
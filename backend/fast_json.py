@@ -0,0 +1,47 @@
+# backend/fast_json.py
+"""
+Serialización JSON rápida para respuestas grandes (parse_dump, feed).
+
+FastJSONResponse usa orjson si está instalado (y FAST_JSON no es 0); si no,
+cae al json estándar con el mismo formato que JSONResponse. En ambos casos el
+contenido debe venir ya "pre-formado" (dicts/listas de str, int, float, bool,
+None): las rutas que la usan devuelven la respuesta directamente, sin pasar
+por jsonable_encoder.
+
+encode_object compone un objeto JSON a partir de valores ya codificados: el
+payload del parseo se guarda como JSON en la caché y se envía tal cual.
+"""
+import json
+import os
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "1").strip().lower() not in ("0", "false", "no")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None and FAST_JSON:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_object(fields: dict[str, bytes]) -> bytes:
+    """{"k": <valor ya codificado>, ...} sin decodificar ni re-codificar los valores."""
+    return b"{" + b",".join(dumps(k) + b":" + v for k, v in fields.items()) + b"}"
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class EncodedJSONResponse(JSONResponse):
+    """Respuesta cuyo cuerpo ya es JSON (bytes): no se vuelve a serializar."""
+
+    def render(self, content: bytes) -> bytes:
+        return content
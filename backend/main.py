@@ -1,11 +1,18 @@
 from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import quote
 from uuid import uuid4
-import io
-import gzip
-import zipfile
+import re
 import shutil
 import time
 import logging
+import hashlib
+import json
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 
 from fastapi import (
     Depends,
@@ -17,26 +24,102 @@ from fastapi import (
     Form,
     status,
     Request,
+    Header,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import bindparam, delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from auth_routes import get_current_user_email, router as auth_router
 from community_routes import router as community_router
-from db import engine, create_tables
-from models import Drone, DroneDump
+import db
+from db import async_engine, engine, create_tables
+from dump_diff import diff_parsed
+from dump_parser import (
+    EXT_FORMATS,
+    PARSER_VERSION,
+    DumpError,
+    copy_archive_entries,
+    extract_structured,
+    iter_dump_chunks,
+    parse_number,
+)
+import fast_json
+from fast_json import EncodedJSONResponse
+import metrics
+from models import (
+    CommunityPost,
+    Drone,
+    DroneDump,
+    DumpAuxMode,
+    DumpBlob,
+    DumpFeature,
+    DumpParseCache,
+    DumpParseJob,
+    DumpResource,
+    DumpSetting,
+    DumpUpload,
+    FileTombstone,
+)
+from etags import cache_headers, etag_matches, not_modified, strong_etag
+from pagination import NEXT_CURSOR_HEADER, before_id, clamp_limit, decode_cursor, set_next_cursor, split_page
+from parse_jobs import parse_jobs
+from parse_service import parse_service
+from security_headers import SecurityHeadersMiddleware
+from compression import CompressionMiddleware
 
 # Configurar logging para seguridad
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _file_sweep_wakeup
+
+    # Esquema: en cada arranque salvo DB_SKIP_SCHEMA_CHECK=1 (entonces, `python migrate.py` al desplegar)
+    if db.SKIP_SCHEMA_CHECK:
+        logger.info("Schema check skipped (DB_SKIP_SCHEMA_CHECK)")
+    else:
+        await run_in_threadpool(create_tables)
+
+    # Re-encola los parseos que quedaron a medias en el arranque anterior
+    unfinished = await run_in_threadpool(_unfinished_parse_jobs)
+    parse_jobs.start(_run_parse_job, unfinished)
+
+    # Barridos: subidas abandonadas y cola de borrado de ficheros (file_tombstones)
+    upload_sweeper = asyncio.create_task(_sweep_uploads_forever(), name="upload-sweeper")
+    wakeup, file_sweep_stop = asyncio.Event(), asyncio.Event()
+    _file_sweep_wakeup = wakeup
+    file_sweeper = asyncio.create_task(_sweep_files_forever(wakeup, file_sweep_stop), name="file-sweeper")
+    try:
+        yield
+    finally:
+        upload_sweeper.cancel()
+        # El barrido de ficheros termina la pasada en curso (no se corta a mitad de transacción)
+        file_sweep_stop.set()
+        wakeup.set()
+        try:
+            await asyncio.wait_for(file_sweeper, timeout=10)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.gather(upload_sweeper, return_exceptions=True)
+        if _file_sweep_wakeup is wakeup:
+            _file_sweep_wakeup = None
+        await parse_jobs.stop()
+        parse_service.shutdown()
+
+
 app = FastAPI(
     title="TFM Drones API",
     description="API segura para gestión de drones",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Middleware de seguridad: Trusted Hosts (previene Host Header Injection)
@@ -62,29 +145,23 @@ app.add_middleware(
     ],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # OPTIONS para preflight
-    allow_headers=["Content-Type", "Authorization"],  # explícito
+    allow_headers=["Content-Type", "Authorization", "X-Chunk-SHA256"],  # explícito
+    expose_headers=[NEXT_CURSOR_HEADER, "Upload-Offset"],  # paginación por cursor / subidas reanudables
     max_age=3600,  # Pre-flight cache 1 hora
 )
 
-# Middleware para agregar headers de seguridad
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    # Prevenir XSS
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    # Política de seguridad estricta
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    # CSP básica
-    response.headers["Content-Security-Policy"] = "default-src 'self'; script-src 'self'; style-src 'self' 'unsafe-inline'"
-    # Referrer Policy
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    # Permissions Policy
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-    return response
-
-create_tables()
+# Cabeceras de seguridad (ASGI puro: no envuelve el cuerpo de la respuesta)
+app.add_middleware(SecurityHeadersMiddleware)
+
+# Compresión gzip/brotli a partir de COMPRESS_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Métricas: latencia por ruta (la más externa, cuenta también el resto de middlewares) y pools de BD
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine, "sync")
+metrics.instrument_engine(async_engine.sync_engine, "async")
+
+
 app.include_router(auth_router)
 app.include_router(community_router)
 
@@ -93,12 +170,54 @@ UPLOADS_DIR = BASE_DIR / "uploads"
 DUMPS_DIR = UPLOADS_DIR / "dumps"
 DUMPS_DIR.mkdir(parents=True, exist_ok=True)
 
-ALLOWED_DUMP_EXTS = {".sql", ".dump", ".gz", ".zip", ".txt"}
+ALLOWED_DUMP_EXTS = {".sql", ".dump", ".gz", ".zip", ".xz", ".zst", ".txt"}
+
+# Almacén de dumps por contenido (uploads/dumps/blobs/ab/<sha256>) y subidas en curso
+BLOBS_DIRNAME = "blobs"
+TMP_DIRNAME = "tmp"
+
+# Reintentos del parseo en segundo plano cuando el pool está saturado (503) o hay timeout (504)
+PARSE_JOB_MAX_ATTEMPTS = 3
+PARSE_JOB_RETRY_DELAY_S = 5
 
 # Límites defensivos (evita zip/gzip bombs y ficheros enormes)
 MAX_DUMP_UPLOAD_BYTES = 20 * 1024 * 1024        # 20 MB (bytes escritos al disco)
 MAX_DUMP_DECOMPRESSED_BYTES = 20 * 1024 * 1024  # 20 MB (bytes tras descomprimir)
 
+# Importación en bloque (zip/tar con varios dumps): cada entrada sigue limitada a MAX_DUMP_UPLOAD_BYTES
+MAX_BULK_UPLOAD_BYTES = 200 * 1024 * 1024        # 200 MB (el archivo subido)
+MAX_BULK_DECOMPRESSED_BYTES = 500 * 1024 * 1024  # 500 MB (suma de las entradas extraídas)
+MAX_BULK_ENTRIES = 500
+
+# Altas/cambios/bajas de drones en bloque (/drones/bulk): elementos por petición
+MAX_BULK_DRONES = 500
+
+# Disco de las subidas (escritura + sha256, mkdir, rename): hilos propios, fuera del event loop
+# y sin competir con el threadpool de FastAPI
+UPLOAD_IO_WORKERS = int(os.getenv("UPLOAD_IO_WORKERS", "4"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Subidas reanudables (POST /dumps/uploads): tamaño máximo de cada PUT y caducidad sin actividad
+UPLOADS_DIRNAME = "uploads"  # dentro de tmp/
+MAX_UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_MAX_CHUNK_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_S = int(os.getenv("UPLOAD_SESSION_TTL_S", str(24 * 3600)))
+UPLOAD_SWEEP_INTERVAL_S = int(os.getenv("UPLOAD_SWEEP_INTERVAL_S", "600"))
+
+# Borrado de ficheros en segundo plano (file_tombstones): barrido, reintentos y reconciliación
+FILE_SWEEP_INTERVAL_S = int(os.getenv("FILE_SWEEP_INTERVAL_S", "60"))
+FILE_SWEEP_BATCH = 100
+FILE_SWEEP_RETRY_BASE_S = 30
+FILE_SWEEP_MAX_BACKOFF_S = 3600
+FILE_RECONCILE_INTERVAL_S = int(os.getenv("FILE_RECONCILE_INTERVAL_S", str(6 * 3600)))
+# Ficheros más nuevos que esto no se reconcilian (subidas cuya fila aún no se ha confirmado)
+FILE_RECONCILE_GRACE_S = 3600
+
+_upload_io = ThreadPoolExecutor(max_workers=UPLOAD_IO_WORKERS, thread_name_prefix="upload-io")
+
+
+async def _run_io(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_upload_io, fn, *args)
+
 
 class DroneCreate(BaseModel):
     name: str
@@ -119,6 +238,40 @@ class DroneUpdate(DroneCreate):
     pass
 
 
+class DroneBulkUpdate(DroneUpdate):
+    id: int
+
+
+class DroneBulkDelete(BaseModel):
+    ids: list[int]
+
+
+class UploadStart(BaseModel):
+    drone_id: int
+    filename: str
+    size: int | None = None
+
+
+class UploadComplete(BaseModel):
+    sha256: str | None = None
+
+
+def _drone_fields(payload: DroneCreate) -> dict:
+    """Columnas editables de un dron a partir del payload (create/update)."""
+    return {
+        "name": payload.name,
+        "comment": payload.comment,
+        "controller": payload.controller,
+        "video": payload.video,
+        "radio": payload.radio,
+        "components": payload.components,
+        "brand": payload.brand or "",
+        "model": payload.model or "",
+        "drone_type": payload.drone_type or "",
+        "notes": payload.notes,
+    }
+
+
 def drone_to_dict(d: Drone) -> dict:
     return {
         "id": d.id,
@@ -135,6 +288,17 @@ def drone_to_dict(d: Drone) -> dict:
     }
 
 
+def upload_to_dict(u: DumpUpload) -> dict:
+    return {
+        "id": u.id,
+        "drone_id": u.drone_id,
+        "filename": u.original_name,
+        "size": u.total_bytes,
+        "offset": u.received_bytes,
+        "expires_at": (u.updated_at + timedelta(seconds=UPLOAD_SESSION_TTL_S)).isoformat(),
+    }
+
+
 def dump_to_dict(x: DroneDump) -> dict:
     return {
         "id": x.id,
@@ -143,17 +307,26 @@ def dump_to_dict(x: DroneDump) -> dict:
         "stored_name": x.stored_name,
         "stored_path": x.stored_path,
         "bytes": x.bytes,
+        "content_sha256": x.content_sha256,
         "created_at": x.created_at.isoformat() if x.created_at else None,
     }
 
 
-def _get_owned_drone(session: Session, drone_id: int, user_email: str) -> Drone:
-    d = session.get(Drone, drone_id)
+async def _get_owned_drone(session: AsyncSession, drone_id: int, user_email: str) -> Drone:
+    d = await session.get(Drone, drone_id)
     if d is None or d.owner_email != user_email:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Drone not found")
     return d
 
 
+async def _get_owned_dump(session: AsyncSession, drone_id: int, dump_id: int, user_email: str) -> tuple[Drone, DroneDump]:
+    d = await _get_owned_drone(session, drone_id, user_email)
+    dump = await session.get(DroneDump, dump_id)
+    if dump is None or dump.drone_id != drone_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dump not found")
+    return d, dump
+
+
 def _safe_resolve_inside_base(p: Path) -> Path:
     base = BASE_DIR.resolve()
     rp = p.resolve()
@@ -162,63 +335,146 @@ def _safe_resolve_inside_base(p: Path) -> Path:
     return rp
 
 
-def _safe_remove_drone_dump_dir(drone_id: int) -> None:
-    """
-    Borra la carpeta uploads/dumps/drone_{id} (si existe).
+def _to_stored_path(p: Path) -> str:
+    return str(p.relative_to(BASE_DIR)).replace("\\", "/")
 
-    Best-effort: si falla, no rompe el DELETE del dron
-    (evita dejar la API “bloqueada” por locks en Windows).
-    """
-    base = DUMPS_DIR.resolve()
-    target = (DUMPS_DIR / f"drone_{drone_id}").resolve()
 
-    if target.name != f"drone_{drone_id}":
-        return
-    if base != target and base not in target.parents:
-        return
-    if not target.exists() or not target.is_dir():
-        return
+def _blob_path(sha256: str) -> Path:
+    return DUMPS_DIR / BLOBS_DIRNAME / sha256[:2] / sha256
 
-    try:
-        shutil.rmtree(target)
-    except Exception:
-        pass
 
+def _drone_dir_stored_path(drone_id: int) -> str:
+    """Carpeta antigua de un dron (uploads/dumps/drone_{id}), de antes del almacén por contenido."""
+    return _to_stored_path(DUMPS_DIR / f"drone_{drone_id}")
 
-def _safe_remove_single_dump_file(drone_id: int, stored_path: str) -> None:
-    """
-    Borra el fichero de un dump concreto, validando que el path está dentro de BASE_DIR.
-    Además, si el directorio drone_{id} queda vacío, lo elimina (best-effort).
 
-    Reglas:
-    - Si el fichero NO existe: no falla (lo tratamos como ya borrado).
-    - Si existe y no se puede borrar: lanza 500 y NO se debe borrar el registro en BD.
-    """
-    sp = (stored_path or "").strip()
-    if not sp:
-        # No hay path: no podemos tocar disco, pero tampoco queremos romper.
-        return
+def _tombstone(session: AsyncSession, stored_paths) -> None:
+    """Encola el borrado de esos ficheros/carpetas; se hace tras el commit (ver _sweep_files_forever)."""
+    session.add_all([FileTombstone(path=p) for p in stored_paths if p])
 
-    fp = _safe_resolve_inside_base(BASE_DIR / sp)
 
-    # Debe estar dentro de uploads/dumps/drone_{id}/...
-    expected_dir = _safe_resolve_inside_base(DUMPS_DIR / f"drone_{drone_id}")
-    if expected_dir != fp.parent and expected_dir not in fp.parents:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid dump stored path")
+def _wake_file_sweeper() -> None:
+    if _file_sweep_wakeup is not None:
+        _file_sweep_wakeup.set()
 
-    if fp.exists():
+
+def _move_into_place(tmp_path: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, dest)
+
+
+def _keep_existing_blob(tmp_path: Path, existing: Path) -> None:
+    if existing.is_file():
+        tmp_path.unlink(missing_ok=True)
+    else:
+        # El fichero desapareció del disco: esta subida lo repone
+        _move_into_place(tmp_path, existing)
+
+
+async def _acquire_blob(session: AsyncSession, sha256: str, size: int, tmp_path: Path) -> str:
+    """
+    Añade una referencia al blob con ese contenido y devuelve su stored_path.
+    - Si ya existía: se descarta tmp_path (0 bytes extra en disco).
+    - Si no: tmp_path pasa a ser el blob (rename atómico).
+    No hace commit: va en la misma transacción que el DroneDump.
+    """
+    for _ in range(3):
+        bumped = (
+            await session.execute(
+                update(DumpBlob)
+                .where(DumpBlob.sha256 == sha256)
+                .values(ref_count=DumpBlob.ref_count + 1)
+            )
+        ).rowcount
+        if bumped:
+            stored_path = await session.scalar(select(DumpBlob.stored_path).where(DumpBlob.sha256 == sha256))
+            await _run_io(_keep_existing_blob, tmp_path, BASE_DIR / stored_path)
+            return stored_path
+
+        dest = _blob_path(sha256)
+        stored_path = _to_stored_path(dest)
+        # El mismo contenido pudo borrarse hace poco: su borrado pendiente ya no aplica.
+        # Va antes del rename y en esta transacción (el barrido reclama el tombstone con otro DELETE).
+        await session.execute(delete(FileTombstone).where(FileTombstone.path == stored_path))
+        await _run_io(_move_into_place, tmp_path, dest)
         try:
-            fp.unlink()
-        except Exception:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not delete dump file")
+            async with session.begin_nested():
+                session.add(DumpBlob(sha256=sha256, stored_path=stored_path, bytes=size, ref_count=1))
+            return stored_path
+        except IntegrityError:
+            # Otra subida del mismo contenido ganó la carrera: el fichero es idéntico,
+            # así que basta con sumar la referencia en la siguiente vuelta.
+            continue
 
-    # Best-effort: si la carpeta se queda vacía, la quitamos
-    try:
-        if expected_dir.exists() and expected_dir.is_dir():
-            if not any(expected_dir.iterdir()):
-                expected_dir.rmdir()
-    except Exception:
-        pass
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Upload failed")
+
+
+async def _release_blob(session: AsyncSession, sha256: str) -> str | None:
+    """
+    Quita una referencia al blob. Si era la última, borra la fila y devuelve
+    el stored_path del fichero (que el llamante debe borrar); si no, None.
+    """
+    await session.execute(
+        update(DumpBlob)
+        .where(DumpBlob.sha256 == sha256)
+        .values(ref_count=DumpBlob.ref_count - 1)
+    )
+    blob = (
+        await session.execute(
+            select(DumpBlob.ref_count, DumpBlob.stored_path).where(DumpBlob.sha256 == sha256)
+        )
+    ).first()
+    if blob is None or blob.ref_count > 0:
+        return None
+
+    await session.execute(delete(DumpBlob).where(DumpBlob.sha256 == sha256))
+    return blob.stored_path
+
+
+async def _copy_parse_results(session: AsyncSession, src_dump_id: int, dst_dump_id: int) -> None:
+    """Copia (en la BD, sin pasar por Python) caché de parseo y tablas estructuradas."""
+    await session.execute(
+        insert(DumpParseCache).from_select(
+            ["dump_id", "parser_version", "content_hash", "payload"],
+            select(
+                literal(dst_dump_id),
+                DumpParseCache.parser_version,
+                DumpParseCache.content_hash,
+                DumpParseCache.payload,
+            ).where(
+                DumpParseCache.dump_id == src_dump_id,
+                DumpParseCache.parser_version == PARSER_VERSION,
+            ),
+        )
+    )
+    for model in STRUCTURED_TABLES.values():
+        cols = [c for c in model.__table__.columns if c.name not in ("id", "dump_id")]
+        await session.execute(
+            insert(model).from_select(
+                ["dump_id", *[c.name for c in cols]],
+                select(literal(dst_dump_id), *cols).where(model.dump_id == src_dump_id),
+            )
+        )
+
+
+async def _find_parsed_twin(session: AsyncSession, sha256: str, ext: str, exclude_dump_id: int) -> int | None:
+    """Otro dump con el mismo contenido (y extensión) que ya esté parseado."""
+    rows = (
+        await session.execute(
+            select(DroneDump.id, DroneDump.original_name)
+            .join(DumpParseCache, DumpParseCache.dump_id == DroneDump.id)
+            .where(
+                DroneDump.content_sha256 == sha256,
+                DroneDump.id != exclude_dump_id,
+                DumpParseCache.parser_version == PARSER_VERSION,
+            )
+            .limit(20)
+        )
+    ).all()
+    for dump_id, original_name in rows:
+        if Path(original_name or "").suffix.lower() == ext:
+            return dump_id
+    return None
 
 
 def _sanitize_filename(name: str) -> str:
@@ -229,403 +485,1403 @@ def _sanitize_filename(name: str) -> str:
     return name[:200] if len(name) > 200 else name
 
 
-def _read_limited(stream: io.BufferedReader, limit: int) -> bytes:
-    # Lee hasta limit+1 para detectar overflow
-    data = stream.read(limit + 1)
-    if len(data) > limit:
-        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Dump too large")
-    return data
+def _load_parse_cache(session: Session, dump_id: int) -> DumpParseCache | None:
+    return session.scalar(
+        select(DumpParseCache).where(
+            DumpParseCache.dump_id == dump_id,
+            DumpParseCache.parser_version == PARSER_VERSION,
+        )
+    )
 
 
-def _decompress_gzip_limited(payload: bytes, limit: int) -> bytes:
-    try:
-        with gzip.GzipFile(fileobj=io.BytesIO(payload), mode="rb") as gz:
-            return _read_limited(gz, limit)
-    except HTTPException:
-        raise
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid gzip dump")
+STRUCTURED_TABLES = {
+    "settings": DumpSetting,
+    "resources": DumpResource,
+    "aux": DumpAuxMode,
+    "features": DumpFeature,
+}
+
 
+def _replace_structured_rows(session: Session, dump_id: int, parsed: dict) -> None:
+    """Rellena dump_settings/resources/aux/features (bulk insert) sustituyendo lo anterior."""
+    for section, rows in extract_structured(parsed).items():
+        model = STRUCTURED_TABLES[section]
+        session.execute(delete(model).where(model.dump_id == dump_id))
+        if rows:
+            session.execute(insert(model), [{"dump_id": dump_id, **r} for r in rows])
 
-def _decompress_zip_limited(payload: bytes, limit: int) -> bytes:
+
+def _store_parse_cache(session: Session, dump_id: int, parsed: dict) -> DumpParseCache:
+    """
+    Guarda el resultado del parseo. Si otra petición lo guardó antes (carrera),
+    se devuelve la fila existente.
+    """
+    payload = json.dumps(parsed, ensure_ascii=False, separators=(",", ":"))
+    entry = DumpParseCache(
+        dump_id=dump_id,
+        parser_version=PARSER_VERSION,
+        content_hash=hashlib.sha256(payload.encode("utf-8")).hexdigest(),
+        payload=payload,
+    )
+    # Misma transacción: caché y tablas estructuradas se escriben juntas (o ninguna)
+    _replace_structured_rows(session, dump_id, parsed)
+    session.add(entry)
     try:
-        with zipfile.ZipFile(io.BytesIO(payload)) as zf:
-            # Sólo 1 fichero dentro (defensivo)
-            names = [n for n in zf.namelist() if not n.endswith("/")]
-            if not names:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty zip dump")
-            if len(names) > 1:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Zip with multiple files is not allowed")
-
-            with zf.open(names[0]) as f:
-                return _read_limited(f, limit)
-    except HTTPException:
-        raise
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid zip dump")
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        existing = _load_parse_cache(session, dump_id)
+        if existing is None:
+            raise
+        return existing
+    return entry
 
 
-def _read_dump_payload_bytes(file_path: Path, ext: str) -> bytes:
-    payload = file_path.read_bytes()
+def _parse_etag(drone: dict, dump: dict) -> str:
+    # El parseo sólo depende del fichero (inmutable: id + created_at) y de la versión del
+    # parser; el JSON final incluye además datos del dron (editables).
+    return strong_etag("parse", PARSER_VERSION, dump["id"], dump["created_at"], dump["content_sha256"], drone)
 
-    # Si viene comprimido, lo descomprimimos limitado
-    if ext == ".gz":
-        return _decompress_gzip_limited(payload, MAX_DUMP_DECOMPRESSED_BYTES)
-    if ext == ".zip":
-        return _decompress_zip_limited(payload, MAX_DUMP_DECOMPRESSED_BYTES)
 
-    # .sql/.dump/.txt → tal cual (pero limitado a MAX_DUMP_DECOMPRESSED_BYTES)
-    if len(payload) > MAX_DUMP_DECOMPRESSED_BYTES:
-        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Dump too large")
-    return payload
+@app.get("/health")
+def health():
+    return {"status": "ok"}
 
 
-def _decode_dump_text(payload: bytes) -> str:
-    # Intenta UTF-8; si falla, latin-1 (mucha gente guarda así)
-    try:
-        return payload.decode("utf-8", errors="replace")
-    except Exception:
-        return payload.decode("latin-1", errors="replace")
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Métricas en formato de texto de Prometheus."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 
-def parse_betaflight_like(text: str) -> dict:
-    """
-    Parser “Betaflight-like” defensivo:
-    - detecta líneas típicas: '# version', '# resources', 'resource', 'set', 'profile', 'rateprofile', 'aux'
-    - agrupa por secciones
-    """
-    lines = (text or "").splitlines()
+@app.get("/drones")
+async def list_drones(
+    response: Response,
+    limit: int = 100,
+    cursor: str | None = None,
+    user_email: str = Depends(get_current_user_email),
+):
+    """Drones del usuario, paginados por cursor (cabecera X-Next-Cursor)."""
+    limit = clamp_limit(limit, 200)
+    after = decode_cursor(cursor)
+
+    async with AsyncSession(async_engine) as session:
+        stmt = select(Drone).where(Drone.owner_email == user_email).order_by(Drone.id.desc())
+        if after is not None:
+            stmt = stmt.where(before_id(Drone.id, after))
+
+        drones, has_more = split_page((await session.scalars(stmt.limit(limit + 1))).all(), limit)
+        if has_more:
+            set_next_cursor(response, {"id": drones[-1].id})
+        return [drone_to_dict(d) for d in drones]
 
-    version = None
-    board = None
-    build = None
 
-    resource_lines: list[str] = []
-    aux_lines: list[str] = []
-    global_settings: list[str] = []
-    profile_settings: dict[str, list[str]] = {}
-    rateprofile_settings: dict[str, list[str]] = {}
-    other_cmds: list[str] = []
-    warnings: list[str] = []
+# ---- Drones en bloque ----
+# Declaradas antes de /drones/{drone_id}: si no, "bulk" se tomaría como drone_id.
+# Todo o nada: un id ajeno o inexistente da 404 y no se toca ninguna fila.
 
-    current_profile = None
-    current_rateprofile = None
 
-    recognized = 0
-    unknown = 0
+def _check_bulk_size(n: int) -> None:
+    if n > MAX_BULK_DRONES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many drones (max {MAX_BULK_DRONES})",
+        )
 
-    for raw in lines:
-        line = raw.strip()
-        if not line:
-            continue
 
-        if line.startswith("#"):
-            # comentarios
-            if line.lower().startswith("# version"):
-                version = line
-                recognized += 1
-            elif line.lower().startswith("# board"):
-                board = line
-                recognized += 1
-            elif line.lower().startswith("# build"):
-                build = line
-                recognized += 1
-            continue
+async def _check_owned_drones(session: AsyncSession, ids: list[int], user_email: str) -> None:
+    """Propiedad de todos los ids con una sola consulta IN."""
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Duplicate drone id")
+    owned = set(
+        await session.scalars(select(Drone.id).where(Drone.id.in_(ids), Drone.owner_email == user_email))
+    )
+    if len(owned) != len(ids):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Drone not found")
 
-        low = line.lower()
 
-        if low.startswith("profile "):
-            current_profile = line.split(" ", 1)[1].strip() or "0"
-            current_rateprofile = None
-            profile_settings.setdefault(current_profile, [])
-            recognized += 1
-            continue
+async def _drones_by_id(session: AsyncSession, ids: list[int]) -> list[dict]:
+    drones = {d.id: d for d in await session.scalars(select(Drone).where(Drone.id.in_(ids)))}
+    return [drone_to_dict(drones[i]) for i in ids]
 
-        if low.startswith("rateprofile "):
-            current_rateprofile = line.split(" ", 1)[1].strip() or "0"
-            current_profile = None
-            rateprofile_settings.setdefault(current_rateprofile, [])
-            recognized += 1
-            continue
 
-        if low.startswith("resource ") or low.startswith("resource\t"):
-            resource_lines.append(line)
-            recognized += 1
-            continue
+def _bulk_insert_returning() -> bool:
+    return async_engine.dialect.insert_executemany_returning
 
-        if low.startswith("aux ") or low.startswith("aux\t"):
-            aux_lines.append(line)
-            recognized += 1
-            continue
 
-        if low.startswith("set "):
-            # settings global o por perfil
-            if current_profile is not None:
-                profile_settings.setdefault(current_profile, []).append(line)
-            elif current_rateprofile is not None:
-                rateprofile_settings.setdefault(current_rateprofile, []).append(line)
-            else:
-                global_settings.append(line)
-            recognized += 1
-            continue
+@app.post("/drones/bulk", status_code=status.HTTP_201_CREATED)
+async def bulk_create_drones(payload: list[DroneCreate], user_email: str = Depends(get_current_user_email)):
+    _check_bulk_size(len(payload))
+    if not payload:
+        return []
 
-        # Otros comandos típicos
-        if any(low.startswith(p) for p in ("feature ", "map ", "serial ", "rate ", "rxrange ", "vtxtable ", "smix ", "mmix ")):
-            other_cmds.append(line)
-            recognized += 1
-            continue
+    rows = [{"owner_email": user_email, **_drone_fields(p)} for p in payload]
+    async with AsyncSession(async_engine) as session:
+        if _bulk_insert_returning():
+            # INSERT ... RETURNING por lotes (SQLite, MariaDB, PostgreSQL): una ida y vuelta
+            stmt = insert(Drone).returning(Drone.id, sort_by_parameter_order=True)
+            ids = list(await session.scalars(stmt, rows))
+        else:
+            # MySQL no tiene RETURNING: el ORM inserta fila a fila para leer cada lastrowid
+            drones = [Drone(**row) for row in rows]
+            session.add_all(drones)
+            await session.flush()
+            ids = [d.id for d in drones]
+        await session.commit()
+        return await _drones_by_id(session, ids)
 
-        unknown += 1
-        if unknown <= 20:
-            warnings.append(f"Unknown line: {line}")
 
-    return {
-        "meta": {
-            "version": version,
-            "board": board,
-            "build": build,
-        },
-        "resources": resource_lines,
-        "modes": {"aux": aux_lines},
-        "settings": {
-            "global": global_settings,
-            "profiles": profile_settings,
-            "rateprofiles": rateprofile_settings,
-        },
-        "other_commands": other_cmds[:800],
-        "warnings": warnings,
-        "stats": {
-            "lines_total": len(lines),
-            "recognized": recognized,
-            "unknown": unknown,
-            "profiles_detected": sorted(profile_settings.keys(), key=lambda x: int(x) if str(x).isdigit() else 9999),
-            "rateprofiles_detected": sorted(rateprofile_settings.keys(), key=lambda x: int(x) if str(x).isdigit() else 9999),
-        },
-    }
+@app.put("/drones/bulk")
+async def bulk_update_drones(payload: list[DroneBulkUpdate], user_email: str = Depends(get_current_user_email)):
+    _check_bulk_size(len(payload))
+    if not payload:
+        return []
 
+    ids = [p.id for p in payload]
+    async with AsyncSession(async_engine) as session:
+        await _check_owned_drones(session, ids, user_email)
+        # UPDATE por clave primaria con executemany (bulk update del ORM)
+        await session.execute(update(Drone), [{"id": p.id, **_drone_fields(p)} for p in payload])
+        await session.commit()
+        return await _drones_by_id(session, ids)
 
-@app.get("/health")
-def health():
-    return {"status": "ok"}
 
+async def _release_blobs(session: AsyncSession, refs: dict[str, int]) -> list[str]:
+    """
+    Como _release_blob, pero quitando refs[sha] referencias a cada blob en un solo
+    UPDATE (executemany). Devuelve los stored_path de los blobs que se quedan sin referencias.
+    """
+    if not refs:
+        return []
+    await session.execute(
+        update(DumpBlob.__table__)
+        .where(DumpBlob.sha256 == bindparam("b_sha256"))
+        .values(ref_count=DumpBlob.ref_count - bindparam("b_refs")),
+        [{"b_sha256": sha, "b_refs": n} for sha, n in refs.items()],
+    )
+    orphaned = (
+        await session.execute(
+            select(DumpBlob.sha256, DumpBlob.stored_path).where(
+                DumpBlob.sha256.in_(list(refs)), DumpBlob.ref_count <= 0
+            )
+        )
+    ).all()
+    if orphaned:
+        await session.execute(delete(DumpBlob).where(DumpBlob.sha256.in_([o.sha256 for o in orphaned])))
+    return [o.stored_path for o in orphaned]
 
-@app.get("/drones")
-def list_drones(user_email: str = Depends(get_current_user_email)):
-    with Session(engine) as session:
-        drones = session.scalars(
-            select(Drone).where(Drone.owner_email == user_email).order_by(Drone.id.desc())
-        ).all()
-        return [drone_to_dict(d) for d in drones]
+
+@app.delete("/drones/bulk", status_code=status.HTTP_204_NO_CONTENT)
+async def bulk_delete_drones(
+    payload: DroneBulkDelete,
+    user_email: str = Depends(get_current_user_email),
+):
+    ids = payload.ids
+    _check_bulk_size(len(ids))
+    if not ids:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    async with AsyncSession(async_engine) as session:
+        await _check_owned_drones(session, ids, user_email)
+
+        refs = dict(
+            (
+                await session.execute(
+                    select(DroneDump.content_sha256, func.count())
+                    .where(DroneDump.drone_id.in_(ids), DroneDump.content_sha256.isnot(None))
+                    .group_by(DroneDump.content_sha256)
+                )
+            ).all()
+        )
+
+        # Mismo efecto que el cascade del ORM de delete_drone, pero con un DELETE ... IN por tabla
+        dump_ids = select(DroneDump.id).where(DroneDump.drone_id.in_(ids)).scalar_subquery()
+        for model in (DumpParseCache, DumpParseJob, *STRUCTURED_TABLES.values()):
+            await session.execute(delete(model).where(model.dump_id.in_(dump_ids)))
+        for model in (DroneDump, DumpUpload, CommunityPost):
+            await session.execute(delete(model).where(model.drone_id.in_(ids)))
+        await session.execute(delete(Drone).where(Drone.id.in_(ids)))
+
+        released = await _release_blobs(session, refs)
+        _tombstone(session, [*(_drone_dir_stored_path(i) for i in ids), *released])
+        await session.commit()
+
+    _wake_file_sweeper()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @app.get("/drones/{drone_id}")
-def get_drone(drone_id: int, user_email: str = Depends(get_current_user_email)):
-    with Session(engine) as session:
-        d = _get_owned_drone(session, drone_id, user_email)
+async def get_drone(drone_id: int, user_email: str = Depends(get_current_user_email)):
+    async with AsyncSession(async_engine) as session:
+        d = await _get_owned_drone(session, drone_id, user_email)
         return drone_to_dict(d)
 
 
 @app.get("/drones/{drone_id}/dumps")
-def list_drone_dumps(drone_id: int, user_email: str = Depends(get_current_user_email)):
-    with Session(engine) as session:
-        _get_owned_drone(session, drone_id, user_email)
+async def list_drone_dumps(
+    drone_id: int,
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    cursor: str | None = None,
+    user_email: str = Depends(get_current_user_email),
+):
+    """Dumps del dron, paginados por cursor (cabecera X-Next-Cursor)."""
+    limit = clamp_limit(limit, 200)
+    after = decode_cursor(cursor)
 
-        dumps = session.scalars(
-            select(DroneDump).where(DroneDump.drone_id == drone_id).order_by(DroneDump.id.desc())
-        ).all()
-        return [dump_to_dict(x) for x in dumps]
+    async with AsyncSession(async_engine) as session:
+        await _get_owned_drone(session, drone_id, user_email)
+
+        stmt = select(DroneDump).where(DroneDump.drone_id == drone_id).order_by(DroneDump.id.desc())
+        if after is not None:
+            stmt = stmt.where(before_id(DroneDump.id, after))
+
+        dumps, has_more = split_page((await session.scalars(stmt.limit(limit + 1))).all(), limit)
+
+    # Los dumps no cambian tras subirse: la página queda determinada por sus ids
+    etag = strong_etag("dumps", drone_id, limit, cursor, [x.id for x in dumps], has_more)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    response.headers.update(cache_headers(etag))
+    if has_more:
+        set_next_cursor(response, {"id": dumps[-1].id})
+    return [dump_to_dict(x) for x in dumps]
 
 
 @app.post("/drones", status_code=status.HTTP_201_CREATED)
-def create_drone(payload: DroneCreate, user_email: str = Depends(get_current_user_email)):
-    with Session(engine) as session:
-        d = Drone(
-            owner_email=user_email,
-            name=payload.name,
-            comment=payload.comment,
-            controller=payload.controller,
-            video=payload.video,
-            radio=payload.radio,
-            components=payload.components,
-            brand=payload.brand or "",
-            model=payload.model or "",
-            drone_type=payload.drone_type or "",
-            notes=payload.notes,
-        )
+async def create_drone(payload: DroneCreate, user_email: str = Depends(get_current_user_email)):
+    async with AsyncSession(async_engine) as session:
+        d = Drone(owner_email=user_email, **_drone_fields(payload))
         session.add(d)
-        session.commit()
-        session.refresh(d)
+        await session.commit()
+        await session.refresh(d)
         return drone_to_dict(d)
 
 
 @app.put("/drones/{drone_id}")
-def update_drone(drone_id: int, payload: DroneUpdate, user_email: str = Depends(get_current_user_email)):
-    with Session(engine) as session:
-        d = _get_owned_drone(session, drone_id, user_email)
-
-        d.name = payload.name
-        d.comment = payload.comment
-        d.controller = payload.controller
-        d.video = payload.video
-        d.radio = payload.radio
-        d.components = payload.components
-        d.brand = payload.brand or ""
-        d.model = payload.model or ""
-        d.drone_type = payload.drone_type or ""
-        d.notes = payload.notes
-
-        session.commit()
-        session.refresh(d)
+async def update_drone(drone_id: int, payload: DroneUpdate, user_email: str = Depends(get_current_user_email)):
+    async with AsyncSession(async_engine) as session:
+        d = await _get_owned_drone(session, drone_id, user_email)
+        for field, value in _drone_fields(payload).items():
+            setattr(d, field, value)
+
+        await session.commit()
+        await session.refresh(d)
         return drone_to_dict(d)
 
 
 @app.delete("/drones/{drone_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_drone(drone_id: int, user_email: str = Depends(get_current_user_email)):
-    with Session(engine) as session:
-        d = _get_owned_drone(session, drone_id, user_email)
-
-        # 1) borrar registros en BD (cascade debería borrar dumps)
-        session.delete(d)
-        session.commit()
+async def delete_drone(drone_id: int, user_email: str = Depends(get_current_user_email)):
+    async with AsyncSession(async_engine) as session:
+        d = await _get_owned_drone(session, drone_id, user_email)
+        blob_shas = list(
+            await session.scalars(
+                select(DroneDump.content_sha256).where(
+                    DroneDump.drone_id == drone_id,
+                    DroneDump.content_sha256.isnot(None),
+                )
+            )
+        )
 
-    # 2) borrar ficheros en disco (best-effort)
-    _safe_remove_drone_dump_dir(drone_id)
+        # Borrar registros en BD (cascade borra los dumps) y soltar sus blobs; los ficheros
+        # (carpeta antigua del dron y blobs sin referencias) se borran después del commit
+        await session.delete(d)
+        released = [p for sha in blob_shas if (p := await _release_blob(session, sha))]
+        _tombstone(session, [_drone_dir_stored_path(drone_id), *released])
+        await session.commit()
 
+    _wake_file_sweeper()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+async def _store_dump(
+    session: AsyncSession, drone_id: int, original_name: str, ext: str, tmp_path: Path, size: int, sha256: str
+) -> dict:
+    """
+    Fichero ya escrito en tmp_path → blob + DroneDump (commit incluido).
+    Si el mismo contenido ya estaba parseado se copia el resultado; si no, se encola el parseo.
+    """
+    stored_path = await _acquire_blob(session, sha256, size, tmp_path)
+
+    dump = DroneDump(
+        drone_id=drone_id,
+        original_name=original_name,
+        stored_name=sha256,
+        stored_path=stored_path,
+        bytes=size,
+        content_sha256=sha256,
+        parse_job=DumpParseJob(status="pending"),
+    )
+    session.add(dump)
+    await session.flush()
+
+    # Mismo contenido ya parseado en otro dump: se copia el resultado, sin re-parsear
+    twin_id = await _find_parsed_twin(session, sha256, ext, dump.id)
+    if twin_id is not None:
+        await _copy_parse_results(session, twin_id, dump.id)
+        dump.parse_job.status = "ready"
+
+    await session.commit()
+    await session.refresh(dump)
+
+    if twin_id is None:
+        # Parseo en segundo plano: /parse lo servirá ya precalculado
+        parse_jobs.enqueue(dump.id)
+
+    return dump_to_dict(dump)
+
+
+def _open_tmp_upload() -> tuple[Path, BinaryIO]:
+    tmp_dir = DUMPS_DIR / TMP_DIRNAME
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = tmp_dir / uuid4().hex
+    return tmp_path, tmp_path.open("wb")
+
+
+def _write_chunk(out: BinaryIO, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    out.write(chunk)
+
+
+def _discard_tmp_upload(out: BinaryIO, tmp_path: Path) -> None:
+    try:
+        out.close()
+        tmp_path.unlink(missing_ok=True)
+    except Exception:
+        pass
+
+
+async def _receive_upload(file: UploadFile, max_bytes: int) -> tuple[Path, int, str]:
+    """
+    Guarda el fichero subido en tmp/ con límite (413 si se pasa) y devuelve (ruta, bytes, sha256).
+    Todo el disco (y el hash) va por _upload_io: el event loop sólo reparte trozos.
+    """
+    tmp_path, out = await _run_io(_open_tmp_upload)
+
+    size = 0
+    digest = hashlib.sha256()
+    started = time.perf_counter()
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail="Dump upload too large",
+                )
+            await _run_io(_write_chunk, out, digest, chunk)
+        await _run_io(out.close)
+    except HTTPException:
+        # si sobrepasó, borra lo escrito
+        await _run_io(_discard_tmp_upload, out, tmp_path)
+        raise
+    except Exception:
+        await _run_io(_discard_tmp_upload, out, tmp_path)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Upload failed")
+    finally:
+        await file.close()
+
+    elapsed = time.perf_counter() - started
+    metrics.upload_bytes.inc(size)
+    if elapsed > 0:
+        metrics.upload_throughput.observe(size / elapsed)
+    return tmp_path, size, digest.hexdigest()
+
+
 @app.post("/dumps", status_code=status.HTTP_201_CREATED)
 async def upload_dump(
     drone_id: int = Form(...),
     file: UploadFile = File(...),
     user_email: str = Depends(get_current_user_email),
 ):
-    with Session(engine) as session:
-        _get_owned_drone(session, drone_id, user_email)
+    async with AsyncSession(async_engine) as session:
+        await _get_owned_drone(session, drone_id, user_email)
 
-        safe_original = _sanitize_filename(file.filename or "dump.txt")
-        ext = Path(safe_original).suffix.lower()
+    safe_original = _sanitize_filename(file.filename or "dump.txt")
+    ext = Path(safe_original).suffix.lower()
 
-        if ext not in ALLOWED_DUMP_EXTS:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Unsupported file extension: {ext}",
-            )
+    if ext not in ALLOWED_DUMP_EXTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file extension: {ext}",
+        )
+
+    # Se escribe en tmp/ calculando el sha256, sin conexión de BD prestada (clientes lentos
+    # no agotan el pool); luego pasa al almacén por contenido en una sesión nueva
+    tmp_path, size, sha256 = await _receive_upload(file, MAX_DUMP_UPLOAD_BYTES)
+    async with AsyncSession(async_engine) as session:
+        return await _store_dump(session, drone_id, safe_original, ext, tmp_path, size, sha256)
+
+
+@app.post("/drones/{drone_id}/dumps/bulk")
+async def bulk_upload_dumps(
+    drone_id: int,
+    file: UploadFile = File(...),
+    user_email: str = Depends(get_current_user_email),
+):
+    """
+    Importa todos los dumps de un zip/tar en una sola petición y una sola transacción.
+    Devuelve un informe por entrada; las entradas con error no impiden crear el resto.
+    """
+    async with AsyncSession(async_engine) as session:
+        await _get_owned_drone(session, drone_id, user_email)
+
+    archive_path, _, _ = await _receive_upload(file, MAX_BULK_UPLOAD_BYTES)
+    try:
+        entries = await _run_io(
+            copy_archive_entries,
+            archive_path,
+            DUMPS_DIR / TMP_DIRNAME,
+            ALLOWED_DUMP_EXTS,
+            MAX_DUMP_UPLOAD_BYTES,
+            MAX_BULK_DECOMPRESSED_BYTES,
+            MAX_BULK_ENTRIES,
+        )
+    except DumpError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        await _run_io(archive_path.unlink, True)
+
+    extracted = [e for e in entries if e["path"] is not None]
+    try:
+        async with AsyncSession(async_engine) as session:
+            await _get_owned_drone(session, drone_id, user_email)
+
+            # Un blob por contenido distinto (dos entradas iguales comparten blob)
+            dumps = []
+            for e in extracted:
+                stored_path = await _acquire_blob(session, e["sha256"], e["bytes"], e["path"])
+                dump = DroneDump(
+                    drone_id=drone_id,
+                    original_name=_sanitize_filename(e["name"]),
+                    stored_name=e["sha256"],
+                    stored_path=stored_path,
+                    bytes=e["bytes"],
+                    content_sha256=e["sha256"],
+                    parse_job=DumpParseJob(status="pending"),
+                )
+                dumps.append(dump)
+            session.add_all(dumps)
+            await session.flush()
+
+            to_parse = []
+            for e, dump in zip(extracted, dumps):
+                twin_id = await _find_parsed_twin(session, e["sha256"], Path(e["name"]).suffix.lower(), dump.id)
+                if twin_id is not None:
+                    await _copy_parse_results(session, twin_id, dump.id)
+                    dump.parse_job.status = "ready"
+                else:
+                    to_parse.append(dump.id)
+
+            created_ids = [d.id for d in dumps]
+            await session.commit()
+            created = {
+                d.id: dump_to_dict(d)
+                for d in await session.scalars(select(DroneDump).where(DroneDump.id.in_(created_ids)))
+            }
+    except Exception:
+        # Sin commit no hay dumps: lo extraído que no llegó al almacén de blobs sobra
+        await _run_io(_discard_extracted, extracted)
+        raise
+
+    for dump_id in to_parse:
+        parse_jobs.enqueue(dump_id)
+
+    created_by_entry = iter(created_ids)
+    report = []
+    for e in entries:
+        if e["error"] is None:
+            report.append({"name": e["name"], "status": "created", "dump": created[next(created_by_entry)]})
+        else:
+            report.append({"name": e["name"], "status": "failed", "error": e["error"]})
+    return {
+        "created": len(created_ids),
+        "failed": len(entries) - len(created_ids),
+        "entries": report,
+    }
+
+
+def _discard_extracted(entries: list[dict]) -> None:
+    for e in entries:
+        e["path"].unlink(missing_ok=True)
+
+
+# ---- Subidas reanudables ----
+# POST /dumps/uploads → PUT /dumps/uploads/{id}?offset=N (X-Chunk-SHA256) ... → POST .../complete
+# Cada trozo se recibe en un .part propio y sólo se añade al fichero de la subida si el
+# checksum cuadra y el offset sigue siendo el esperado (UPDATE condicional en la misma
+# transacción: dos PUT al mismo offset no pueden añadir los dos).
+
+
+def _uploads_dir() -> Path:
+    return DUMPS_DIR / TMP_DIRNAME / UPLOADS_DIRNAME
+
+
+def _upload_data_path(upload_id: str) -> Path:
+    return _uploads_dir() / upload_id
+
+
+def _create_upload_file(upload_id: str) -> None:
+    _uploads_dir().mkdir(parents=True, exist_ok=True)
+    _upload_data_path(upload_id).touch()
+
+
+def _open_upload_part(upload_id: str) -> tuple[Path, BinaryIO]:
+    part_path = _uploads_dir() / f"{upload_id}.{uuid4().hex}.part"
+    return part_path, part_path.open("wb")
+
+
+def _append_upload_part(part_path: Path, data_path: Path, offset: int) -> None:
+    # Truncar a offset descarta lo que dejara un append anterior que no llegó a confirmarse
+    with data_path.open("r+b") as out, part_path.open("rb") as part:
+        out.truncate(offset)
+        out.seek(offset)
+        shutil.copyfileobj(part, out, UPLOAD_CHUNK_BYTES)
+    part_path.unlink(missing_ok=True)
+
+
+def _seal_upload_file(data_path: Path, size: int) -> str:
+    """Deja el fichero en `size` bytes y devuelve su sha256 (leído por trozos)."""
+    digest = hashlib.sha256()
+    with data_path.open("r+b") as f:
+        f.truncate(size)
+        while chunk := f.read(UPLOAD_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-        # Directorio por dron
-        drone_dir = DUMPS_DIR / f"drone_{drone_id}"
-        drone_dir.mkdir(parents=True, exist_ok=True)
 
-        # Nombre único
-        stored_name = f"{uuid4().hex}_{safe_original}"
-        dest_path = drone_dir / stored_name
+def _remove_upload_files(upload_id: str) -> None:
+    for f in _uploads_dir().glob(f"{upload_id}*"):
+        f.unlink(missing_ok=True)
 
-        # Guardar a disco con límite (MAX_DUMP_UPLOAD_BYTES)
-        size = 0
+
+async def _get_owned_upload(session: AsyncSession, upload_id: str, user_email: str) -> DumpUpload:
+    upload = await session.scalar(
+        select(DumpUpload)
+        .join(Drone, Drone.id == DumpUpload.drone_id)
+        .where(DumpUpload.id == upload_id, Drone.owner_email == user_email)
+    )
+    if upload is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return upload
+
+
+def _offset_conflict(offset: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Offset mismatch",
+        headers={"Upload-Offset": str(offset)},
+    )
+
+
+@app.post("/dumps/uploads", status_code=status.HTTP_201_CREATED)
+async def start_upload(payload: UploadStart, user_email: str = Depends(get_current_user_email)):
+    """Abre una subida reanudable; el cliente envía luego los trozos con PUT."""
+    safe_original = _sanitize_filename(payload.filename or "dump.txt")
+    ext = Path(safe_original).suffix.lower()
+    if ext not in ALLOWED_DUMP_EXTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file extension: {ext}",
+        )
+    if payload.size is not None and not 0 <= payload.size <= MAX_DUMP_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Dump upload too large",
+        )
+
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        await _get_owned_drone(session, payload.drone_id, user_email)
+        upload = DumpUpload(
+            id=uuid4().hex,
+            drone_id=payload.drone_id,
+            original_name=safe_original,
+            total_bytes=payload.size,
+            received_bytes=0,
+        )
+        session.add(upload)
+        await _run_io(_create_upload_file, upload.id)
+        await session.commit()
+
+    return upload_to_dict(upload)
+
+
+@app.get("/dumps/uploads/{upload_id}")
+async def get_upload(upload_id: str, user_email: str = Depends(get_current_user_email)):
+    """Estado de la subida: `offset` es donde debe continuar el cliente tras un corte."""
+    async with AsyncSession(async_engine) as session:
+        upload = await _get_owned_upload(session, upload_id, user_email)
+        return upload_to_dict(upload)
+
+
+@app.put("/dumps/uploads/{upload_id}")
+async def put_upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    response: Response,
+    x_chunk_sha256: str = Header(...),
+    user_email: str = Depends(get_current_user_email),
+):
+    """Añade un trozo (cuerpo en crudo) en `offset`; devuelve el nuevo offset."""
+    async with AsyncSession(async_engine) as session:
+        upload = await _get_owned_upload(session, upload_id, user_email)
+        received, total = upload.received_bytes, upload.total_bytes
+    if offset != received:
+        raise _offset_conflict(received)
+    limit = min(MAX_DUMP_UPLOAD_BYTES, total if total is not None else MAX_DUMP_UPLOAD_BYTES)
+
+    part_path, out = await _run_io(_open_upload_part, upload_id)
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_UPLOAD_CHUNK_BYTES or offset + size > limit:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail="Dump upload too large",
+                )
+            await _run_io(_write_chunk, out, digest, chunk)
+        await _run_io(out.close)
+        if digest.hexdigest() != x_chunk_sha256.strip().lower():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chunk checksum mismatch")
+
+        async with AsyncSession(async_engine) as session:
+            moved = (
+                await session.execute(
+                    update(DumpUpload)
+                    .where(DumpUpload.id == upload_id, DumpUpload.received_bytes == offset)
+                    .values(received_bytes=offset + size)
+                )
+            ).rowcount
+            if not moved:
+                current = await session.scalar(select(DumpUpload.received_bytes).where(DumpUpload.id == upload_id))
+                raise _offset_conflict(current or 0)
+            await _run_io(_append_upload_part, part_path, _upload_data_path(upload_id), offset)
+            await session.commit()
+    except HTTPException:
+        await _run_io(_discard_tmp_upload, out, part_path)
+        raise
+    except Exception:
+        await _run_io(_discard_tmp_upload, out, part_path)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Upload failed")
+
+    metrics.upload_bytes.inc(size)
+    response.headers["Upload-Offset"] = str(offset + size)
+    return {"id": upload_id, "offset": offset + size}
+
+
+@app.post("/dumps/uploads/{upload_id}/complete", status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+    upload_id: str,
+    payload: UploadComplete | None = None,
+    user_email: str = Depends(get_current_user_email),
+):
+    """Cierra la subida y crea el DroneDump (igual que POST /dumps)."""
+    async with AsyncSession(async_engine) as session:
+        upload = await _get_owned_upload(session, upload_id, user_email)
+        drone_id, original_name, size = upload.drone_id, upload.original_name, upload.received_bytes
+        if upload.total_bytes is not None and size != upload.total_bytes:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload incomplete")
+
+        # Borrar la fila primero bloquea la subida: un PUT o un complete concurrente ya no la ve
+        gone = (
+            await session.execute(
+                delete(DumpUpload).where(DumpUpload.id == upload_id, DumpUpload.received_bytes == size)
+            )
+        ).rowcount
+        if not gone:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload changed")
+
+        data_path = _upload_data_path(upload_id)
         try:
-            with dest_path.open("wb") as out:
-                while True:
-                    chunk = await file.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    size += len(chunk)
-                    if size > MAX_DUMP_UPLOAD_BYTES:
-                        raise HTTPException(
-                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                            detail="Dump upload too large",
-                        )
-                    out.write(chunk)
-        except HTTPException:
-            # si sobrepasó, intenta borrar lo escrito
+            sha256 = await _run_io(_seal_upload_file, data_path, size)
+        except FileNotFoundError:
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Upload expired")
+        if payload is not None and payload.sha256 and payload.sha256.strip().lower() != sha256:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload checksum mismatch")
+
+        ext = Path(original_name).suffix.lower()
+        result = await _store_dump(session, drone_id, original_name, ext, data_path, size, sha256)
+
+    await _run_io(_remove_upload_files, upload_id)
+    return result
+
+
+@app.delete("/dumps/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(upload_id: str, user_email: str = Depends(get_current_user_email)):
+    async with AsyncSession(async_engine) as session:
+        upload = await _get_owned_upload(session, upload_id, user_email)
+        await session.delete(upload)
+        await session.commit()
+
+    await _run_io(_remove_upload_files, upload_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+def _sweep_tmp_files(live_ids: set[str], cutoff: float) -> int:
+    """
+    Borra de tmp/ lo que lleva más de UPLOAD_SESSION_TTL_S sin tocarse y no es de
+    una subida viva: ficheros de subidas caducadas, .part huérfanos y restos de
+    POST /dumps cortados a medias.
+    """
+    removed = 0
+    for folder in (DUMPS_DIR / TMP_DIRNAME, _uploads_dir()):
+        if not folder.is_dir():
+            continue
+        for f in folder.iterdir():
+            if not f.is_file() or f.name.split(".", 1)[0] in live_ids:
+                continue
             try:
-                if dest_path.exists():
-                    dest_path.unlink()
-            except Exception:
+                if f.stat().st_mtime < cutoff:
+                    f.unlink()
+                    removed += 1
+            except FileNotFoundError:
                 pass
-            raise
+    return removed
+
+
+async def _sweep_expired_uploads(now: datetime | None = None) -> int:
+    """Borra las subidas sin actividad en UPLOAD_SESSION_TTL_S (filas y ficheros)."""
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=UPLOAD_SESSION_TTL_S)
+    cutoff_ts = cutoff.replace(tzinfo=timezone.utc).timestamp()
+    async with AsyncSession(async_engine) as session:
+        expired = (
+            await session.execute(delete(DumpUpload).where(DumpUpload.updated_at < cutoff))
+        ).rowcount
+        await session.commit()
+        live_ids = set(await session.scalars(select(DumpUpload.id)))
+
+    await _run_io(_sweep_tmp_files, live_ids, cutoff_ts)
+    return expired
+
+
+async def _sweep_uploads_forever() -> None:
+    while True:
+        try:
+            expired = await _sweep_expired_uploads()
+            if expired:
+                logger.info("Swept %d expired dump uploads", expired)
         except Exception:
-            try:
-                if dest_path.exists():
-                    dest_path.unlink()
-            except Exception:
-                pass
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Upload failed")
-        finally:
-            await file.close()
+            logger.exception("Upload sweep failed")
+        await asyncio.sleep(UPLOAD_SWEEP_INTERVAL_S)
 
-        stored_path = str(dest_path.relative_to(BASE_DIR)).replace("\\", "/")
 
-        dump = DroneDump(
-            drone_id=drone_id,
-            original_name=safe_original,
-            stored_name=stored_name,
-            stored_path=stored_path,
-            bytes=size,
+# ---- Borrado de ficheros en segundo plano ----
+# Los DELETE sólo dejan un FileTombstone en su transacción. Este barrido (tarea del
+# lifespan, despertada tras cada borrado y cada FILE_SWEEP_INTERVAL_S) borra del disco
+# y reintenta con espera creciente; la reconciliación periódica encola lo que ninguna
+# fila referencia (restos de borrados antiguos, subidas que fallaron a medias...).
+
+_file_sweep_wakeup: asyncio.Event | None = None
+
+
+def _tombstone_target(stored_path: str) -> Path | None:
+    """
+    Ruta a borrar, o None si no es algo que el barrido pueda tocar: sólo ficheros
+    dentro de uploads/dumps y carpetas drone_{id} directamente bajo él.
+    """
+    dumps = DUMPS_DIR.resolve()
+    target = (BASE_DIR / stored_path).resolve()
+    if dumps not in target.parents:
+        return None
+    if target.is_dir() and (target.parent != dumps or not re.fullmatch(r"drone_\d+", target.name)):
+        return None
+    return target
+
+
+def _remove_path(target: Path) -> None:
+    """Borra fichero o carpeta (si ya no existe, no es error) y la carpeta padre si queda vacía."""
+    if target.is_dir():
+        shutil.rmtree(target)
+    else:
+        target.unlink(missing_ok=True)
+
+    parent = target.parent
+    dumps = DUMPS_DIR.resolve()
+    if parent not in (dumps, dumps / BLOBS_DIRNAME):
+        try:
+            if parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+        except OSError:
+            pass
+
+
+async def _path_in_use(session: AsyncSession, stored_path: str) -> bool:
+    """Alguna fila (blob o dump antiguo, o un dump dentro de la carpeta) usa esa ruta."""
+    in_use = await session.scalar(
+        select(literal(1)).where(
+            select(DumpBlob.sha256).where(DumpBlob.stored_path == stored_path).exists()
+            | select(DroneDump.id)
+            .where(
+                (DroneDump.stored_path == stored_path)
+                | DroneDump.stored_path.startswith(stored_path + "/", autoescape=True)
+            )
+            .exists()
         )
-        session.add(dump)
-        session.commit()
-        session.refresh(dump)
+    )
+    return bool(in_use)
+
+
+async def _remove_tombstoned(tombstone_id: int, stored_path: str) -> bool:
+    """
+    Borra un tombstone y su ruta en la misma transacción. Si el borrado del disco
+    falla, el rollback deja el tombstone para el siguiente intento.
+    """
+    async with AsyncSession(async_engine) as session:
+        # Reclamarlo con DELETE bloquea la fila: _acquire_blob (que lo borra antes de
+        # reutilizar la ruta) y otro barrido esperan a este commit
+        claimed = (await session.execute(delete(FileTombstone).where(FileTombstone.id == tombstone_id))).rowcount
+        if not claimed:
+            return False
+
+        target = _tombstone_target(stored_path)
+        if target is None:
+            logger.warning("Ignoring tombstone outside dumps dir: %s", stored_path)
+        elif not await _path_in_use(session, stored_path):
+            await _run_io(_remove_path, target)
+        await session.commit()
+        return target is not None
+
+
+async def _sweep_tombstones(now: datetime | None = None) -> int:
+    """Procesa los tombstones vencidos; devuelve cuántas rutas se han borrado."""
+    now = now or datetime.utcnow()
+    async with AsyncSession(async_engine) as session:
+        due = (
+            await session.execute(
+                select(FileTombstone.id, FileTombstone.path, FileTombstone.attempts)
+                .where(FileTombstone.next_attempt_at <= now)
+                .order_by(FileTombstone.next_attempt_at)
+                .limit(FILE_SWEEP_BATCH)
+            )
+        ).all()
 
-        return dump_to_dict(dump)
+    removed = 0
+    for t in due:
+        try:
+            removed += await _remove_tombstoned(t.id, t.path)
+        except Exception as e:
+            attempts = t.attempts + 1
+            delay = min(FILE_SWEEP_RETRY_BASE_S * 2 ** (attempts - 1), FILE_SWEEP_MAX_BACKOFF_S)
+            logger.warning("Could not delete %s (attempt %d, retry in %ds): %s", t.path, attempts, delay, e)
+            async with AsyncSession(async_engine) as session:
+                await session.execute(
+                    update(FileTombstone)
+                    .where(FileTombstone.id == t.id)
+                    .values(
+                        attempts=attempts,
+                        last_error=str(e)[:255],
+                        next_attempt_at=now + timedelta(seconds=delay),
+                    )
+                )
+                await session.commit()
+    return removed
+
+
+def _unreferenced_candidates(cutoff: float) -> list[str]:
+    """
+    stored_path de lo que hay en disco bajo drone_*/ y blobs/ sin tocar desde cutoff:
+    ficheros, y carpetas drone_* vacías.
+    """
+    found = []
+    for folder in [*DUMPS_DIR.glob("drone_*"), DUMPS_DIR / BLOBS_DIRNAME]:
+        if not folder.is_dir():
+            continue
+        files = [f for f in folder.rglob("*") if f.is_file()]
+        if not files and folder.name.startswith("drone_") and folder.stat().st_mtime < cutoff:
+            found.append(_to_stored_path(folder))
+        for f in files:
+            try:
+                if f.stat().st_mtime < cutoff:
+                    found.append(_to_stored_path(f))
+            except FileNotFoundError:
+                pass
+    return found
+
+
+async def _reconcile_files(now: datetime | None = None) -> int:
+    """Encola (tombstone) lo que hay en disco y ninguna fila referencia; devuelve cuántos."""
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=FILE_RECONCILE_GRACE_S)
+    candidates = await _run_io(_unreferenced_candidates, cutoff.replace(tzinfo=timezone.utc).timestamp())
+
+    orphans = []
+    async with AsyncSession(async_engine) as session:
+        for i in range(0, len(candidates), 500):
+            chunk = candidates[i:i + 500]
+            known = set(await session.scalars(select(DroneDump.stored_path).where(DroneDump.stored_path.in_(chunk))))
+            known |= set(await session.scalars(select(DumpBlob.stored_path).where(DumpBlob.stored_path.in_(chunk))))
+            known |= set(await session.scalars(select(FileTombstone.path).where(FileTombstone.path.in_(chunk))))
+            orphans.extend(p for p in chunk if p not in known)
+        _tombstone(session, orphans)
+        await session.commit()
+    return len(orphans)
+
+
+async def _sweep_files_forever(wakeup: asyncio.Event, stop: asyncio.Event) -> None:
+    reconciled_at = time.monotonic()
+    while not stop.is_set():
+        wakeup.clear()
+        try:
+            await _sweep_tombstones()
+            if time.monotonic() - reconciled_at >= FILE_RECONCILE_INTERVAL_S:
+                reconciled_at = time.monotonic()
+                orphans = await _reconcile_files()
+                if orphans:
+                    logger.info("Queued %d orphaned dump files for deletion", orphans)
+        except Exception:
+            logger.exception("File sweep failed")
+        try:
+            await asyncio.wait_for(wakeup.wait(), FILE_SWEEP_INTERVAL_S)
+        except asyncio.TimeoutError:
+            pass
 
 
 @app.delete("/drones/{drone_id}/dumps/{dump_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_dump(
+async def delete_dump(
     drone_id: int,
     dump_id: int,
     user_email: str = Depends(get_current_user_email),
 ):
+    async with AsyncSession(async_engine) as session:
+        _, dump = await _get_owned_dump(session, drone_id, dump_id, user_email)
+
+        await session.delete(dump)
+        if dump.content_sha256:
+            # Blob compartido: sólo se borra el fichero si era la última referencia
+            _tombstone(session, [await _release_blob(session, dump.content_sha256)])
+        else:
+            # Dump antiguo en uploads/dumps/drone_{id}/
+            _tombstone(session, [(dump.stored_path or "").strip()])
+        await session.commit()
+
+    _wake_file_sweeper()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+def _resolve_dump_file(dump: DroneDump) -> tuple[Path, str]:
+    """Ruta en disco (validada) y extensión del fichero de un dump."""
+    stored_path = (dump.stored_path or "").strip()
+    if not stored_path:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dump file path not found")
+
+    file_path = BASE_DIR / stored_path
+    file_path = _safe_resolve_inside_base(file_path)
+
+    if not file_path.exists() or not file_path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dump file not found on disk")
+
+    # Los blobs no llevan extensión: el formato sale del nombre original
+    ext = Path(dump.original_name or "").suffix.lower() if dump.content_sha256 else file_path.suffix.lower()
+    if ext not in ALLOWED_DUMP_EXTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported file extension: {ext}")
+
+    return file_path, ext
+
+
+async def _load_parse_target(drone_id: int, dump_id: int, user_email: str, if_none_match: str | None = None) -> dict:
+    """
+    Parte de BD de parse_dump: permisos, ETag, caché y ruta del fichero si hay que parsear.
+    Si el cliente ya tiene la versión actual (If-None-Match), no se lee el payload.
+    """
+    async with AsyncSession(async_engine) as session:
+        d, dump = await _get_owned_dump(session, drone_id, dump_id, user_email)
+
+        target = {"drone": drone_to_dict(d), "dump": dump_to_dict(dump), "cached": None}
+        target["etag"] = _parse_etag(target["drone"], target["dump"])
+        target["not_modified"] = etag_matches(if_none_match, target["etag"])
+        if target["not_modified"]:
+            return target
+
+        cached = (
+            await session.execute(
+                select(DumpParseCache.content_hash, DumpParseCache.payload).where(
+                    DumpParseCache.dump_id == dump_id,
+                    DumpParseCache.parser_version == PARSER_VERSION,
+                )
+            )
+        ).first()
+        if cached is not None:
+            target["cached"] = (cached.content_hash, cached.payload)
+            return target
+
+        target["file_path"], target["ext"] = _resolve_dump_file(dump)
+        return target
+
+
+def _save_parse_result(dump_id: int, parsed: dict) -> tuple[str, str]:
+    with Session(engine, expire_on_commit=False) as session:
+        entry = _store_parse_cache(session, dump_id, parsed)
+
+        job = session.get(DumpParseJob, dump_id)
+        if job is not None and job.status != "ready":
+            job.status = "ready"
+            job.error = None
+            session.commit()
+
+        return entry.content_hash, entry.payload
+
+
+def _unfinished_parse_jobs() -> list[int]:
     with Session(engine) as session:
-        _get_owned_drone(session, drone_id, user_email)
+        return list(
+            session.scalars(
+                select(DumpParseJob.dump_id)
+                .where(DumpParseJob.status.in_(("pending", "parsing")))
+                .order_by(DumpParseJob.dump_id)
+            )
+        )
+
 
+def _claim_parse_job(dump_id: int) -> dict | None:
+    """
+    Marca el trabajo como 'parsing' y devuelve qué parsear.
+    None si no hay nada que hacer (dump borrado o ya cacheado).
+    """
+    with Session(engine) as session:
+        job = session.get(DumpParseJob, dump_id)
         dump = session.get(DroneDump, dump_id)
-        if dump is None or dump.drone_id != drone_id:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dump not found")
+        if job is None or dump is None:
+            return None
 
-        # 1) Borrar fichero (si falla, NO borramos BD)
-        _safe_remove_single_dump_file(drone_id, dump.stored_path or "")
+        if _load_parse_cache(session, dump_id) is not None:
+            job.status = "ready"
+            session.commit()
+            return None
 
-        # 2) Borrar registro BD
-        session.delete(dump)
+        job.status = "parsing"
+        job.attempts = (job.attempts or 0) + 1
         session.commit()
 
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+        file_path, ext = _resolve_dump_file(dump)
+        return {"file_path": file_path, "ext": ext, "attempts": job.attempts}
+
+
+def _finish_parse_job(dump_id: int, job_status: str, error: str | None = None) -> None:
+    with Session(engine) as session:
+        job = session.get(DumpParseJob, dump_id)
+        if job is None:
+            return
+        job.status = job_status
+        job.error = (error or "")[:255] or None
+        session.commit()
+
+
+async def _run_parse_job(dump_id: int) -> None:
+    """Handler de parse_jobs: parsea un dump subido y deja el resultado en caché."""
+    try:
+        await _process_parse_job(dump_id)
+    except Exception:
+        # Fallo no previsto (disco, descompresión, BD): el trabajo no puede quedarse en 'parsing'
+        logger.exception("Parse job for dump %s failed", dump_id)
+        await run_in_threadpool(_finish_parse_job, dump_id, "failed", "Unexpected error while parsing dump")
+
+
+async def _process_parse_job(dump_id: int) -> None:
+    try:
+        target = await run_in_threadpool(_claim_parse_job, dump_id)
+    except HTTPException as e:
+        await run_in_threadpool(_finish_parse_job, dump_id, "failed", str(e.detail))
+        return
+    if target is None:
+        return
+
+    try:
+        parsed = await parse_service.parse(target["file_path"], target["ext"], MAX_DUMP_DECOMPRESSED_BYTES)
+    except HTTPException as e:
+        transient = e.status_code in (status.HTTP_503_SERVICE_UNAVAILABLE, status.HTTP_504_GATEWAY_TIMEOUT)
+        if transient and target["attempts"] < PARSE_JOB_MAX_ATTEMPTS:
+            await run_in_threadpool(_finish_parse_job, dump_id, "pending")
+            parse_jobs.enqueue_later(dump_id, PARSE_JOB_RETRY_DELAY_S)
+            return
+        await run_in_threadpool(_finish_parse_job, dump_id, "failed", str(e.detail))
+        return
+
+    await run_in_threadpool(_save_parse_result, dump_id, parsed)
+
+
+async def _load_parsed(drone_id: int, dump_id: int, user_email: str, if_none_match: str | None = None) -> dict:
+    """
+    Devuelve drone/dump y el parseo cacheado (content_hash, payload).
+    Si aún no está en caché, parsea ahora (pool de procesos) y lo guarda.
+    Con If-None-Match vigente devuelve sólo drone/dump/etag (not_modified=True).
+    """
+    target = await _load_parse_target(drone_id, dump_id, user_email, if_none_match)
+
+    if target["cached"] is None and not target["not_modified"]:
+        # CPU-bound: va al pool de procesos (503 si está saturado)
+        parsed = await parse_service.parse(target["file_path"], target["ext"], MAX_DUMP_DECOMPRESSED_BYTES)
+        target["cached"] = await run_in_threadpool(_save_parse_result, dump_id, parsed)
 
+    return target
 
-@app.get("/drones/{drone_id}/dumps/{dump_id}/parse")
-def parse_dump(
+
+SETTING_OPS = {
+    "eq": lambda col, v: col == v,
+    "ne": lambda col, v: col != v,
+    "gt": lambda col, v: col > v,
+    "gte": lambda col, v: col >= v,
+    "lt": lambda col, v: col < v,
+    "lte": lambda col, v: col <= v,
+}
+
+
+def _setting_to_dict(x: DumpSetting) -> dict:
+    return {"scope": x.scope, "scope_index": x.scope_index, "key": x.key, "value": x.value}
+
+
+@app.get("/dumps/settings/search")
+async def search_dump_settings(
+    key: str,
+    op: str = "eq",
+    value: str | None = None,
+    scope: str | None = None,
+    scope_index: int | None = None,
+    limit: int = 100,
+    user_email: str = Depends(get_current_user_email),
+):
+    """
+    Busca entre los dumps del usuario por un setting parseado, p.ej.
+    key=gyro_lpf1_static_hz&op=gt&value=200. Comparación numérica si value es un número.
+    Sólo incluye dumps ya parseados.
+    """
+    if op not in SETTING_OPS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported op: {op}")
+    if value is None and op != "eq":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="value is required for this op")
+
+    limit = clamp_limit(limit, 500)
+
+    stmt = (
+        select(DumpSetting, DroneDump, Drone)
+        .join(DroneDump, DroneDump.id == DumpSetting.dump_id)
+        .join(Drone, Drone.id == DroneDump.drone_id)
+        .where(Drone.owner_email == user_email)
+        .where(DumpSetting.key == key.strip().lower())
+        .order_by(DroneDump.id.desc(), DumpSetting.id)
+        .limit(limit)
+    )
+    if value is not None:
+        num = parse_number(value.strip())
+        if num is not None:
+            stmt = stmt.where(SETTING_OPS[op](DumpSetting.value_num, num))
+        elif op in ("eq", "ne"):
+            stmt = stmt.where(SETTING_OPS[op](DumpSetting.value, value.strip()))
+        else:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Numeric value required for this op")
+    if scope is not None:
+        stmt = stmt.where(DumpSetting.scope == scope)
+    if scope_index is not None:
+        stmt = stmt.where(DumpSetting.scope_index == scope_index)
+
+    async with AsyncSession(async_engine) as session:
+        return [
+            {
+                **_setting_to_dict(setting),
+                "dump": {"id": dump.id, "original_name": dump.original_name},
+                "drone": {"id": drone.id, "name": drone.name},
+            }
+            for setting, dump, drone in await session.execute(stmt)
+        ]
+
+
+async def _load_structured(dump_id: int, scope: str | None, scope_index: int | None) -> dict:
+    async with AsyncSession(async_engine) as session:
+        settings_stmt = select(DumpSetting).where(DumpSetting.dump_id == dump_id).order_by(DumpSetting.id)
+        if scope is not None:
+            settings_stmt = settings_stmt.where(DumpSetting.scope == scope)
+        if scope_index is not None:
+            settings_stmt = settings_stmt.where(DumpSetting.scope_index == scope_index)
+
+        async def _rows(model, *cols):
+            return [
+                {c: getattr(x, c) for c in cols}
+                for x in await session.scalars(select(model).where(model.dump_id == dump_id).order_by(model.id))
+            ]
+
+        return {
+            "settings": [_setting_to_dict(x) for x in await session.scalars(settings_stmt)],
+            "resources": await _rows(DumpResource, "function", "resource_index", "pin"),
+            "aux": await _rows(DumpAuxMode, "slot", "mode_id", "channel", "range_low", "range_high", "logic", "linked_to"),
+            "features": await _rows(DumpFeature, "name", "enabled"),
+        }
+
+
+@app.get("/drones/{drone_id}/dumps/{dump_id}/settings")
+async def get_dump_settings(
     drone_id: int,
     dump_id: int,
+    scope: str | None = None,
+    scope_index: int | None = None,
     user_email: str = Depends(get_current_user_email),
 ):
-    with Session(engine) as session:
-        d = _get_owned_drone(session, drone_id, user_email)
+    """
+    Configuración estructurada del dump (settings filtrables por scope/scope_index,
+    resources, aux y features), leída de las tablas indexadas.
+    """
+    if scope is not None and scope not in ("global", "profile", "rateprofile"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported scope: {scope}")
 
-        dump = session.get(DroneDump, dump_id)
-        if dump is None or dump.drone_id != drone_id:
+    # Garantiza que el dump está parseado (y por tanto indexado)
+    await _load_parsed(drone_id, dump_id, user_email)
+    return await _load_structured(dump_id, scope, scope_index)
+
+
+def _diff_payloads(payload_a: str, payload_b: str) -> dict:
+    return diff_parsed(json.loads(payload_a), json.loads(payload_b))
+
+
+@app.get("/drones/{drone_id}/dumps/{dump_a}/diff/{dump_b}")
+async def diff_dumps(
+    drone_id: int,
+    dump_a: int,
+    dump_b: int,
+    user_email: str = Depends(get_current_user_email),
+):
+    """
+    Diff de configuración entre dos dumps del mismo dron (b respecto a a):
+    settings, resources, aux, features y meta. Sólo entradas añadidas/quitadas/cambiadas.
+    Usa el parseo cacheado (parsea sólo si falta).
+    """
+    a, b = await asyncio.gather(
+        _load_parsed(drone_id, dump_a, user_email),
+        _load_parsed(drone_id, dump_b, user_email),
+    )
+    diff = await run_in_threadpool(_diff_payloads, a["cached"][1], b["cached"][1])
+    return {"a": a["dump"], "b": b["dump"], **diff}
+
+
+@app.get("/dumps/{dump_id}/status")
+async def dump_parse_status(dump_id: int, user_email: str = Depends(get_current_user_email)):
+    """
+    Estado del parseo en segundo plano: pending | parsing | ready | failed.
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        dump = await session.get(DroneDump, dump_id)
+        if dump is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dump not found")
+        await _get_owned_drone(session, dump.drone_id, user_email)
+
+        job = await session.get(DumpParseJob, dump_id)
+        if job is None:
+            # Dumps subidos antes de existir la cola: se encolan ahora
+            ready = await session.scalar(
+                select(DumpParseCache.id).where(
+                    DumpParseCache.dump_id == dump_id,
+                    DumpParseCache.parser_version == PARSER_VERSION,
+                )
+            ) is not None
+            job = DumpParseJob(dump_id=dump_id, status="ready" if ready else "pending")
+            session.add(job)
+            await session.commit()
+            if not ready:
+                parse_jobs.enqueue(dump_id)
+
+        return {"dump_id": dump_id, "status": job.status, "error": job.error}
+
+
+@app.get("/drones/{drone_id}/dumps/{dump_id}/parse", response_class=EncodedJSONResponse)
+async def parse_dump(
+    drone_id: int,
+    dump_id: int,
+    request: Request,
+    user_email: str = Depends(get_current_user_email),
+):
+    target = await _load_parsed(drone_id, dump_id, user_email, request.headers.get("if-none-match"))
+    if target["not_modified"]:
+        return not_modified(target["etag"])
 
-        stored_path = (dump.stored_path or "").strip()
-        if not stored_path:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dump file path not found")
+    _, payload = target["cached"]
+    # El payload cacheado ya es JSON: se inserta tal cual, sin json.loads + dumps
+    body = fast_json.encode_object({
+        "drone": fast_json.dumps(target["drone"]),
+        "dump": fast_json.dumps(target["dump"]),
+        "parsed": payload.encode("utf-8"),
+    })
+    return EncodedJSONResponse(content=body, headers=cache_headers(target["etag"]))
 
-        file_path = BASE_DIR / stored_path
-        file_path = _safe_resolve_inside_base(file_path)
 
-        if not file_path.exists() or not file_path.is_file():
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dump file not found on disk")
+RAW_MEDIA_TYPES = {
+    ".gz": "application/gzip",
+    ".zip": "application/zip",
+    ".xz": "application/x-xz",
+    ".zst": "application/zstd",
+}
 
-        ext = file_path.suffix.lower()
-        if ext not in ALLOWED_DUMP_EXTS:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported file extension: {ext}")
 
-        payload = _read_dump_payload_bytes(file_path, ext)
-        text = _decode_dump_text(payload)
+def _raw_etag(dump: DroneDump, decompress: bool) -> str:
+    # Los dumps no cambian: el sha256 (o id + fecha en los antiguos) identifica el fichero
+    identity = dump.content_sha256 or [dump.id, dump.created_at, dump.bytes]
+    return strong_etag("raw", identity, decompress)
 
-        parsed = parse_betaflight_like(text)
 
-        return {
-            "drone": drone_to_dict(d),
-            "dump": dump_to_dict(dump),
-            "parsed": parsed,
-        }
\ No newline at end of file
+def _decompressed_name(original_name: str, ext: str) -> str:
+    stem = Path(original_name).stem if ext in EXT_FORMATS else Path(original_name).name
+    return stem if Path(stem).suffix else f"{stem}.txt"
+
+
+def _attachment_disposition(name: str) -> str:
+    # Cabecera en latin-1: nombre ASCII de respaldo + filename* (RFC 5987) con el nombre real en UTF-8
+    fallback = "".join(c if c.isascii() and c.isprintable() and c not in '"\\' else "_" for c in name)
+    disposition = f'attachment; filename="{fallback}"'
+    if fallback != name:
+        disposition += f"; filename*=UTF-8''{quote(name, safe='')}"
+    return disposition
+
+
+@app.get("/drones/{drone_id}/dumps/{dump_id}/raw")
+async def download_dump(
+    drone_id: int,
+    dump_id: int,
+    request: Request,
+    decompress: bool = False,
+    user_email: str = Depends(get_current_user_email),
+):
+    """
+    Descarga del fichero subido, en streaming (memoria constante).
+    - Por defecto, tal cual (sendfile) con Range/If-Range para reanudar descargas.
+    - decompress=true: gzip/zip/xz/zstd descomprimidos al vuelo por trozos (sin Range).
+    """
+    async with AsyncSession(async_engine) as session:
+        _, dump = await _get_owned_dump(session, drone_id, dump_id, user_email)
+    file_path, ext = _resolve_dump_file(dump)
+
+    etag = _raw_etag(dump, decompress)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    if not decompress:
+        return FileResponse(
+            file_path,
+            media_type=RAW_MEDIA_TYPES.get(ext, "application/octet-stream"),
+            filename=dump.original_name,
+            headers=cache_headers(etag),
+        )
+
+    chunks = iter_dump_chunks(file_path, ext, MAX_DUMP_DECOMPRESSED_BYTES)
+    try:
+        # El primer trozo se lee antes de responder: un fichero corrupto da 400, no una descarga cortada
+        first = await run_in_threadpool(next, chunks, b"")
+    except DumpError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    def _body():
+        yield first
+        yield from chunks
+
+    name = _decompressed_name(dump.original_name, ext)
+    return StreamingResponse(
+        _body(),
+        media_type="text/plain; charset=utf-8",
+        headers={
+            **cache_headers(etag),
+            "Content-Disposition": _attachment_disposition(name),
+            "Accept-Ranges": "none",
+        },
+    )
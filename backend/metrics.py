@@ -0,0 +1,303 @@
+# backend/metrics.py
+"""
+Métricas de la API en formato de texto de Prometheus (GET /metrics).
+
+Sin dependencias externas: contadores, gauges e histogramas mínimos,
+seguros entre hilos (el parseo en segundo plano y el threadpool también
+registran métricas).
+
+- MetricsMiddleware (ASGI puro): peticiones y latencia por ruta (plantilla
+  de la ruta, no la URL, para no disparar la cardinalidad).
+- instrument_engine: estado del pool de conexiones de SQLAlchemy vía eventos, y
+  cuánto se espera por una conexión y cuánto se retiene.
+- parse_* / upload_*: los registran parse_service y upload_dump.
+"""
+import threading
+import time
+import weakref
+
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+THROUGHPUT_BUCKETS = (64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"]
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def _render_value(self, key: tuple, state) -> list[str]:
+        lines = []
+        for bound, count in zip(self.buckets, state["counts"]):
+            le = 'le="' + _fmt(bound) + '"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(state['sum'])}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn) -> None:
+        """fn() se llama antes de cada render (gauges leídos en el momento)."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in list(self._collectors):
+            fn()
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests = REGISTRY.register(
+    Counter("http_requests_total", "Peticiones HTTP por ruta, método y código", ("method", "route", "status"))
+)
+http_latency = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route"))
+)
+http_in_flight = REGISTRY.register(Gauge("http_requests_in_flight", "Peticiones HTTP en curso"))
+
+
+class PoolMetrics:
+    """Métricas del pool de conexiones de un Registry (los engines se distinguen por la etiqueta engine)."""
+
+    def __init__(self, registry: Registry):
+        self.size = registry.register(Gauge("db_pool_size", "Tamaño configurado del pool", ("engine",)))
+        self.checked_out = registry.register(
+            Gauge("db_pool_checked_out", "Conexiones prestadas ahora mismo", ("engine",))
+        )
+        self.overflow = registry.register(
+            Gauge("db_pool_overflow", "Conexiones por encima de pool_size (negativo: huecos libres)", ("engine",))
+        )
+        self.checkouts = registry.register(Counter("db_pool_checkouts_total", "Préstamos de conexión", ("engine",)))
+        self.connects = registry.register(Counter("db_pool_connects_total", "Conexiones nuevas abiertas", ("engine",)))
+        self.invalidations = registry.register(
+            Counter("db_pool_invalidations_total", "Conexiones invalidadas (caídas, pre_ping)", ("engine",))
+        )
+        self.checkout_wait = registry.register(
+            Histogram(
+                "db_pool_checkout_wait_seconds",
+                "Espera hasta obtener una conexión del pool (cola + conexión nueva si hace falta)",
+                ("engine",),
+            )
+        )
+        self.connection_held = registry.register(
+            Histogram("db_pool_connection_held_seconds", "Tiempo que una conexión pasa prestada", ("engine",))
+        )
+
+
+_pool_metrics: "weakref.WeakKeyDictionary[Registry, PoolMetrics]" = weakref.WeakKeyDictionary()
+
+
+def pool_metrics(registry: Registry = REGISTRY) -> PoolMetrics:
+    if registry not in _pool_metrics:
+        _pool_metrics[registry] = PoolMetrics(registry)
+    return _pool_metrics[registry]
+
+
+pool_metrics(REGISTRY)
+
+parse_duration = REGISTRY.register(
+    Histogram("dump_parse_duration_seconds", "Duración del parseo de dumps", ("outcome",), buckets=PARSE_BUCKETS)
+)
+parse_bytes = REGISTRY.register(Counter("dump_parse_bytes_total", "Bytes de dumps (en disco) parseados"))
+
+upload_bytes = REGISTRY.register(Counter("dump_upload_bytes_total", "Bytes de dumps recibidos"))
+upload_throughput = REGISTRY.register(
+    Histogram("dump_upload_bytes_per_second", "Velocidad de subida de dumps", buckets=THROUGHPUT_BUCKETS)
+)
+
+
+def _time_pool_get(pool, observe) -> None:
+    # No hay evento "antes del checkout": se cronometra Pool._do_get, que es donde se espera
+    # en la cola (o se abre la conexión nueva). Se envuelve en la instancia, no en la clase.
+    do_get = pool._do_get
+
+    def _timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            observe(time.perf_counter() - started)
+
+    pool._do_get = _timed_do_get
+
+
+def instrument_engine(engine, name: str, registry: Registry = REGISTRY) -> None:
+    """
+    Engancha los eventos del pool de un Engine (para AsyncEngine, su sync_engine)
+    y registra un collector que lee tamaño/overflow en cada /metrics.
+    """
+    m = pool_metrics(registry)
+    pool = engine.pool
+
+    def _observe_wait(seconds: float) -> None:
+        m.checkout_wait.observe(seconds, engine=name)
+
+    _time_pool_get(pool, _observe_wait)
+
+    @event.listens_for(engine, "engine_disposed")
+    def _on_disposed(conn_engine):
+        # dispose() sustituye el pool por uno nuevo (los eventos se copian, el envoltorio no)
+        _time_pool_get(conn_engine.pool, _observe_wait)
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_conn, record):
+        m.connects.inc(engine=name)
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        record.info["metrics_checkout_at"] = time.perf_counter()
+        m.checkouts.inc(engine=name)
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        started = record.info.pop("metrics_checkout_at", None)
+        if started is not None:
+            m.connection_held.observe(time.perf_counter() - started, engine=name)
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exception):
+        m.invalidations.inc(engine=name)
+
+    def _collect():
+        # Sólo QueuePool (y derivados) tienen size()/checkedout()/overflow(); NullPool/StaticPool
+        # no los tienen y en SingletonThreadPool (sqlite :memory:) size es un int, no un método
+        for gauge, attr in ((m.size, "size"), (m.checked_out, "checkedout"), (m.overflow, "overflow")):
+            fn = getattr(engine.pool, attr, None)
+            if callable(fn):
+                gauge.set(fn(), engine=name)
+
+    registry.add_collector(_collect)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: cuenta peticiones y mide su latencia por plantilla de ruta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def _send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            http_in_flight.dec()
+            # FastAPI deja la ruta resuelta en scope["route"]; sin ruta → "unmatched"
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_requests.inc(method=method, route=route, status=str(status_code))
+            http_latency.observe(time.perf_counter() - started, method=method, route=route)
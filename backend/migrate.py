@@ -0,0 +1,46 @@
+# backend/migrate.py
+"""
+Migración explícita del esquema (una vez por despliegue, antes de arrancar la API).
+
+    python migrate.py           # crea tablas y añade columnas/índices que falten
+    python migrate.py --check   # sólo informa; sale con 1 si hay cambios pendientes
+
+Con DB_SKIP_SCHEMA_CHECK=1 los workers de uvicorn no tocan el esquema al arrancar
+y esto es lo único que ejecuta DDL.
+"""
+import argparse
+import sys
+
+import db
+
+
+def _describe(kind: str, table_name: str, obj) -> str:
+    if kind == "table":
+        return f"create table {table_name}"
+    if kind == "column":
+        return f"add column {table_name}.{obj.name}"
+    return f"create index {obj.name} on {table_name}"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Migración del esquema de TFM Drones")
+    parser.add_argument("--check", action="store_true", help="no cambia nada; exit 1 si hay cambios pendientes")
+    args = parser.parse_args(argv)
+
+    with db.engine.connect() as conn:
+        pending = db.schema_changes(conn)
+
+    for change in pending:
+        print(_describe(*change))
+
+    if args.check:
+        print("Schema up to date" if not pending else f"{len(pending)} pending change(s)")
+        return 1 if pending else 0
+
+    db.create_tables()
+    print(f"Applied {len(pending)} change(s)" if pending else "Schema up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
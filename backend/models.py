@@ -3,7 +3,9 @@ from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -12,13 +14,33 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy import Enum as SAEnum
+from datetime import datetime
+
+from sqlalchemy.dialects.mysql import DATETIME as MYSQL_DATETIME, LONGTEXT
+from sqlalchemy.dialects.sqlite import DATETIME as SQLITE_DATETIME
 from sqlalchemy.sql import func
 
 Base = declarative_base()
 
+# En SQLite, CURRENT_TIMESTAMP guarda 'YYYY-MM-DD HH:MM:SS' (sin microsegundos).
+# Se usa el mismo formato para los parámetros, así las comparaciones de cursores
+# (updated_at = :ts) son exactas.
+CursorDateTime = DateTime().with_variant(
+    SQLITE_DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+# Marca de "última modificación" para ETags: con microsegundos (también en MySQL,
+# DATETIME(6)) para que dos cambios en el mismo segundo no den el mismo ETag.
+VersionDateTime = DateTime().with_variant(MYSQL_DATETIME(fsp=6), "mysql", "mariadb")
+
 
 class Drone(Base):
     __tablename__ = "drones"
+    __table_args__ = (
+        # Listado paginado por usuario (ORDER BY id DESC)
+        Index("ix_drones_owner_id", "owner_email", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -42,6 +64,7 @@ class Drone(Base):
     notes = Column(Text, nullable=True)
 
     dumps = relationship("DroneDump", back_populates="drone", cascade="all, delete-orphan")
+    uploads = relationship("DumpUpload", back_populates="drone", cascade="all, delete-orphan")
 
     # 1 publicación pública (opcional) por dron/owner
     community_post = relationship(
@@ -54,6 +77,14 @@ class Drone(Base):
 
 class DroneDump(Base):
     __tablename__ = "drone_dumps"
+    __table_args__ = (
+        # Feed de comunidad: dumps públicos más recientes por dron
+        Index("ix_drone_dumps_drone_public_created", "drone_id", "is_public", "created_at"),
+        # Listado paginado de dumps de un dron (ORDER BY id DESC)
+        Index("ix_drone_dumps_drone_id_id", "drone_id", "id"),
+        # ETag del feed: nº de dumps públicos
+        Index("ix_drone_dumps_public_updated", "is_public", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     drone_id = Column(Integer, ForeignKey("drones.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -63,18 +94,124 @@ class DroneDump(Base):
     stored_path = Column(String(500), nullable=False)
     bytes = Column(Integer, nullable=False)
 
+    # sha256 del contenido: el fichero vive en el almacén compartido (dump_blobs).
+    # NULL en dumps antiguos, guardados en uploads/dumps/drone_{id}/.
+    content_sha256 = Column(String(64), ForeignKey("dump_blobs.sha256"), nullable=True, index=True)
+
     # ✅ YA existe en BD (DEFAULT 0). Aquí lo mapeamos.
     is_public = Column(Boolean, nullable=False, server_default=text("0"))
 
     created_at = Column(DateTime, nullable=False, server_default=func.now())
+    # NULL hasta el primer cambio (visibilidad): ETag del feed
+    updated_at = Column(VersionDateTime, nullable=True, index=True, onupdate=datetime.utcnow)
 
     drone = relationship("Drone", back_populates="dumps")
 
+    # Resultados de parseo cacheados (se borran junto con el dump)
+    parse_cache = relationship("DumpParseCache", back_populates="dump", cascade="all, delete-orphan")
+
+    # Estado del parseo en segundo plano (1 por dump)
+    parse_job = relationship("DumpParseJob", back_populates="dump", uselist=False, cascade="all, delete-orphan")
+
+    # Configuración parseada en tablas (para consultas indexadas)
+    settings = relationship("DumpSetting", cascade="all, delete-orphan")
+    resources = relationship("DumpResource", cascade="all, delete-orphan")
+    aux_modes = relationship("DumpAuxMode", cascade="all, delete-orphan")
+    features = relationship("DumpFeature", cascade="all, delete-orphan")
+
+
+class DumpBlob(Base):
+    """
+    Fichero de dump direccionado por contenido (uploads/dumps/blobs/ab/abcdef...).
+    Varios DroneDump con el mismo contenido comparten blob; ref_count cuenta cuántos.
+    El fichero se borra cuando se va la última referencia.
+    """
+    __tablename__ = "dump_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    stored_path = Column(String(500), nullable=False, unique=True)
+    bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class DumpUpload(Base):
+    """
+    Subida reanudable en curso (POST /dumps/uploads).
+    Los bytes recibidos viven en uploads/dumps/tmp/uploads/<id> hasta que se
+    completa (pasa a ser un DroneDump) o caduca sin actividad.
+    """
+    __tablename__ = "dump_uploads"
+
+    id = Column(String(32), primary_key=True)
+    drone_id = Column(Integer, ForeignKey("drones.id", ondelete="CASCADE"), nullable=False, index=True)
+    original_name = Column(String(255), nullable=False)
+
+    # Tamaño anunciado al empezar (opcional) y bytes ya confirmados
+    total_bytes = Column(Integer, nullable=True)
+    received_bytes = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Última actividad: lo usa el barrido de subidas abandonadas
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    drone = relationship("Drone", back_populates="uploads")
+
+
+class FileTombstone(Base):
+    """
+    Fichero o carpeta de uploads/dumps pendiente de borrar (cola de borrado durable).
+
+    Se añade en la misma transacción que borra las filas que lo usaban; el barrido
+    de main lo quita del disco después del commit y, si falla, reintenta con espera
+    creciente. Así un DELETE no depende del disco y no quedan huérfanos olvidados.
+    """
+    __tablename__ = "file_tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Relativo a BASE_DIR, como DroneDump.stored_path / DumpBlob.stored_path
+    path = Column(String(500), nullable=False, index=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(255), nullable=True)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class DumpParseCache(Base):
+    """
+    Resultado de parseo cacheado de un dump.
+
+    Los dumps no cambian tras subirse, así que el JSON del parseo se guarda una vez
+    por (dump_id, parser_version). Si cambia el parser, basta con subir PARSER_VERSION.
+    """
+    __tablename__ = "dump_parse_cache"
+    __table_args__ = (
+        UniqueConstraint("dump_id", "parser_version", name="uq_dump_parse_cache_dump_version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    dump_id = Column(Integer, ForeignKey("drone_dumps.id", ondelete="CASCADE"), nullable=False, index=True)
+    parser_version = Column(String(32), nullable=False)
+
+    # sha256 del JSON serializado (sirve de ETag)
+    content_hash = Column(String(64), nullable=False)
+    payload = Column(Text().with_variant(LONGTEXT(), "mysql"), nullable=False)
+
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    dump = relationship("DroneDump", back_populates="parse_cache")
+
 
 class CommunityPost(Base):
     __tablename__ = "community_posts"
     __table_args__ = (
         UniqueConstraint("drone_id", "owner_email", name="uq_community_posts_drone_owner"),
+        # Paginación por cursor (updated_at, id): feed público y "mis publicaciones"
+        Index("ix_community_posts_public_updated", "is_public", "updated_at", "id"),
+        Index("ix_community_posts_owner_updated", "owner_email", "updated_at", "id"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -87,6 +224,85 @@ class CommunityPost(Base):
     is_public = Column(Boolean, nullable=False, server_default=text("0"))
 
     created_at = Column(DateTime, nullable=False, server_default=func.now())
-    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    updated_at = Column(CursorDateTime, nullable=False, server_default=func.now(), onupdate=func.now())
 
     drone = relationship("Drone", back_populates="community_post")
+
+
+class DumpParseJob(Base):
+    """
+    Estado del parseo en segundo plano de un dump (se encola al subirlo).
+    pending → parsing → ready | failed
+    """
+    __tablename__ = "dump_parse_jobs"
+
+    dump_id = Column(Integer, ForeignKey("drone_dumps.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(SAEnum("pending", "parsing", "ready", "failed"), nullable=False, default="pending", index=True)
+    error = Column(String(255), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+    dump = relationship("DroneDump", back_populates="parse_job")
+
+
+class DumpSetting(Base):
+    """Una línea 'set key = value' de un dump (global, de profile o de rateprofile)."""
+    __tablename__ = "dump_settings"
+    __table_args__ = (
+        Index("ix_dump_settings_dump_scope", "dump_id", "scope", "scope_index"),
+        # Búsquedas tipo "gyro_lpf1_static_hz > 200" entre dumps
+        Index("ix_dump_settings_key_num", "key", "value_num"),
+        Index("ix_dump_settings_key_value", "key", "value"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    dump_id = Column(Integer, ForeignKey("drone_dumps.id", ondelete="CASCADE"), nullable=False)
+
+    scope = Column(SAEnum("global", "profile", "rateprofile"), nullable=False)
+    scope_index = Column(Integer, nullable=True)  # NULL en global
+
+    key = Column(String(64), nullable=False)
+    value = Column(String(255), nullable=False)
+    # Valor numérico (si lo es) para comparar con >, <...
+    value_num = Column(Float, nullable=True)
+
+
+class DumpResource(Base):
+    """Línea 'resource FUNCTION index PIN'."""
+    __tablename__ = "dump_resources"
+
+    id = Column(Integer, primary_key=True)
+    dump_id = Column(Integer, ForeignKey("drone_dumps.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    function = Column(String(32), nullable=False, index=True)
+    resource_index = Column(Integer, nullable=False)
+    pin = Column(String(16), nullable=False)
+
+
+class DumpAuxMode(Base):
+    """Línea 'aux slot mode_id channel range_low range_high [logic linked_to]'."""
+    __tablename__ = "dump_aux_modes"
+
+    id = Column(Integer, primary_key=True)
+    dump_id = Column(Integer, ForeignKey("drone_dumps.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    slot = Column(Integer, nullable=False)
+    mode_id = Column(Integer, nullable=False, index=True)
+    channel = Column(Integer, nullable=False)
+    range_low = Column(Integer, nullable=False)
+    range_high = Column(Integer, nullable=False)
+    logic = Column(Integer, nullable=True)
+    linked_to = Column(Integer, nullable=True)
+
+
+class DumpFeature(Base):
+    """Línea 'feature NAME' / 'feature -NAME'."""
+    __tablename__ = "dump_features"
+
+    id = Column(Integer, primary_key=True)
+    dump_id = Column(Integer, ForeignKey("drone_dumps.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    name = Column(String(64), nullable=False, index=True)
+    enabled = Column(Boolean, nullable=False)
@@ -0,0 +1,75 @@
+# backend/pagination.py
+"""
+Paginación por cursor (keyset).
+
+El cursor es opaco para el cliente: JSON en base64url con los valores de la
+última fila devuelta. El siguiente cursor viaja en la cabecera X-Next-Cursor
+(el cuerpo sigue siendo la lista, como antes).
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> dict | None:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return data
+
+
+def clamp_limit(limit: int, maximum: int) -> int:
+    return max(1, min(int(limit), maximum))
+
+
+def cursor_int(data: dict, key: str) -> int:
+    try:
+        return int(data[key])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def cursor_datetime(data: dict, key: str) -> datetime:
+    try:
+        return datetime.fromisoformat(str(data[key]))
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def before_id(id_col, data: dict):
+    """WHERE para ORDER BY id DESC."""
+    return id_col < cursor_int(data, "id")
+
+
+def before_updated(updated_col, id_col, data: dict):
+    """WHERE para ORDER BY updated_at DESC, id DESC (sin tuplas: MySQL usa mejor el índice así)."""
+    ts = cursor_datetime(data, "u")
+    last_id = cursor_int(data, "id")
+    return or_(updated_col < ts, and_(updated_col == ts, id_col < last_id))
+
+
+def split_page(rows: list, limit: int) -> tuple[list, bool]:
+    """Las queries piden limit+1 filas: la sobrante indica que hay más páginas."""
+    return rows[:limit], len(rows) > limit
+
+
+def set_next_cursor(response: Response, data: dict | None) -> None:
+    if data is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(data)
@@ -0,0 +1,90 @@
+# backend/parse_jobs.py
+"""
+Cola de trabajos en segundo plano (asyncio, dentro del proceso de la API).
+
+Pensada como sustituto local de un broker: los trabajos son ids y el estado
+durable vive en la BD (dump_parse_jobs), así que al arrancar se re-encolan los
+que quedaron a medias. El trabajo pesado lo hace el handler (ver main._run_parse_job),
+que a su vez usa el pool de procesos de parse_service.
+"""
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+PARSE_JOB_WORKERS = int(os.getenv("PARSE_JOB_WORKERS", "2"))
+
+
+class JobQueue:
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._handler: Callable[[int], Awaitable[None]] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    def start(self, handler: Callable[[int], Awaitable[None]], initial: Iterable[int] = ()) -> None:
+        """Arranca los workers en el event loop actual (startup de la app)."""
+        self._handler = handler
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        for item in initial:
+            self._queue.put_nowait(item)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-{i}")
+            for i in range(max(1, self.workers))
+        ]
+
+    def enqueue(self, item: int) -> bool:
+        """
+        Encola sin bloquear. Devuelve False si la cola no está arrancada.
+        Se puede llamar desde endpoints síncronos (threadpool).
+        """
+        if self._queue is None:
+            return False
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._queue.put_nowait(item)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        return True
+
+    def enqueue_later(self, item: int, delay_s: float) -> None:
+        asyncio.get_running_loop().call_later(delay_s, self.enqueue, item)
+
+    async def join(self) -> None:
+        """Espera a que la cola se vacíe (tests / apagado ordenado)."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            try:
+                await self._handler(item)
+            except Exception:
+                logger.exception("%s job %s failed", self.name, item)
+            finally:
+                queue.task_done()
+
+
+parse_jobs = JobQueue("parse-jobs", PARSE_JOB_WORKERS)
@@ -0,0 +1,143 @@
+# backend/parse_service.py
+"""
+Servicio de parseo de dumps fuera del proceso de la API.
+
+El parseo (descompresión + parser) es CPU puro: en el threadpool de FastAPI
+compite por el GIL con el resto de peticiones. Aquí se manda a un
+ProcessPoolExecutor con:
+- cola acotada (PARSE_MAX_PENDING trabajos en curso + esperando); si está llena → 503 + Retry-After
+- timeout por trabajo (PARSE_TIMEOUT_S) → 504; los procesos del pool se matan y se crea otro
+  (los demás trabajos que estaban en ese pool se reintentan una vez en el nuevo)
+
+PARSE_WORKERS=0 ejecuta en el threadpool (útil en desarrollo/tests).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+import metrics
+from dump_parser import DumpError, parse_dump_file
+
+logger = logging.getLogger(__name__)
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSE_MAX_PENDING = int(os.getenv("PARSE_MAX_PENDING", str(max(1, PARSE_WORKERS) * 4)))
+PARSE_TIMEOUT_S = float(os.getenv("PARSE_TIMEOUT_S", "30"))
+PARSE_RETRY_AFTER_S = int(os.getenv("PARSE_RETRY_AFTER_S", "5"))
+
+
+class ParseService:
+    def __init__(
+        self,
+        workers: int = PARSE_WORKERS,
+        max_pending: int = PARSE_MAX_PENDING,
+        timeout_s: float = PARSE_TIMEOUT_S,
+        retry_after_s: int = PARSE_RETRY_AFTER_S,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_s = timeout_s
+        self.retry_after_s = retry_after_s
+        self.pending = 0
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor | None:
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            # spawn: los hijos no heredan conexiones de BD ni locks del proceso padre
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        # Un trabajo colgado o un hijo muerto: se matan los procesos del pool (si no, el
+        # trabajo colgado sigue ocupando CPU fuera de la cuenta de pending) y los
+        # siguientes van a un pool nuevo. Los demás trabajos del pool viejo fallan con
+        # BrokenProcessPool y se reintentan una vez en el nuevo (ver _run).
+        terminate = getattr(executor, "terminate_workers", None)  # Python 3.14+
+        if terminate is not None:
+            terminate()
+        else:
+            for process in list((executor._processes or {}).values()):
+                if process.is_alive():
+                    process.terminate()
+        executor.shutdown(wait=False)
+        if self._executor is executor:
+            self._executor = None
+
+    def _busy(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Parser busy, retry later",
+            headers={"Retry-After": str(self.retry_after_s)},
+        )
+
+    async def _run(self, file_path: Path, ext: str, max_bytes: int, retry: bool = True) -> dict:
+        executor = self._get_executor()
+        if executor is None:
+            return await asyncio.wait_for(
+                run_in_threadpool(parse_dump_file, file_path, ext, max_bytes), timeout=self.timeout_s
+            )
+
+        job = asyncio.get_running_loop().run_in_executor(executor, parse_dump_file, file_path, ext, max_bytes)
+        try:
+            return await asyncio.wait_for(job, timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            self._discard_executor(executor)
+            raise
+        except BrokenProcessPool:
+            if retry and executor is not self._executor:
+                # Otro trabajo (colgado o que tumbó su worker) ya descartó este pool: éste no
+                # tiene la culpa, se repite una vez en el pool nuevo
+                logger.info("Retrying dump parse on a fresh pool: %s", file_path.name)
+                return await self._run(file_path, ext, max_bytes, retry=False)
+            self._discard_executor(executor)
+            raise
+
+    async def parse(self, file_path: Path, ext: str, max_bytes: int) -> dict:
+        if self.pending >= self.max_pending:
+            raise self._busy()
+
+        self.pending += 1
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            parsed = await self._run(file_path, ext, max_bytes)
+            outcome = "ok"
+            try:
+                metrics.parse_bytes.inc(file_path.stat().st_size)
+            except OSError:
+                pass
+            return parsed
+        except DumpError as e:
+            outcome = "invalid"
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            logger.warning("Dump parse timed out after %ss: %s", self.timeout_s, file_path.name)
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Dump parse timed out")
+        except BrokenProcessPool:
+            logger.error("Parse worker process died")
+            raise self._busy()
+        finally:
+            self.pending -= 1
+            metrics.parse_duration.observe(time.perf_counter() - started, outcome=outcome)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+parse_service = ParseService()
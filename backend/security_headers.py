@@ -0,0 +1,47 @@
+# backend/security_headers.py
+"""
+Cabeceras de seguridad como middleware ASGI puro.
+
+Con @app.middleware("http") (BaseHTTPMiddleware) cada petición pasa por una
+tarea y un stream intermedios, y las respuestas en streaming se re-empaquetan.
+Aquí sólo se reescribe el mensaje http.response.start: el cuerpo pasa tal cual.
+Las cabeceras se codifican una única vez al importar.
+"""
+
+SECURITY_HEADERS = {
+    # Prevenir XSS
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    # Política de seguridad estricta
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    # CSP básica
+    "Content-Security-Policy": "default-src 'self'; script-src 'self'; style-src 'self' 'unsafe-inline'",
+    # Referrer Policy
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    # Permissions Policy
+    "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
+}
+
+_ENCODED = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in SECURITY_HEADERS.items()]
+_NAMES = frozenset(k for k, _ in _ENCODED)
+
+
+class SecurityHeadersMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                # Igual que antes: nuestras cabeceras sustituyen a las de la respuesta
+                headers = [h for h in message.get("headers", ()) if h[0].lower() not in _NAMES]
+                headers.extend(_ENCODED)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, _send)
@@ -169,3 +169,110 @@ class TestAuthEndpoints:
         )
         assert response.status_code == 401
         assert "Invalid token" in response.json()["detail"]
+
+
+class TestNonBlockingAuth:
+    """Tests para login/registro sin bloquear hilos"""
+
+    def test_failed_login_does_not_block_thread(self, client, monkeypatch):
+        """Test que el delay de login fallido no usa time.sleep"""
+        import time
+
+        def _no_sleep(*args):
+            raise AssertionError("login must not block a thread")
+
+        monkeypatch.setattr(time, "sleep", _no_sleep)
+        response = client.post(
+            "/auth/login",
+            json={"email": "nonexistent@example.com", "password": "anypass"},
+        )
+        assert response.status_code == 401
+
+    def test_hashing_runs_in_auth_pool(self, client, monkeypatch):
+        """Test que el hash se calcula en el pool de auth"""
+        import threading
+
+        import auth
+
+        threads = []
+        original = auth.hash_password
+
+        def _spy(password):
+            threads.append(threading.current_thread().name)
+            return original(password)
+
+        monkeypatch.setattr(auth, "hash_password", _spy)
+        response = client.post(
+            "/auth/register",
+            json={"email": "pool@example.com", "password": "SecurePass123"},  # pragma: allowlist secret
+        )
+        assert response.status_code == 201
+        assert threads and threads[0].startswith("auth-hash")
+
+    def test_saturated_pool_returns_503(self, client, monkeypatch):
+        """Test que con el pool lleno se responde 503 + Retry-After"""
+        import auth
+
+        monkeypatch.setattr(auth, "_hash_pending", auth.AUTH_HASH_MAX_PENDING)
+        response = client.post(
+            "/auth/register",
+            json={"email": "busy@example.com", "password": "SecurePass123"},  # pragma: allowlist secret
+        )
+        assert response.status_code == 503
+        assert response.headers["retry-after"]
+
+
+class TestTokenCache:
+    """Tests para la caché de tokens verificados"""
+
+    def test_repeated_token_hits_cache(self, client, auth_headers, monkeypatch):
+        """Test que el mismo token sólo se verifica una vez"""
+        from auth import token_cache
+
+        token_cache.clear()
+        before = token_cache.stats()
+        assert client.get("/auth/me", headers=auth_headers).status_code == 200
+
+        def _no_decode(*args, **kwargs):
+            raise AssertionError("token should come from the cache")
+
+        monkeypatch.setattr(jwt, "decode", _no_decode)
+        res = client.get("/auth/me", headers=auth_headers)
+        assert res.status_code == 200
+        assert res.json()["email"] == "pilot@example.com"
+
+        after = token_cache.stats()
+        assert after["hits"] == before["hits"] + 1
+        assert after["misses"] == before["misses"] + 1
+
+    def test_entry_not_served_past_exp(self, monkeypatch):
+        """Test que una entrada caducada (exp) no se sirve"""
+        import time
+
+        from auth import TokenCache
+
+        cache = TokenCache(max_size=2, ttl_s=3600)
+        now = time.time()
+        cache.put("a" * 40, "a@example.com", now + 10)
+        assert cache.get("a" * 40) == "a@example.com"
+
+        monkeypatch.setattr(time, "time", lambda: now + 10)
+        assert cache.get("a" * 40) is None
+        assert cache.stats() == {"size": 0, "hits": 1, "misses": 1}
+
+    def test_lru_eviction(self):
+        """Test que se descarta la entrada usada hace más tiempo"""
+        import time
+
+        from auth import TokenCache
+
+        cache = TokenCache(max_size=2, ttl_s=3600)
+        exp = time.time() + 60
+        cache.put("a", "a@example.com", exp)
+        cache.put("b", "b@example.com", exp)
+        cache.get("a")
+        cache.put("c", "c@example.com", exp)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "a@example.com"
+        assert cache.get("c") == "c@example.com"
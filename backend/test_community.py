@@ -0,0 +1,200 @@
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from models import CommunityPost, Drone, DroneDump
+
+
+N_DRONES = 2000
+DUMPS_PER_DRONE = 4
+
+
+@pytest.fixture
+def seeded_feed(test_engine):
+    """Siembra miles de publicaciones y dumps públicos."""
+    with Session(test_engine) as session:
+        session.execute(
+            insert(Drone),
+            [
+                {"id": i, "owner_email": f"user{i}@example.com", "name": f"Drone {i}", "brand": "", "model": "", "drone_type": ""}
+                for i in range(1, N_DRONES + 1)
+            ],
+        )
+        session.execute(
+            insert(CommunityPost),
+            [
+                {"drone_id": i, "owner_email": f"user{i}@example.com", "title": f"Post {i}", "is_public": True}
+                for i in range(1, N_DRONES + 1)
+            ],
+        )
+        session.execute(
+            insert(DroneDump),
+            [
+                {
+                    "drone_id": i,
+                    "original_name": f"dump_{i}_{j}.txt",
+                    "stored_name": f"dump_{i}_{j}.txt",
+                    "stored_path": f"uploads/dumps/drone_{i}/dump_{i}_{j}.txt",
+                    "bytes": 100,
+                    "is_public": j != 0,
+                }
+                for i in range(1, N_DRONES + 1)
+                for j in range(DUMPS_PER_DRONE)
+            ],
+        )
+        session.commit()
+
+
+def _count_queries(engine, fn):
+    statements: list[str] = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+    return len(statements)
+
+
+class TestFeedQueries:
+    """Benchmark: el feed no hace una query por publicación"""
+
+    def test_query_count_constant(self, client, test_async_engine, seeded_feed):
+        """Test que el número de queries no crece con limit"""
+        counts = {}
+        for limit in (1, 10, 50):
+            def _call():
+                res = client.get("/community/feed", params={"limit": limit})
+                assert res.status_code == 200
+                assert len(res.json()) == limit
+
+            counts[limit] = _count_queries(test_async_engine.sync_engine, _call)
+
+        assert len(set(counts.values())) == 1, counts
+        assert counts[50] <= 2
+
+    def test_public_dumps_per_item(self, client, seeded_feed):
+        """Test que cada publicación trae como mucho 3 dumps públicos, del más reciente al más antiguo"""
+        items = client.get("/community/feed", params={"limit": 50}).json()
+        for it in items:
+            dumps = it["dumps"]
+            assert len(dumps) == 3
+            assert all(x["drone_id"] == it["drone"]["id"] for x in dumps)
+            ids = [x["id"] for x in dumps]
+            assert ids == sorted(ids, reverse=True)
+
+
+def _seed_posts(session: Session, rows: list[tuple[str, str | None, str | None]]):
+    """rows: (drone name, post title, public note)"""
+    for i, (name, title, note) in enumerate(rows, start=1):
+        session.add(Drone(id=i, owner_email=f"user{i}@example.com", name=name, brand="", model="", drone_type=""))
+        session.flush()
+        session.add(CommunityPost(drone_id=i, owner_email=f"user{i}@example.com", title=title, public_note=note, is_public=True))
+    session.commit()
+
+
+class TestFeedSearch:
+    """Tests para la búsqueda del feed en BD"""
+
+    def test_search_sees_later_pages(self, client, test_engine):
+        """Test que una coincidencia fuera de la primera página se encuentra"""
+        rows = [(f"Drone {i}", f"Post {i}", None) for i in range(60)]
+        rows[5] = ("Cinewhoop", "Indoor build", "needle in a haystack")
+        with Session(test_engine) as session:
+            _seed_posts(session, rows)
+
+        items = client.get("/community/feed", params={"q": "needle", "limit": 10}).json()
+        assert [it["drone"]["name"] for it in items] == ["Cinewhoop"]
+
+    def test_search_ranked_and_paginated(self, client, test_engine):
+        """Test que se ordena por relevancia y la paginación se aplica al resultado filtrado"""
+        with Session(test_engine) as session:
+            _seed_posts(
+                session,
+                [
+                    ("Freestyle five", "Bando session", None),
+                    ("Apex", "Freestyle freestyle freestyle", "freestyle tune"),
+                    ("Nothing", "Unrelated", None),
+                    ("Long range", None, "some freestyle too"),
+                ],
+            )
+
+        items = client.get("/community/feed", params={"q": "freestyle", "limit": 50}).json()
+        assert len(items) == 3
+        assert items[0]["drone"]["name"] == "Apex"
+
+        page2 = client.get("/community/feed", params={"q": "freestyle", "limit": 2, "offset": 2}).json()
+        assert [it["drone"]["id"] for it in page2] == [items[2]["drone"]["id"]]
+
+    def test_search_multiple_terms_and_prefix(self, client, test_engine):
+        """Test que todas las palabras deben aparecer, como prefijo, en dron o publicación"""
+        with Session(test_engine) as session:
+            _seed_posts(session, [("Cinewhoop", "Indoor", None), ("Cinelifter", "Outdoor", None)])
+
+        names = [it["drone"]["name"] for it in client.get("/community/feed", params={"q": "cine indoor"}).json()]
+        assert names == ["Cinewhoop"]
+
+    def test_search_follows_drone_rename(self, client, test_engine):
+        """Test que el índice se actualiza al renombrar el dron"""
+        with Session(test_engine) as session:
+            _seed_posts(session, [("Old name", "Post", None)])
+            session.get(Drone, 1).name = "Shiny"
+            session.commit()
+
+        assert client.get("/community/feed", params={"q": "old"}).json() == []
+        assert len(client.get("/community/feed", params={"q": "shiny"}).json()) == 1
+
+    def test_search_by_owner_handle(self, client, test_engine):
+        """Test que se busca por el alias del autor, pero no por el resto de su email"""
+        with Session(test_engine) as session:
+            _seed_posts(session, [("Apex", "Post", None), ("Nazgul", "Post", None)])
+            session.get(CommunityPost, 2).owner_email = "pilot@example.com"
+            session.commit()
+
+        for q in ("pi", "pi…", "PI"):
+            items = client.get("/community/feed", params={"q": q}).json()
+            assert [it["drone"]["name"] for it in items] == ["Nazgul"], q
+            assert items[0]["owner"]["handle"] == "pi…"
+
+        assert client.get("/community/feed", params={"q": "pilot"}).json() == []
+
+
+class TestFeedPagination:
+    """Tests para la paginación por cursor del feed"""
+
+    def test_cursor_walks_all_posts(self, client, seeded_feed):
+        """Test que seguir X-Next-Cursor recorre todas las publicaciones sin repetir"""
+        seen: list[int] = []
+        cursor = None
+        while True:
+            params = {"limit": 50}
+            if cursor:
+                params["cursor"] = cursor
+            res = client.get("/community/feed", params=params)
+            assert res.status_code == 200
+            seen.extend(it["post"]["id"] for it in res.json())
+            cursor = res.headers.get("x-next-cursor")
+            if not cursor:
+                break
+
+        assert len(seen) == N_DRONES
+        assert seen == sorted(set(seen), reverse=True)
+
+    def test_search_cursor(self, client, test_engine):
+        """Test que con búsqueda el cursor continúa el orden por relevancia"""
+        with Session(test_engine) as session:
+            _seed_posts(session, [(f"Whoop {i}", "tiny whoop", None) for i in range(5)])
+
+        first = client.get("/community/feed", params={"q": "whoop", "limit": 3})
+        rest = client.get("/community/feed", params={"q": "whoop", "limit": 3, "cursor": first.headers["x-next-cursor"]})
+        ids = [it["post"]["id"] for it in first.json() + rest.json()]
+        assert sorted(ids) == [1, 2, 3, 4, 5]
+        assert "x-next-cursor" not in rest.headers
+
+    def test_invalid_cursor(self, client):
+        """Test que un cursor manipulado devuelve 400"""
+        res = client.get("/community/feed", params={"cursor": "not-a-cursor"})
+        assert res.status_code == 400
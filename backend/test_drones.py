@@ -0,0 +1,141 @@
+class TestDroneListPagination:
+    """Tests para la paginación por cursor de drones y dumps"""
+
+    def test_drones_cursor(self, client, auth_headers):
+        """Test que /drones se recorre por páginas con X-Next-Cursor"""
+        created = [
+            client.post("/drones", json={"name": f"Drone {i}"}, headers=auth_headers).json()["id"]
+            for i in range(7)
+        ]
+
+        pages = []
+        cursor = None
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            res = client.get("/drones", params=params, headers=auth_headers)
+            assert res.status_code == 200
+            pages.append([d["id"] for d in res.json()])
+            cursor = res.headers.get("x-next-cursor")
+            if not cursor:
+                break
+
+        assert [len(p) for p in pages] == [3, 3, 1]
+        assert [i for p in pages for i in p] == sorted(created, reverse=True)
+
+    def test_dumps_cursor(self, client, auth_headers, dumps_dir):
+        """Test que /drones/{id}/dumps se recorre por páginas con X-Next-Cursor"""
+        drone_id = client.post("/drones", json={"name": "Quad"}, headers=auth_headers).json()["id"]
+        for i in range(4):
+            client.post(
+                "/dumps",
+                data={"drone_id": str(drone_id)},
+                files={"file": (f"dump{i}.txt", b"set a = 1\n", "text/plain")},
+                headers=auth_headers,
+            )
+
+        first = client.get(f"/drones/{drone_id}/dumps", params={"limit": 3}, headers=auth_headers)
+        second = client.get(
+            f"/drones/{drone_id}/dumps",
+            params={"limit": 3, "cursor": first.headers["x-next-cursor"]},
+            headers=auth_headers,
+        )
+        names = [x["original_name"] for x in first.json() + second.json()]
+        assert names == ["dump3.txt", "dump2.txt", "dump1.txt", "dump0.txt"]
+        assert "x-next-cursor" not in second.headers
+
+
+class TestBulkDrones:
+    """Tests para altas, cambios y bajas de drones en bloque"""
+
+    def _other_headers(self, client):
+        creds = {"email": "other@example.com", "password": "SecurePass123"}  # pragma: allowlist secret
+        client.post("/auth/register", json=creds)
+        token = client.post("/auth/login", json=creds).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_bulk_create_and_update(self, client, auth_headers):
+        """Test que se crean y editan varios drones en una petición, en orden"""
+        res = client.post(
+            "/drones/bulk",
+            json=[{"name": f"Quad {i}", "controller": "Betaflight"} for i in range(5)],
+            headers=auth_headers,
+        )
+        assert res.status_code == 201
+        created = res.json()
+        assert [d["name"] for d in created] == [f"Quad {i}" for i in range(5)]
+
+        res = client.put(
+            "/drones/bulk",
+            json=[{"id": d["id"], "name": d["name"] + "!", "video": "Digital"} for d in created[:3]],
+            headers=auth_headers,
+        )
+        assert res.status_code == 200
+        assert [(d["name"], d["video"]) for d in res.json()] == [(f"Quad {i}!", "Digital") for i in range(3)]
+
+        listed = {d["id"]: d["name"] for d in client.get("/drones", headers=auth_headers).json()}
+        assert listed[created[4]["id"]] == "Quad 4"
+
+    def test_bulk_create_without_returning(self, client, auth_headers, monkeypatch):
+        """Test que sin INSERT ... RETURNING (MySQL) se crea igual, vía add_all"""
+        import main
+
+        monkeypatch.setattr(main, "_bulk_insert_returning", lambda: False)
+        res = client.post("/drones/bulk", json=[{"name": "A"}, {"name": "B"}], headers=auth_headers)
+        assert res.status_code == 201
+        assert [d["name"] for d in res.json()] == ["A", "B"]
+
+    def test_bulk_update_checks_ownership(self, client, auth_headers):
+        """Test que un id ajeno rechaza el lote entero sin cambiar nada"""
+        mine = client.post("/drones", json={"name": "Mine"}, headers=auth_headers).json()["id"]
+        other = self._other_headers(client)
+        theirs = client.post("/drones", json={"name": "Theirs"}, headers=other).json()["id"]
+
+        res = client.put(
+            "/drones/bulk",
+            json=[{"id": mine, "name": "Changed"}, {"id": theirs, "name": "Stolen"}],
+            headers=auth_headers,
+        )
+        assert res.status_code == 404
+        assert client.get(f"/drones/{mine}", headers=auth_headers).json()["name"] == "Mine"
+        assert client.get(f"/drones/{theirs}", headers=other).json()["name"] == "Theirs"
+
+    def test_bulk_delete(self, client, auth_headers, dumps_dir, test_engine):
+        """Test que se borran drones con sus dumps y los blobs sin referencias"""
+        from sqlalchemy import select
+        from sqlalchemy.orm import Session
+
+        from models import DroneDump, DumpBlob
+        from test_dumps import _sweep_files
+
+        ids = [d["id"] for d in client.post(
+            "/drones/bulk", json=[{"name": f"Quad {i}"} for i in range(3)], headers=auth_headers
+        ).json()]
+        for drone_id, content in zip(ids, (b"set a = 1\n", b"set a = 1\n", b"set b = 2\n")):
+            client.post(
+                "/dumps",
+                data={"drone_id": str(drone_id)},
+                files={"file": ("dump.txt", content, "text/plain")},
+                headers=auth_headers,
+            )
+
+        res = client.request("DELETE", "/drones/bulk", json={"ids": ids[:2]}, headers=auth_headers)
+        assert res.status_code == 204
+        _sweep_files()
+
+        assert [d["id"] for d in client.get("/drones", headers=auth_headers).json()] == [ids[2]]
+        with Session(test_engine) as session:
+            assert [d.drone_id for d in session.scalars(select(DroneDump))] == [ids[2]]
+            assert session.scalar(select(DumpBlob.ref_count)) == 1
+        assert len([f for f in (dumps_dir / "blobs").rglob("*") if f.is_file()]) == 1
+
+    def test_bulk_limits(self, client, auth_headers, monkeypatch):
+        """Test que se rechazan lotes demasiado grandes e ids repetidos"""
+        import main
+
+        monkeypatch.setattr(main, "MAX_BULK_DRONES", 2)
+        res = client.post("/drones/bulk", json=[{"name": "x"}] * 3, headers=auth_headers)
+        assert res.status_code == 400
+
+        drone_id = client.post("/drones", json={"name": "Quad"}, headers=auth_headers).json()["id"]
+        res = client.request("DELETE", "/drones/bulk", json={"ids": [drone_id, drone_id]}, headers=auth_headers)
+        assert res.status_code == 400
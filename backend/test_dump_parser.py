@@ -0,0 +1,148 @@
+import gzip
+import io
+import lzma
+import zipfile
+
+import pytest
+
+from dump_parser import DumpError, detect_format, extract_structured, parse_betaflight_like, parse_dump_file, zstandard
+from test_dumps import SAMPLE_DUMP
+
+
+def _variants(tmp_path, payload: bytes):
+    plain = tmp_path / "dump.txt"
+    plain.write_bytes(payload)
+
+    gz = tmp_path / "dump.gz"
+    gz.write_bytes(gzip.compress(payload))
+
+    zp = tmp_path / "dump.zip"
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("diff.txt", payload)
+    zp.write_bytes(buf.getvalue())
+
+    xz = tmp_path / "dump.xz"
+    xz.write_bytes(lzma.compress(payload))
+
+    variants = [(plain, ".txt"), (gz, ".gz"), (zp, ".zip"), (xz, ".xz")]
+    if zstandard is not None:
+        zst = tmp_path / "dump.zst"
+        zst.write_bytes(zstandard.ZstdCompressor().compress(payload))
+        variants.append((zst, ".zst"))
+    return variants
+
+
+class TestStreamingParser:
+    """Tests para el parser en streaming"""
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            SAMPLE_DUMP,
+            SAMPLE_DUMP.replace(b"\n", b"\r\n"),
+            SAMPLE_DUMP.replace(b"\n", b"\r"),
+            b"set a = 1\x0cset b = 2\n\n\nfeature GPS\xe2\x80\xa8aux 0 0\n",
+            b"set name = \xff\xfe invalid utf-8\nset x = \xc3\xb1\n",
+            b"",
+        ],
+    )
+    def test_same_result_as_full_text(self, tmp_path, payload):
+        """Test que el parseo en streaming da el mismo dict que el parseo del texto completo"""
+        expected = parse_betaflight_like(payload.decode("utf-8", errors="replace"))
+        for path, ext in _variants(tmp_path, payload):
+            assert parse_dump_file(path, ext, 1024 * 1024) == expected
+
+    def test_multibyte_across_buffer_boundary(self, tmp_path):
+        """Test que un carácter UTF-8 partido entre buffers se decodifica bien"""
+        line = "set name = " + "ñ" * 100_000 + "\n"
+        payload = ("# version\n" + line * 3).encode("utf-8")
+        expected = parse_betaflight_like(payload.decode("utf-8"))
+        for path, ext in _variants(tmp_path, payload):
+            assert parse_dump_file(path, ext, 10 * 1024 * 1024) == expected
+
+    def test_other_commands_capped(self, tmp_path):
+        """Test que other_commands se corta a 800 pero las estadísticas cuentan todo"""
+        payload = b"feature GPS\n" * 1000
+        path = tmp_path / "dump.txt"
+        path.write_bytes(payload)
+        parsed = parse_dump_file(path, ".txt", 1024 * 1024)
+        assert len(parsed["other_commands"]) == 800
+        assert parsed["stats"]["recognized"] == 1000
+
+    def test_decompressed_limit(self, tmp_path):
+        """Test que se corta al superar el límite descomprimido (gzip bomb)"""
+        for path, ext in _variants(tmp_path, b"set a = 1\n" * 10_000):
+            with pytest.raises(DumpError) as exc:
+                parse_dump_file(path, ext, 1000)
+            assert exc.value.status_code == 413
+
+    def test_invalid_archives(self, tmp_path):
+        """Test que un .gz/.zip/.xz/.zst corrupto devuelve 400"""
+        for ext in (".gz", ".zip", ".xz", ".zst"):
+            path = tmp_path / f"bad{ext}"
+            path.write_bytes(b"definitely not compressed")
+            with pytest.raises(DumpError) as exc:
+                parse_dump_file(path, ext, 1024)
+            assert exc.value.status_code == 400
+
+
+    def test_truncated_archive(self, tmp_path):
+        """Test que un gzip cortado a medias da 400 aunque la cabecera sea buena"""
+        path = tmp_path / "cut.gz"
+        path.write_bytes(gzip.compress(SAMPLE_DUMP * 100)[:200])
+        with pytest.raises(DumpError) as exc:
+            parse_dump_file(path, ".gz", 1024 * 1024)
+        assert (exc.value.status_code, exc.value.detail) == (400, "Invalid gzip dump")
+
+
+class TestFormatDetection:
+    """Tests para la detección del formato por magic bytes"""
+
+    def test_detect_format(self, tmp_path):
+        """Test que el formato sale de la cabecera, no del nombre"""
+        expected = {".txt": "plain", ".gz": "gzip", ".zip": "zip", ".xz": "xz", ".zst": "zstd"}
+        for path, ext in _variants(tmp_path, SAMPLE_DUMP):
+            renamed = path.rename(tmp_path / f"{path.name}.bin")
+            assert detect_format(renamed) == expected[ext]
+
+    def test_compressed_with_plain_extension(self, tmp_path):
+        """Test que un gzip subido como .txt se descomprime"""
+        path = tmp_path / "dump.txt"
+        path.write_bytes(gzip.compress(SAMPLE_DUMP))
+        assert parse_dump_file(path, ".txt", 1024 * 1024) == parse_betaflight_like(SAMPLE_DUMP.decode())
+
+    def test_extension_mismatch(self, tmp_path):
+        """Test que un .zip que en realidad es gzip se rechaza"""
+        path = tmp_path / "dump.zip"
+        path.write_bytes(gzip.compress(SAMPLE_DUMP))
+        with pytest.raises(DumpError) as exc:
+            parse_dump_file(path, ".zip", 1024 * 1024)
+        assert (exc.value.status_code, exc.value.detail) == (400, "Invalid zip dump")
+
+
+class TestExtractStructured:
+    """Tests para la conversión a filas de tablas"""
+
+    def test_rows(self):
+        """Test que se separan clave/valor, scopes, resources, aux y features"""
+        parsed = parse_betaflight_like(
+            "set gyro_lpf1_static_hz = 250\n"
+            "set name = My Quad\n"
+            "profile 2\nset p_roll = 45\n"
+            "resource MOTOR 1 B06\nresource BEEPER 1 NONE\n"
+            "aux 0 0 0 1700 2100 0 0\naux 1 1 1 900 1300\n"
+            "feature -RX_PARALLEL_PWM\nfeature GPS\n"
+        )
+        rows = extract_structured(parsed)
+
+        assert rows["settings"] == [
+            {"scope": "global", "scope_index": None, "key": "gyro_lpf1_static_hz", "value": "250", "value_num": 250.0},
+            {"scope": "global", "scope_index": None, "key": "name", "value": "My Quad", "value_num": None},
+            {"scope": "profile", "scope_index": 2, "key": "p_roll", "value": "45", "value_num": 45.0},
+        ]
+        assert [r["pin"] for r in rows["resources"]] == ["B06", "NONE"]
+        assert rows["aux"][1] == {
+            "slot": 1, "mode_id": 1, "channel": 1, "range_low": 900, "range_high": 1300, "logic": None, "linked_to": None,
+        }
+        assert rows["features"] == [{"name": "RX_PARALLEL_PWM", "enabled": False}, {"name": "GPS", "enabled": True}]
@@ -0,0 +1,687 @@
+from datetime import datetime, timedelta
+
+import anyio
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import DumpBlob, DumpParseCache, DumpSetting, FileTombstone
+
+
+SAMPLE_DUMP = b"""# version
+# Betaflight / STM32F405 (S405) 4.4.2 Jun  9 2023 / 02:34:06 (c2cb6c5da) MSP API: 1.45
+# board: manufacturer_id: MTKS, board_name: MATEKF405
+resource MOTOR 1 B06
+aux 0 0 0 1700 2100 0 0
+feature GPS
+set gyro_lpf1_static_hz = 250
+profile 1
+set p_pitch = 47
+rateprofile 2
+set roll_rc_rate = 7
+"""
+
+
+@pytest.fixture
+def drone_id(client, auth_headers):
+    res = client.post("/drones", json={"name": "Quad"}, headers=auth_headers)
+    assert res.status_code == 201
+    return res.json()["id"]
+
+
+def _sweep_files(now=None):
+    """Pasa el barrido de borrados pendientes ya (sin esperar a la tarea de fondo)."""
+    import main
+
+    return anyio.run(main._sweep_tombstones, now)
+
+
+def _upload(client, auth_headers, drone_id, content=SAMPLE_DUMP, filename="diff.txt"):
+    res = client.post(
+        "/dumps",
+        data={"drone_id": str(drone_id)},
+        files={"file": (filename, content, "text/plain")},
+        headers=auth_headers,
+    )
+    assert res.status_code == 201
+    return res.json()
+
+
+class TestParseCache:
+    """Tests para la caché de parseo de dumps"""
+
+    def test_parse_fills_cache(self, client, auth_headers, dumps_dir, drone_id, test_engine):
+        """Test que el primer parseo guarda el resultado en BD"""
+        dump = _upload(client, auth_headers, drone_id)
+
+        res = client.get(f"/drones/{drone_id}/dumps/{dump['id']}/parse", headers=auth_headers)
+        assert res.status_code == 200
+        assert res.json()["parsed"]["settings"]["profiles"] == {"1": ["set p_pitch = 47"]}
+        assert res.headers["etag"]
+
+        with Session(test_engine) as session:
+            rows = session.scalars(select(DumpParseCache)).all()
+            assert [r.dump_id for r in rows] == [dump["id"]]
+
+    def test_parse_served_from_cache(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que un parseo cacheado no vuelve a leer el fichero"""
+        dump = _upload(client, auth_headers, drone_id)
+        url = f"/drones/{drone_id}/dumps/{dump['id']}/parse"
+        first = client.get(url, headers=auth_headers)
+
+        for f in dumps_dir.rglob("*"):
+            if f.is_file():
+                f.unlink()
+
+        second = client.get(url, headers=auth_headers)
+        assert second.status_code == 200
+        assert second.json() == first.json()
+
+    def test_parse_if_none_match(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que If-None-Match con el ETag actual devuelve 304"""
+        dump = _upload(client, auth_headers, drone_id)
+        url = f"/drones/{drone_id}/dumps/{dump['id']}/parse"
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+
+        res = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert res.status_code == 304
+        assert res.content == b""
+
+        # Editar el dron cambia la respuesta, así que cambia el ETag
+        client.put(f"/drones/{drone_id}", json={"name": "Renamed"}, headers=auth_headers)
+        res = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["etag"] != etag
+
+    def test_delete_dump_invalidates_cache(self, client, auth_headers, dumps_dir, drone_id, test_engine):
+        """Test que borrar el dump o el dron borra su caché"""
+        d1 = _upload(client, auth_headers, drone_id)
+        d2 = _upload(client, auth_headers, drone_id)
+        for d in (d1, d2):
+            client.get(f"/drones/{drone_id}/dumps/{d['id']}/parse", headers=auth_headers)
+
+        assert client.delete(f"/drones/{drone_id}/dumps/{d1['id']}", headers=auth_headers).status_code == 204
+        with Session(test_engine) as session:
+            assert [r.dump_id for r in session.scalars(select(DumpParseCache))] == [d2["id"]]
+
+        assert client.delete(f"/drones/{drone_id}", headers=auth_headers).status_code == 204
+        with Session(test_engine) as session:
+            assert session.scalars(select(DumpParseCache)).all() == []
+
+
+def _parse_slowly(file_path, ext, max_bytes):
+    """Parser para los workers de los tests (importable desde el hijo): 'hung*' no termina."""
+    import time
+
+    from dump_parser import parse_dump_file
+
+    time.sleep(3600 if file_path.name.startswith("hung") else 2)
+    return parse_dump_file(file_path, ext, max_bytes)
+
+
+class TestParseService:
+    """Tests para el servicio de parseo en procesos"""
+
+    def test_parse_in_process_pool(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que el parseo se hace en el pool de procesos y da el mismo resultado"""
+        from parse_service import ParseService
+
+        dump = _upload(client, auth_headers, drone_id)
+        service = ParseService(workers=1, max_pending=2, timeout_s=60)
+        monkeypatch.setattr("main.parse_service", service)
+        try:
+            res = client.get(f"/drones/{drone_id}/dumps/{dump['id']}/parse", headers=auth_headers)
+            assert service._executor is not None
+        finally:
+            service.shutdown()
+
+        assert res.status_code == 200
+        assert res.json()["parsed"]["settings"]["global"] == ["set gyro_lpf1_static_hz = 250"]
+
+    def test_saturated_returns_503(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que con la cola llena se responde 503 con Retry-After"""
+        from parse_service import ParseService
+
+        dump = _upload(client, auth_headers, drone_id)
+        service = ParseService(workers=0, max_pending=1, retry_after_s=7)
+        service.pending = 1  # simula un trabajo en curso
+        monkeypatch.setattr("main.parse_service", service)
+
+        res = client.get(f"/drones/{drone_id}/dumps/{dump['id']}/parse", headers=auth_headers)
+        assert res.status_code == 503
+        assert res.headers["retry-after"] == "7"
+
+    def test_timeout_returns_504(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que un parseo que supera el timeout devuelve 504"""
+        import time
+        from parse_service import ParseService
+
+        def _slow(*args):
+            time.sleep(0.5)
+            return {}
+
+        dump = _upload(client, auth_headers, drone_id)
+        monkeypatch.setattr("main.parse_service", ParseService(workers=0, timeout_s=0.05))
+        monkeypatch.setattr("parse_service.parse_dump_file", _slow)
+
+        res = client.get(f"/drones/{drone_id}/dumps/{dump['id']}/parse", headers=auth_headers)
+        assert res.status_code == 504
+
+    def test_timeout_kills_worker_process(self, tmp_path, monkeypatch):
+        """Test que tras un 504 no queda el proceso hijo colgado"""
+        import os
+        import time
+
+        from fastapi import HTTPException
+        from parse_service import ParseService
+
+        # Abrir un FIFO sin escritor bloquea el hijo para siempre
+        fifo = tmp_path / "hung.txt"
+        os.mkfifo(fifo)
+        service = ParseService(workers=1, timeout_s=2)
+        workers = []
+        discard = service._discard_executor
+
+        def _spy(executor):
+            workers.extend(executor._processes.values())
+            discard(executor)
+
+        monkeypatch.setattr(service, "_discard_executor", _spy)
+        try:
+            with pytest.raises(HTTPException) as exc:
+                anyio.run(service.parse, fifo, ".txt", 1000)
+            assert exc.value.status_code == 504
+            assert service._executor is None and service.pending == 0
+
+            assert workers
+            deadline = time.monotonic() + 10
+            while any(p.is_alive() for p in workers) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert not any(p.is_alive() for p in workers)
+        finally:
+            service.shutdown()
+
+    def test_timeout_retries_collateral_jobs(self, tmp_path, monkeypatch):
+        """Test que un trabajo sano que estaba en el pool matado por un timeout se repite y sale bien"""
+        import asyncio
+
+        from fastapi import HTTPException
+        from parse_service import ParseService
+
+        hung = tmp_path / "hung.txt"
+        ok = tmp_path / "ok.txt"
+        for path in (hung, ok):
+            path.write_bytes(SAMPLE_DUMP)
+        monkeypatch.setattr("parse_service.parse_dump_file", _parse_slowly)
+        service = ParseService(workers=2, timeout_s=4)
+
+        async def _both():
+            stuck = asyncio.ensure_future(service.parse(hung, ".txt", 10**6))
+            # El sano entra en el pool justo antes de que el colgado agote su timeout
+            await asyncio.sleep(3)
+            healthy = await service.parse(ok, ".txt", 10**6)
+            with pytest.raises(HTTPException) as exc:
+                await stuck
+            return healthy, exc.value.status_code
+
+        try:
+            healthy, stuck_status = asyncio.run(_both())
+        finally:
+            service.shutdown()
+
+        assert stuck_status == 504
+        assert healthy["settings"]["global"] == ["set gyro_lpf1_static_hz = 250"]
+        assert service.pending == 0
+
+    def test_invalid_dump_maps_to_http_error(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que un .gz corrupto devuelve 400 a través del servicio"""
+        dump = _upload(client, auth_headers, drone_id, content=b"not gzip", filename="diff.gz")
+        res = client.get(f"/drones/{drone_id}/dumps/{dump['id']}/parse", headers=auth_headers)
+        assert res.status_code == 400
+        assert res.json()["detail"] == "Invalid gzip dump"
+
+
+def _wait_status(client, auth_headers, dump_id, expected, timeout_s=10.0):
+    import time
+
+    deadline = time.monotonic() + timeout_s
+    while True:
+        body = client.get(f"/dumps/{dump_id}/status", headers=auth_headers).json()
+        if body["status"] in expected or time.monotonic() > deadline:
+            return body
+        time.sleep(0.05)
+
+
+class TestParseOnUpload:
+    """Tests para el parseo en segundo plano al subir"""
+
+    def test_upload_parses_in_background(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que tras subir el dump queda ready y /parse no vuelve a parsear"""
+        dump = _upload(client, auth_headers, drone_id)
+        body = _wait_status(client, auth_headers, dump["id"], {"ready", "failed"})
+        assert body == {"dump_id": dump["id"], "status": "ready", "error": None}
+
+        async def _no_parse(*args):
+            raise AssertionError("should be served from cache")
+
+        monkeypatch.setattr("main.parse_service.parse", _no_parse)
+        res = client.get(f"/drones/{drone_id}/dumps/{dump['id']}/parse", headers=auth_headers)
+        assert res.status_code == 200
+        assert res.json()["parsed"]["meta"]["board"].startswith("# board")
+
+    def test_invalid_dump_fails(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que un dump corrupto queda failed con el motivo"""
+        dump = _upload(client, auth_headers, drone_id, content=b"not a zip", filename="diff.zip")
+        body = _wait_status(client, auth_headers, dump["id"], {"ready", "failed"})
+        assert body["status"] == "failed"
+        assert body["error"] == "Invalid zip dump"
+
+    def test_unexpected_error_fails(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que un error no previsto (p. ej. de BD al guardar) deja el trabajo failed, no parsing"""
+        def _broken_save(*args):
+            raise RuntimeError("database is gone")
+
+        monkeypatch.setattr("main._save_parse_result", _broken_save)
+        dump = _upload(client, auth_headers, drone_id)
+        body = _wait_status(client, auth_headers, dump["id"], {"ready", "failed"})
+        assert body["status"] == "failed"
+        assert body["error"] == "Unexpected error while parsing dump"
+
+    def test_status_requires_owner(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que el estado de un dump ajeno da 404"""
+        dump = _upload(client, auth_headers, drone_id)
+        creds = {"email": "other@example.com", "password": "SecurePass123"}  # pragma: allowlist secret
+        client.post("/auth/register", json=creds)
+        token = client.post("/auth/login", json=creds).json()["access_token"]
+
+        res = client.get(f"/dumps/{dump['id']}/status", headers={"Authorization": f"Bearer {token}"})
+        assert res.status_code == 404
+
+
+class TestStructuredSettings:
+    """Tests para la configuración parseada en tablas"""
+
+    def test_settings_sections(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que el dump se indexa en settings/resources/aux/features"""
+        dump = _upload(client, auth_headers, drone_id)
+        res = client.get(f"/drones/{drone_id}/dumps/{dump['id']}/settings", headers=auth_headers)
+        assert res.status_code == 200
+        body = res.json()
+
+        assert {"scope": "global", "scope_index": None, "key": "gyro_lpf1_static_hz", "value": "250"} in body["settings"]
+        assert body["resources"] == [{"function": "MOTOR", "resource_index": 1, "pin": "B06"}]
+        assert body["aux"][0]["range_low"] == 1700
+        assert body["features"] == [{"name": "GPS", "enabled": True}]
+
+    def test_settings_scope_filter(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que se puede pedir sólo un profile"""
+        dump = _upload(client, auth_headers, drone_id)
+        res = client.get(
+            f"/drones/{drone_id}/dumps/{dump['id']}/settings",
+            params={"scope": "profile", "scope_index": 1},
+            headers=auth_headers,
+        )
+        assert res.json()["settings"] == [{"scope": "profile", "scope_index": 1, "key": "p_pitch", "value": "47"}]
+
+    def test_search_numeric(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que la búsqueda compara numéricamente entre dumps del usuario"""
+        high = _upload(client, auth_headers, drone_id)
+        low = _upload(client, auth_headers, drone_id, content=SAMPLE_DUMP.replace(b"= 250", b"= 150"))
+        for d in (high, low):
+            client.get(f"/drones/{drone_id}/dumps/{d['id']}/settings", headers=auth_headers)
+
+        res = client.get(
+            "/dumps/settings/search",
+            params={"key": "gyro_lpf1_static_hz", "op": "gt", "value": "200"},
+            headers=auth_headers,
+        )
+        assert res.status_code == 200
+        assert [x["dump"]["id"] for x in res.json()] == [high["id"]]
+
+        res = client.get("/dumps/settings/search", params={"key": "p_pitch", "op": "lt", "value": "abc"}, headers=auth_headers)
+        assert res.status_code == 400
+
+
+class TestDumpDiff:
+    """Tests para el diff entre dumps"""
+
+    def test_diff_only_changes(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que el diff devuelve sólo lo añadido, quitado y cambiado"""
+        a = _upload(client, auth_headers, drone_id)
+        changed = (
+            SAMPLE_DUMP.replace(b"= 250", b"= 300")
+            .replace(b"feature GPS\n", b"feature -GPS\nfeature TELEMETRY\n")
+            .replace(b"resource MOTOR 1 B06\n", b"")
+        )
+        b = _upload(client, auth_headers, drone_id, content=changed)
+
+        res = client.get(f"/drones/{drone_id}/dumps/{a['id']}/diff/{b['id']}", headers=auth_headers)
+        assert res.status_code == 200
+        body = res.json()
+
+        assert body["a"]["id"] == a["id"] and body["b"]["id"] == b["id"]
+        assert body["settings"] == {
+            "added": [],
+            "removed": [],
+            "changed": [{"scope": "global", "scope_index": None, "key": "gyro_lpf1_static_hz", "from": "250", "to": "300"}],
+        }
+        assert body["resources"]["removed"] == [{"function": "MOTOR", "resource_index": 1, "value": "B06"}]
+        assert body["features"]["added"] == [{"name": "TELEMETRY", "value": True}]
+        assert body["features"]["changed"] == [{"name": "GPS", "from": True, "to": False}]
+        assert body["aux"] == {"added": [], "removed": [], "changed": []}
+        assert body["summary"] == {"added": 1, "removed": 1, "changed": 2}
+
+    def test_diff_named_profiles(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que los perfiles con nombre no numérico no se pisan entre sí"""
+        named = b"profile race\nset p_pitch = 47\nprofile cine\nset p_pitch = 30\n"
+        a = _upload(client, auth_headers, drone_id, content=named)
+        b = _upload(client, auth_headers, drone_id, content=named.replace(b"= 30", b"= 35"))
+
+        res = client.get(f"/drones/{drone_id}/dumps/{a['id']}/diff/{b['id']}", headers=auth_headers)
+        assert res.status_code == 200
+        assert res.json()["settings"] == {
+            "added": [],
+            "removed": [],
+            "changed": [{"scope": "profile", "scope_index": "cine", "key": "p_pitch", "from": "30", "to": "35"}],
+        }
+
+    def test_diff_other_drone_404(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que no se puede comparar con un dump de otro dron"""
+        a = _upload(client, auth_headers, drone_id)
+        other = client.post("/drones", json={"name": "Other"}, headers=auth_headers).json()["id"]
+        b = _upload(client, auth_headers, other)
+
+        res = client.get(f"/drones/{drone_id}/dumps/{a['id']}/diff/{b['id']}", headers=auth_headers)
+        assert res.status_code == 404
+
+
+class TestContentDedup:
+    """Tests para el almacén de dumps por contenido (sha256)"""
+
+    def _blob_files(self, dumps_dir):
+        return [f for f in (dumps_dir / "blobs").rglob("*") if f.is_file()]
+
+    def test_identical_uploads_share_blob(self, client, auth_headers, dumps_dir, drone_id, test_engine, monkeypatch):
+        """Test que dos subidas idénticas usan un único fichero y no se re-parsean"""
+        a = _upload(client, auth_headers, drone_id)
+        assert _wait_status(client, auth_headers, a["id"], {"ready", "failed"})["status"] == "ready"
+
+        async def _no_parse(*args):
+            raise AssertionError("identical content must not be parsed again")
+
+        monkeypatch.setattr("main.parse_service.parse", _no_parse)
+        other = client.post("/drones", json={"name": "Other"}, headers=auth_headers).json()["id"]
+        b = _upload(client, auth_headers, other)
+
+        assert b["content_sha256"] == a["content_sha256"]
+        assert client.get(f"/dumps/{b['id']}/status", headers=auth_headers).json()["status"] == "ready"
+        assert len(self._blob_files(dumps_dir)) == 1
+
+        with Session(test_engine) as session:
+            blob = session.get(DumpBlob, a["content_sha256"])
+            assert blob.ref_count == 2
+            assert session.scalars(select(DumpSetting.dump_id).distinct()).all() == [a["id"], b["id"]]
+
+        res = client.get(f"/drones/{other}/dumps/{b['id']}/parse", headers=auth_headers)
+        assert res.status_code == 200
+        assert res.json()["parsed"]["settings"]["profiles"] == {"1": ["set p_pitch = 47"]}
+
+    def test_blob_removed_with_last_reference(self, client, auth_headers, dumps_dir, drone_id, test_engine):
+        """Test que el fichero sólo se borra cuando se va la última referencia"""
+        a = _upload(client, auth_headers, drone_id)
+        other = client.post("/drones", json={"name": "Other"}, headers=auth_headers).json()["id"]
+        b = _upload(client, auth_headers, other)
+
+        res = client.delete(f"/drones/{drone_id}/dumps/{a['id']}", headers=auth_headers)
+        assert res.status_code == 204
+        _sweep_files()
+        assert len(self._blob_files(dumps_dir)) == 1
+
+        res = client.delete(f"/drones/{other}", headers=auth_headers)
+        assert res.status_code == 204
+        _sweep_files()
+        assert self._blob_files(dumps_dir) == []
+
+        with Session(test_engine) as session:
+            assert session.get(DumpBlob, b["content_sha256"]) is None
+
+
+class TestRawDownload:
+    """Tests para la descarga del fichero original"""
+
+    def test_download_full(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que la descarga devuelve los bytes subidos"""
+        dump = _upload(client, auth_headers, drone_id)
+
+        res = client.get(f"/drones/{drone_id}/dumps/{dump['id']}/raw", headers=auth_headers)
+        assert res.status_code == 200
+        assert res.content == SAMPLE_DUMP
+        assert res.headers["accept-ranges"] == "bytes"
+        assert "diff.txt" in res.headers["content-disposition"]
+
+    def test_download_range(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que Range devuelve 206 sólo con el trozo pedido, sin comprimir"""
+        dump = _upload(client, auth_headers, drone_id)
+
+        res = client.get(
+            f"/drones/{drone_id}/dumps/{dump['id']}/raw",
+            headers={**auth_headers, "Range": "bytes=0-8", "Accept-Encoding": "gzip"},
+        )
+        assert res.status_code == 206
+        assert res.content == SAMPLE_DUMP[:9]
+        assert res.headers["content-range"] == f"bytes 0-8/{len(SAMPLE_DUMP)}"
+        assert "content-encoding" not in res.headers
+
+    def test_download_if_none_match(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que If-None-Match con el ETag actual devuelve 304"""
+        dump = _upload(client, auth_headers, drone_id)
+        url = f"/drones/{drone_id}/dumps/{dump['id']}/raw"
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+
+        res = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert res.status_code == 304
+
+    def test_download_decompressed(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que decompress=true descomprime un .gz al vuelo"""
+        import gzip
+
+        dump = _upload(client, auth_headers, drone_id, content=gzip.compress(SAMPLE_DUMP), filename="diff.txt.gz")
+        url = f"/drones/{drone_id}/dumps/{dump['id']}/raw"
+
+        raw = client.get(url, headers=auth_headers)
+        assert gzip.decompress(raw.content) == SAMPLE_DUMP
+
+        res = client.get(url, params={"decompress": "true"}, headers=auth_headers)
+        assert res.status_code == 200
+        assert res.content == SAMPLE_DUMP
+        assert 'filename="diff.txt"' in res.headers["content-disposition"]
+        assert res.headers["etag"] != raw.headers["etag"]
+
+    def test_download_decompressed_non_ascii_name(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que un nombre no ASCII va en filename* (RFC 5987) con respaldo ASCII"""
+        import gzip
+        from urllib.parse import unquote
+
+        dump = _upload(client, auth_headers, drone_id, content=gzip.compress(SAMPLE_DUMP), filename="配置.gz")
+
+        res = client.get(
+            f"/drones/{drone_id}/dumps/{dump['id']}/raw", params={"decompress": "true"}, headers=auth_headers
+        )
+        assert res.status_code == 200
+        assert res.content == SAMPLE_DUMP
+        disposition = res.headers["content-disposition"]
+        assert disposition.isascii()
+        assert 'filename="__.txt"' in disposition
+        assert unquote(disposition.split("filename*=UTF-8''")[1]) == "配置.txt"
+
+    def test_download_requires_owner(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que otro usuario no puede descargar el dump"""
+        dump = _upload(client, auth_headers, drone_id)
+        creds = {"email": "other@example.com", "password": "SecurePass123"}  # pragma: allowlist secret
+        client.post("/auth/register", json=creds)
+        token = client.post("/auth/login", json=creds).json()["access_token"]
+
+        res = client.get(
+            f"/drones/{drone_id}/dumps/{dump['id']}/raw",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert res.status_code == 404
+
+
+class TestNonBlockingUpload:
+    """Tests para subidas sin bloquear el event loop"""
+
+    def test_writes_run_in_io_pool(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que la escritura a disco va por el pool de I/O de subidas"""
+        import threading
+
+        import main
+
+        threads = []
+        original = main._write_chunk
+
+        def _spy(out, digest, chunk):
+            threads.append(threading.current_thread().name)
+            return original(out, digest, chunk)
+
+        monkeypatch.setattr(main, "_write_chunk", _spy)
+        _upload(client, auth_headers, drone_id)
+        assert threads and all(t.startswith("upload-io") for t in threads)
+
+    def test_no_db_connection_while_receiving(
+        self, client, auth_headers, dumps_dir, drone_id, test_async_engine, monkeypatch
+    ):
+        """Test que mientras se recibe el fichero no hay ninguna conexión async prestada"""
+        from sqlalchemy import event
+
+        import main
+
+        checked_out = []
+        pool = test_async_engine.sync_engine.pool
+        event.listen(pool, "checkout", lambda *args: checked_out.append(1))
+        event.listen(pool, "checkin", lambda *args: checked_out.pop())
+
+        during_receive = []
+        original = main._write_chunk
+
+        def _spy(out, digest, chunk):
+            during_receive.append(len(checked_out))
+            return original(out, digest, chunk)
+
+        monkeypatch.setattr(main, "_write_chunk", _spy)
+        _upload(client, auth_headers, drone_id)
+        assert during_receive and set(during_receive) == {0}
+
+    def test_slow_disk_does_not_delay_health(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que una subida con disco lento no retrasa /health"""
+        import threading
+        import time
+
+        import main
+
+        writing = threading.Event()
+        original = main._write_chunk
+
+        def _slow_write(out, digest, chunk):
+            writing.set()
+            time.sleep(0.5)
+            return original(out, digest, chunk)
+
+        monkeypatch.setattr(main, "_write_chunk", _slow_write)
+        uploader = threading.Thread(target=_upload, args=(client, auth_headers, drone_id))
+        uploader.start()
+        try:
+            assert writing.wait(5)
+            latencies = []
+            for _ in range(5):
+                started = time.perf_counter()
+                assert client.get("/health").status_code == 200
+                latencies.append(time.perf_counter() - started)
+        finally:
+            uploader.join()
+
+        # Con la escritura en el event loop, /health esperaría los 0.5 s del disco
+        assert max(latencies) < 0.25
+
+
+class TestFileSweeper:
+    """Tests para el borrado de ficheros en segundo plano (tombstones)"""
+
+    def _blob_files(self, dumps_dir):
+        return [f for f in (dumps_dir / "blobs").rglob("*") if f.is_file()]
+
+    def test_delete_queues_tombstone(self, client, auth_headers, dumps_dir, drone_id, test_engine):
+        """Test que el DELETE responde sin tocar el disco y el barrido borra después"""
+        dump = _upload(client, auth_headers, drone_id)
+        _wait_status(client, auth_headers, dump["id"], {"ready", "failed"})
+
+        res = client.delete(f"/drones/{drone_id}/dumps/{dump['id']}", headers=auth_headers)
+        assert res.status_code == 204
+        _sweep_files()
+
+        assert self._blob_files(dumps_dir) == []
+        with Session(test_engine) as session:
+            assert session.scalars(select(FileTombstone)).all() == []
+
+    def test_failed_delete_is_retried(self, client, auth_headers, dumps_dir, drone_id, test_engine, monkeypatch):
+        """Test que si el disco falla el tombstone se queda, con reintento más tarde"""
+        import main
+
+        dump = _upload(client, auth_headers, drone_id)
+        _wait_status(client, auth_headers, dump["id"], {"ready", "failed"})
+
+        def _locked(target):
+            raise PermissionError("file in use")
+
+        original = main._remove_path
+        monkeypatch.setattr(main, "_wake_file_sweeper", lambda: None)
+        monkeypatch.setattr(main, "_remove_path", _locked)
+        client.delete(f"/drones/{drone_id}/dumps/{dump['id']}", headers=auth_headers)
+        _sweep_files()
+
+        with Session(test_engine) as session:
+            tomb = session.scalars(select(FileTombstone)).one()
+            assert (tomb.attempts, tomb.last_error) == (1, "file in use")
+            retry_at = tomb.next_attempt_at
+        assert retry_at > datetime.utcnow()
+        assert len(self._blob_files(dumps_dir)) == 1
+
+        monkeypatch.setattr(main, "_remove_path", original)
+        assert _sweep_files() == 0  # todavía no toca
+        assert _sweep_files(retry_at) == 1
+        assert self._blob_files(dumps_dir) == []
+
+    def test_reupload_cancels_pending_delete(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que volver a subir el mismo contenido antes del barrido conserva el fichero"""
+        import main
+
+        monkeypatch.setattr(main, "_wake_file_sweeper", lambda: None)
+        a = _upload(client, auth_headers, drone_id)
+        _wait_status(client, auth_headers, a["id"], {"ready", "failed"})
+        client.delete(f"/drones/{drone_id}/dumps/{a['id']}", headers=auth_headers)
+
+        b = _upload(client, auth_headers, drone_id)
+        _sweep_files()
+
+        assert len(self._blob_files(dumps_dir)) == 1
+        res = client.get(f"/drones/{drone_id}/dumps/{b['id']}/raw", headers=auth_headers)
+        assert res.content == SAMPLE_DUMP
+
+    def test_reconcile_orphans(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que la reconciliación encola lo que ninguna fila referencia"""
+        import main
+
+        kept = _upload(client, auth_headers, drone_id)
+        _wait_status(client, auth_headers, kept["id"], {"ready", "failed"})
+        (dumps_dir / "drone_999").mkdir()
+        (dumps_dir / "drone_999" / "old.txt").write_bytes(b"set a = 1\n")
+        (dumps_dir / "blobs" / "ff").mkdir()
+        (dumps_dir / "blobs" / "ff" / ("f" * 64)).write_bytes(b"orphan")
+
+        later = datetime.utcnow() + timedelta(seconds=main.FILE_RECONCILE_GRACE_S + 60)
+        assert anyio.run(main._reconcile_files, later) == 2
+        assert _sweep_files() == 2
+
+        assert not (dumps_dir / "drone_999").exists()
+        assert not (dumps_dir / "blobs" / "ff").exists()
+        assert len(self._blob_files(dumps_dir)) == 1
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import fast_json
+from dump_parser import parse_betaflight_like
+from test_dumps import SAMPLE_DUMP, _upload, _wait_status
+
+
+def _parsed_sample() -> dict:
+    # Dump grande: muchos settings y comandos sueltos, con algún carácter no ASCII
+    extra = "".join(f"set key_{i} = {i}\n" for i in range(2000))
+    extra += "".join(f"serial {i} 64 115200 57600 0 115200\n" for i in range(800))
+    extra += "# name: Ñandú ⚡\n"
+    return parse_betaflight_like(SAMPLE_DUMP.decode() + extra)
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "stdlib"])
+def fast_mode(request, monkeypatch):
+    """Ejecuta cada test con orjson y con el fallback de json estándar."""
+    monkeypatch.setattr(fast_json, "FAST_JSON", request.param)
+    return request.param
+
+
+class TestFastJsonEquivalence:
+    """Tests de equivalencia con JSONResponse + jsonable_encoder"""
+
+    def test_parsed_dump_same_bytes(self, fast_mode):
+        """Test que un parseo grande se serializa igual que JSONResponse"""
+        parsed = _parsed_sample()
+        assert fast_json.dumps(parsed) == JSONResponse(jsonable_encoder(parsed)).body
+
+    def test_feed_shapes_same_bytes(self, fast_mode):
+        """Test que los tipos de los items del feed dan los mismos bytes"""
+        items = [
+            {
+                "post": {"id": 1, "title": "Quad “freestyle”", "public_note": None, "is_public": True},
+                "owner": {"handle": "pi…"},
+                "drone": {"id": 7, "name": "Ñandú", "comment": "línea\nnueva \"comillas\" \\"},
+                "dumps": [{"id": 3, "bytes": 1024, "created_at": "2024-05-01T10:00:00"}],
+            }
+        ]
+        assert fast_json.dumps(items) == JSONResponse(items).body
+
+    def test_floats_round_trip(self, fast_mode):
+        """Test que los floats mantienen el valor (el formato puede variar: 1e-07 / 1e-7)"""
+        data = {"a": 0.1, "b": 1e-7, "c": 12345.678, "d": -0.0}
+        assert json.loads(fast_json.dumps(data)) == data
+
+    def test_encode_object_inserts_raw_values(self, fast_mode):
+        """Test que encode_object no re-codifica los valores ya codificados"""
+        parsed = _parsed_sample()
+        raw = json.dumps(parsed, ensure_ascii=False, separators=(",", ":")).encode()
+        body = fast_json.encode_object({"dump": fast_json.dumps({"id": 1}), "parsed": raw})
+        assert json.loads(body) == {"dump": {"id": 1}, "parsed": parsed}
+
+
+class TestFastJsonEndpoints:
+    """Tests de las rutas que usan la serialización rápida"""
+
+    def test_parse_dump_body(self, client, auth_headers, dumps_dir, fast_mode):
+        """Test que /parse devuelve el mismo JSON que antes (drone, dump, parsed)"""
+        drone = client.post("/drones", json={"name": "Quad"}, headers=auth_headers).json()
+        dump = _upload(client, auth_headers, drone["id"])
+        _wait_status(client, auth_headers, dump["id"], {"ready", "failed"})
+
+        res = client.get(f"/drones/{drone['id']}/dumps/{dump['id']}/parse", headers=auth_headers)
+        assert res.status_code == 200
+        assert res.headers["content-type"] == "application/json"
+        assert res.json() == {
+            "drone": drone,
+            "dump": dump,
+            "parsed": parse_betaflight_like(SAMPLE_DUMP.decode()),
+        }
+
+    def test_feed_body_and_cursor(self, client, auth_headers, fast_mode):
+        """Test que el feed mantiene cuerpo y cabecera X-Next-Cursor"""
+        for i in range(3):
+            drone_id = client.post("/drones", json={"name": f"Quad {i}"}, headers=auth_headers).json()["id"]
+            client.post("/community/posts", json={"drone_id": drone_id, "title": f"Post {i}"}, headers=auth_headers)
+
+        res = client.get("/community/feed", params={"limit": 2})
+        assert res.status_code == 200
+        assert [it["post"]["title"] for it in res.json()] == ["Post 2", "Post 1"]
+        assert res.headers["x-next-cursor"]
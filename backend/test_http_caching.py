@@ -0,0 +1,152 @@
+import gzip
+
+import pytest
+
+from compression import CompressionMiddleware, choose_encoding, strip_encoding_suffix
+from test_dumps import _upload
+
+
+@pytest.fixture
+def drone_id(client, auth_headers):
+    return client.post("/drones", json={"name": "Quad"}, headers=auth_headers).json()["id"]
+
+
+def _seed_feed(client, auth_headers, n=30):
+    for i in range(n):
+        did = client.post("/drones", json={"name": f"Quad {i}", "comment": "x" * 100}, headers=auth_headers).json()["id"]
+        client.post("/community/posts", json={"drone_id": did, "title": f"Post {i}"}, headers=auth_headers)
+
+
+class TestCompression:
+    """Tests para la compresión gzip/brotli"""
+
+    def test_gzip_over_threshold(self, client, auth_headers):
+        """Test que una respuesta grande se comprime con gzip y conserva el contenido"""
+        _seed_feed(client, auth_headers)
+        plain = client.get("/community/feed", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+
+        raw = client.get("/community/feed", headers={"Accept-Encoding": "gzip"})
+        assert raw.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in raw.headers["vary"]
+        assert raw.json() == plain.json()
+
+    def test_brotli_preferred(self, client, auth_headers):
+        """Test que con br aceptado se usa brotli"""
+        pytest.importorskip("brotli")
+        _seed_feed(client, auth_headers)
+        res = client.get("/community/feed", headers={"Accept-Encoding": "gzip, br"})
+        assert res.headers["content-encoding"] == "br"
+        assert res.headers["etag"].endswith('-br"')
+
+    def test_small_response_not_compressed(self, client):
+        """Test que por debajo del umbral no se comprime"""
+        res = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in res.headers
+
+    def test_choose_encoding(self):
+        """Test de la negociación Accept-Encoding"""
+        assert choose_encoding("gzip, deflate, br") == "br"
+        assert choose_encoding("br;q=0, gzip") == "gzip"
+        assert choose_encoding("identity") is None
+        assert strip_encoding_suffix('"abc-gz"') == '"abc"'
+
+    def test_streaming_compressed_in_chunks(self):
+        """Test que una respuesta en streaming se comprime por trozos"""
+        import asyncio
+
+        chunks = [b"a" * 4000, b"b" * 4000, b""]
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+            for i, c in enumerate(chunks):
+                await send({"type": "http.response.body", "body": c, "more_body": i < len(chunks) - 1})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def receive():
+            return {"type": "http.request"}
+
+        scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+        asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+
+        start, *bodies = sent
+        assert dict(start["headers"])[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in dict(start["headers"])
+        assert gzip.decompress(b"".join(m["body"] for m in bodies)) == b"a" * 4000 + b"b" * 4000
+
+
+class TestConditionalGet:
+    """Tests para ETag + If-None-Match → 304"""
+
+    def test_parse_etag_skips_payload(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que /parse responde 304 sin leer ni parsear el dump"""
+        dump = _upload(client, auth_headers, drone_id)
+        url = f"/drones/{drone_id}/dumps/{dump['id']}/parse"
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+
+        async def _no_parse(*args):
+            raise AssertionError("304 must not parse")
+
+        monkeypatch.setattr("main.parse_service.parse", _no_parse)
+        res = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert res.status_code == 304
+        assert res.headers["etag"] == etag
+
+    def test_compressed_etag_revalidates(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que el ETag con sufijo de compresión también da 304"""
+        dump = _upload(client, auth_headers, drone_id, content=b"set a = 1\n" * 500)
+        url = f"/drones/{drone_id}/dumps/{dump['id']}/parse"
+        first = client.get(url, headers={**auth_headers, "Accept-Encoding": "gzip"})
+        assert first.headers["content-encoding"] == "gzip"
+        etag = first.headers["etag"]
+        assert etag.endswith('-gz"')
+
+        res = client.get(url, headers={**auth_headers, "Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert res.status_code == 304
+        assert res.headers["etag"] == etag
+
+    def test_list_dumps_etag(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que el listado de dumps cambia de ETag al subir uno nuevo"""
+        _upload(client, auth_headers, drone_id)
+        url = f"/drones/{drone_id}/dumps"
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+        assert client.get(url, headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+
+        _upload(client, auth_headers, drone_id, content=b"set b = 2\n")
+        res = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert res.status_code == 200
+        assert len(res.json()) == 2
+
+    def test_feed_etag_changes_with_content(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que el ETag del feed cambia al editar dron, publicación o visibilidad de dumps"""
+        client.post("/community/posts", json={"drone_id": drone_id, "title": "Mine"}, headers=auth_headers)
+
+        def _etag():
+            return client.get("/community/feed").headers["etag"]
+
+        etag = _etag()
+        assert client.get("/community/feed", headers={"If-None-Match": etag}).status_code == 304
+
+        client.put(f"/drones/{drone_id}", json={"name": "Renamed"}, headers=auth_headers)
+        etag2 = _etag()
+        assert etag2 != etag
+
+        client.post("/community/posts", json={"drone_id": drone_id, "title": "Edited"}, headers=auth_headers)
+        etag3 = _etag()
+        assert etag3 != etag2
+
+        # Cambiar la visibilidad de un dump también cambia la página
+        from test_dumps import SAMPLE_DUMP
+
+        dump = client.post(
+            "/dumps",
+            data={"drone_id": str(drone_id)},
+            files={"file": ("d.txt", SAMPLE_DUMP, "text/plain")},
+            headers=auth_headers,
+        ).json()
+        client.patch(f"/community/dumps/{dump['id']}", json={"is_public": True}, headers=auth_headers)
+        assert _etag() != etag3
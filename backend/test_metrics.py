@@ -0,0 +1,127 @@
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool, SingletonThreadPool
+
+import metrics
+from test_dumps import _upload, _wait_status
+
+
+def _sample(body: str, prefix: str) -> float:
+    """Valor de la primera línea de /metrics que empieza por prefix."""
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not found")
+
+
+class TestMetricsEndpoint:
+    """Tests para GET /metrics"""
+
+    def test_route_count_and_latency(self, client):
+        """Test que se cuentan las peticiones por plantilla de ruta"""
+        before = metrics.http_requests.value(method="GET", route="/drones/{drone_id}", status="401") or 0
+        client.get("/drones/1")
+        client.get("/drones/2")
+
+        res = client.get("/metrics")
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+        body = res.text
+        assert _sample(body, 'http_requests_total{method="GET",route="/drones/{drone_id}",status="401"}') == before + 2
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/drones/{drone_id}",le="+Inf"}' in body
+        assert "/drones/1" not in body
+
+    def test_pool_metrics(self, test_engine):
+        """Test que los eventos del pool alimentan los contadores (en un registry propio)"""
+        registry = metrics.Registry()
+        metrics.instrument_engine(test_engine, "test", registry)
+        with test_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        body = registry.render()
+        assert _sample(body, 'db_pool_checkouts_total{engine="test"}') >= 1
+        assert 'db_pool_checkout_wait_seconds_count{engine="test"}' in body
+        assert 'db_pool_connection_held_seconds_count{engine="test"}' in body
+        assert "http_requests_total" not in body
+
+    def test_pool_without_size_methods(self):
+        """Test que un pool sin size()/overflow() (SingletonThreadPool con size int) no rompe el render"""
+        registry = metrics.Registry()
+        engine = create_engine("sqlite://", poolclass=SingletonThreadPool)
+        metrics.instrument_engine(engine, "memory", registry)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        body = registry.render()
+        assert _sample(body, 'db_pool_checkouts_total{engine="memory"}') == 1
+        assert 'db_pool_size{engine="memory"}' not in body
+
+    def test_pool_checkout_wait(self, tmp_path):
+        """Test que la espera mide lo que se tarda en obtener la conexión, no lo que se retiene"""
+        registry = metrics.Registry()
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1, max_overflow=0, pool_timeout=5
+        )
+        metrics.instrument_engine(engine, "test", registry)
+        wait = metrics.pool_metrics(registry).checkout_wait
+
+        def _hold():
+            with engine.connect():
+                held.set()
+                time.sleep(0.3)
+
+        held = threading.Event()
+        holder = threading.Thread(target=_hold)
+        holder.start()
+        held.wait(5)
+        with engine.connect():
+            pass
+        holder.join()
+
+        # La 2ª conexión espera a que la 1ª vuelva al pool
+        assert wait.value(engine="test")["count"] == 2
+        assert wait.value(engine="test")["sum"] >= 0.2
+
+        # dispose() crea otro pool: se sigue midiendo
+        engine.dispose()
+        with engine.connect():
+            pass
+        assert wait.value(engine="test")["count"] == 3
+
+    def test_parse_and_upload_metrics(self, client, auth_headers, dumps_dir):
+        """Test que subir y parsear un dump deja bytes y duraciones"""
+        drone_id = client.post("/drones", json={"name": "Quad"}, headers=auth_headers).json()["id"]
+        uploaded = metrics.upload_bytes.value() or 0
+        parsed = (metrics.parse_duration.value(outcome="ok") or {"count": 0})["count"]
+
+        dump = _upload(client, auth_headers, drone_id)
+        assert _wait_status(client, auth_headers, dump["id"], {"ready", "failed"})["status"] == "ready"
+
+        body = client.get("/metrics").text
+        assert _sample(body, "dump_upload_bytes_total") == uploaded + dump["bytes"]
+        assert _sample(body, 'dump_parse_duration_seconds_count{outcome="ok"}') == parsed + 1
+        assert "dump_upload_bytes_per_second_count" in body
+
+
+class TestHistogram:
+    """Tests para el formato de los histogramas"""
+
+    def test_cumulative_buckets(self):
+        """Test que los buckets son acumulativos y terminan en +Inf"""
+        h = metrics.Histogram("t_seconds", "test", ("route",), buckets=(0.1, 1.0))
+        h.observe(0.05, route="/a")
+        h.observe(0.5, route="/a")
+        h.observe(5, route="/a")
+
+        assert h.render() == [
+            "# HELP t_seconds test",
+            "# TYPE t_seconds histogram",
+            't_seconds_bucket{route="/a",le="0.1"} 1',
+            't_seconds_bucket{route="/a",le="1"} 2',
+            't_seconds_bucket{route="/a",le="+Inf"} 3',
+            't_seconds_sum{route="/a"} 5.55',
+            't_seconds_count{route="/a"} 3',
+        ]
@@ -0,0 +1,60 @@
+from sqlalchemy import create_engine, inspect, text
+
+import db
+import migrate
+
+
+class TestMigrateCli:
+    """Tests para python migrate.py"""
+
+    def test_check_then_apply(self, tmp_path, monkeypatch, capsys):
+        """Test que --check informa sin cambiar nada y sin flag se aplica"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+        monkeypatch.setattr(db, "engine", engine)
+
+        assert migrate.main(["--check"]) == 1
+        assert "create table drones" in capsys.readouterr().out
+        assert not inspect(engine).has_table("drones")
+
+        assert migrate.main([]) == 0
+        assert inspect(engine).has_table("drones")
+        assert migrate.main(["--check"]) == 0
+        engine.dispose()
+
+    def test_adds_missing_column(self, tmp_path, monkeypatch, capsys):
+        """Test que una columna nullable nueva se añade a una tabla existente"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        monkeypatch.setattr(db, "engine", engine)
+        migrate.main([])
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE drones DROP COLUMN notes"))
+
+        assert migrate.main(["--check"]) == 1
+        assert "add column drones.notes" in capsys.readouterr().out
+
+        migrate.main([])
+        cols = {c["name"] for c in inspect(engine).get_columns("drones")}
+        assert "notes" in cols
+        engine.dispose()
+
+
+class TestFastStart:
+    """Tests para el arranque sin revisar el esquema"""
+
+    def test_skip_schema_check(self, client, test_engine, monkeypatch):
+        """Test que con DB_SKIP_SCHEMA_CHECK el arranque no llama a create_tables"""
+        from fastapi.testclient import TestClient
+
+        import main
+
+        calls = []
+        monkeypatch.setattr(db, "SKIP_SCHEMA_CHECK", True)
+        monkeypatch.setattr(main, "create_tables", lambda: calls.append(1))
+        with TestClient(main.app) as c:
+            assert c.get("/health").status_code == 200
+        assert calls == []
+
+        monkeypatch.setattr(db, "SKIP_SCHEMA_CHECK", False)
+        with TestClient(main.app) as c:
+            assert c.get("/health").status_code == 200
+        assert calls == [1]
@@ -0,0 +1,55 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from security_headers import SECURITY_HEADERS, SecurityHeadersMiddleware
+
+
+class TestSecurityHeaders:
+    """Tests para las cabeceras de seguridad"""
+
+    def test_headers_on_every_response(self, client):
+        """Test que las cabeceras están en respuestas 200, 401 y 404"""
+        for path in ("/health", "/drones", "/does-not-exist"):
+            res = client.get(path)
+            for name, value in SECURITY_HEADERS.items():
+                assert res.headers[name] == value, (path, name)
+
+    def test_headers_not_duplicated(self):
+        """Test que una cabecera que ya traía la respuesta se sustituye"""
+        async def endpoint(request):
+            return PlainTextResponse("ok", headers={"X-Frame-Options": "SAMEORIGIN"})
+
+        app = SecurityHeadersMiddleware(Starlette(routes=[Route("/", endpoint)]))
+        messages = asyncio.run(_call(app))
+        headers = messages[0]["headers"]
+        assert [v for k, v in headers if k == b"x-frame-options"] == [b"DENY"]
+
+
+async def _call(app, path="/"):
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
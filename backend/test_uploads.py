@@ -0,0 +1,246 @@
+import hashlib
+import io
+import tarfile
+import zipfile
+from datetime import datetime, timedelta
+
+import anyio
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import DroneDump, DumpUpload
+from test_dumps import SAMPLE_DUMP
+
+
+@pytest.fixture
+def drone_id(client, auth_headers):
+    return client.post("/drones", json={"name": "Quad"}, headers=auth_headers).json()["id"]
+
+
+def _start(client, auth_headers, drone_id, size=len(SAMPLE_DUMP), filename="diff.txt"):
+    res = client.post(
+        "/dumps/uploads",
+        json={"drone_id": drone_id, "filename": filename, "size": size},
+        headers=auth_headers,
+    )
+    assert res.status_code == 201
+    return res.json()
+
+
+def _put(client, auth_headers, upload_id, offset, chunk, sha=None):
+    return client.put(
+        f"/dumps/uploads/{upload_id}",
+        params={"offset": offset},
+        content=chunk,
+        headers={**auth_headers, "X-Chunk-SHA256": sha or hashlib.sha256(chunk).hexdigest()},
+    )
+
+
+class TestResumableUpload:
+    """Tests para las subidas por trozos reanudables"""
+
+    def test_chunks_then_complete(self, client, auth_headers, dumps_dir, drone_id, test_engine):
+        """Test que varios trozos + complete crean el dump con el contenido entero"""
+        upload = _start(client, auth_headers, drone_id)
+        assert upload["offset"] == 0
+
+        offset = 0
+        for i in range(0, len(SAMPLE_DUMP), 100):
+            res = _put(client, auth_headers, upload["id"], offset, SAMPLE_DUMP[i:i + 100])
+            assert res.status_code == 200
+            offset = res.json()["offset"]
+            assert res.headers["upload-offset"] == str(offset)
+
+        res = client.post(
+            f"/dumps/uploads/{upload['id']}/complete",
+            json={"sha256": hashlib.sha256(SAMPLE_DUMP).hexdigest()},
+            headers=auth_headers,
+        )
+        assert res.status_code == 201
+        dump = res.json()
+        assert dump["bytes"] == len(SAMPLE_DUMP)
+        assert dump["content_sha256"] == hashlib.sha256(SAMPLE_DUMP).hexdigest()
+
+        raw = client.get(f"/drones/{drone_id}/dumps/{dump['id']}/raw", headers=auth_headers)
+        assert raw.content == SAMPLE_DUMP
+
+        with Session(test_engine) as session:
+            assert session.scalars(select(DumpUpload)).all() == []
+        assert list((dumps_dir / "tmp" / "uploads").iterdir()) == []
+
+    def test_resume_after_drop(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que tras un corte el cliente consulta el offset y sigue desde ahí"""
+        upload = _start(client, auth_headers, drone_id)
+        assert _put(client, auth_headers, upload["id"], 0, SAMPLE_DUMP[:50]).status_code == 200
+
+        # Reintento de un trozo ya confirmado: 409 con el offset bueno
+        res = _put(client, auth_headers, upload["id"], 0, SAMPLE_DUMP[:50])
+        assert res.status_code == 409
+        assert res.headers["upload-offset"] == "50"
+
+        offset = client.get(f"/dumps/uploads/{upload['id']}", headers=auth_headers).json()["offset"]
+        assert _put(client, auth_headers, upload["id"], offset, SAMPLE_DUMP[offset:]).status_code == 200
+        res = client.post(f"/dumps/uploads/{upload['id']}/complete", headers=auth_headers)
+        assert res.status_code == 201
+
+    def test_bad_checksum_discards_chunk(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que un trozo con checksum erróneo no avanza el offset"""
+        upload = _start(client, auth_headers, drone_id)
+
+        res = _put(client, auth_headers, upload["id"], 0, SAMPLE_DUMP[:50], sha="0" * 64)
+        assert res.status_code == 400
+        assert client.get(f"/dumps/uploads/{upload['id']}", headers=auth_headers).json()["offset"] == 0
+        assert [f.name for f in (dumps_dir / "tmp" / "uploads").iterdir()] == [upload["id"]]
+
+    def test_incomplete_and_oversized(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que no se completa antes de tiempo ni se pasa del tamaño anunciado"""
+        upload = _start(client, auth_headers, drone_id, size=10)
+
+        assert _put(client, auth_headers, upload["id"], 0, b"x" * 11).status_code == 413
+        assert _put(client, auth_headers, upload["id"], 0, b"x" * 5).status_code == 200
+        res = client.post(f"/dumps/uploads/{upload['id']}/complete", headers=auth_headers)
+        assert res.status_code == 409
+
+    def test_requires_owner(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que la subida de otro usuario da 404"""
+        upload = _start(client, auth_headers, drone_id)
+        creds = {"email": "other@example.com", "password": "SecurePass123"}  # pragma: allowlist secret
+        client.post("/auth/register", json=creds)
+        token = client.post("/auth/login", json=creds).json()["access_token"]
+        other = {"Authorization": f"Bearer {token}"}
+
+        assert client.get(f"/dumps/uploads/{upload['id']}", headers=other).status_code == 404
+        assert _put(client, other, upload["id"], 0, SAMPLE_DUMP).status_code == 404
+        assert client.post(
+            "/dumps/uploads", json={"drone_id": drone_id, "filename": "d.txt"}, headers=other
+        ).status_code == 404
+
+    def test_abort(self, client, auth_headers, dumps_dir, drone_id, test_engine):
+        """Test que DELETE descarta la subida y sus ficheros"""
+        upload = _start(client, auth_headers, drone_id)
+        _put(client, auth_headers, upload["id"], 0, SAMPLE_DUMP[:50])
+
+        assert client.delete(f"/dumps/uploads/{upload['id']}", headers=auth_headers).status_code == 204
+        assert client.get(f"/dumps/uploads/{upload['id']}", headers=auth_headers).status_code == 404
+        assert list((dumps_dir / "tmp" / "uploads").iterdir()) == []
+        with Session(test_engine) as session:
+            assert session.scalars(select(DroneDump)).all() == []
+
+
+class TestUploadSweep:
+    """Tests para el barrido de subidas abandonadas"""
+
+    def test_expired_sessions_removed(self, client, auth_headers, dumps_dir, drone_id, test_engine):
+        """Test que las subidas sin actividad desaparecen (fila, fichero y .part huérfanos)"""
+        import main
+
+        stale = _start(client, auth_headers, drone_id)
+        _put(client, auth_headers, stale["id"], 0, SAMPLE_DUMP[:50])
+        fresh = _start(client, auth_headers, drone_id)
+
+        later = datetime.utcnow() + timedelta(seconds=main.UPLOAD_SESSION_TTL_S + 60)
+        with Session(test_engine) as session:
+            session.get(DumpUpload, fresh["id"]).updated_at = later
+            session.commit()
+
+        uploads_dir = dumps_dir / "tmp" / "uploads"
+        orphan = uploads_dir / f"{stale['id']}.deadbeef.part"
+        orphan.write_bytes(b"x")
+        leftover = dumps_dir / "tmp" / "abc123"
+        leftover.write_bytes(b"x")
+
+        expired = anyio.run(main._sweep_expired_uploads, later)
+
+        assert expired == 1
+        with Session(test_engine) as session:
+            assert [u.id for u in session.scalars(select(DumpUpload))] == [fresh["id"]]
+        assert sorted(f.name for f in uploads_dir.iterdir()) == [fresh["id"]]
+        assert not leftover.exists()
+
+
+def _zip(entries: dict[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in entries.items():
+            zf.writestr(name, content)
+    return buf.getvalue()
+
+
+def _bulk(client, auth_headers, drone_id, archive, filename="fleet.zip"):
+    return client.post(
+        f"/drones/{drone_id}/dumps/bulk",
+        files={"file": (filename, archive, "application/octet-stream")},
+        headers=auth_headers,
+    )
+
+
+class TestBulkImport:
+    """Tests para la importación de varios dumps desde un zip/tar"""
+
+    def test_zip_report(self, client, auth_headers, dumps_dir, drone_id, test_engine):
+        """Test que se crean todos los dumps válidos y se informa de cada entrada"""
+        archive = _zip({
+            "quads/a.txt": SAMPLE_DUMP,
+            "quads/b.txt": SAMPLE_DUMP + b"set x = 1\n",
+            "notes.pdf": b"%PDF",
+            "__MACOSX/quads/._a.txt": b"meta",
+        })
+        res = _bulk(client, auth_headers, drone_id, archive)
+        assert res.status_code == 200
+        body = res.json()
+        assert (body["created"], body["failed"]) == (2, 1)
+        assert [(e["name"], e["status"]) for e in body["entries"]] == [
+            ("a.txt", "created"),
+            ("b.txt", "created"),
+            ("notes.pdf", "failed"),
+        ]
+        assert body["entries"][2]["error"] == "Unsupported file extension: .pdf"
+
+        listed = client.get(f"/drones/{drone_id}/dumps", headers=auth_headers).json()
+        assert sorted(d["original_name"] for d in listed) == ["a.txt", "b.txt"]
+        dump_id = body["entries"][0]["dump"]["id"]
+        raw = client.get(f"/drones/{drone_id}/dumps/{dump_id}/raw", headers=auth_headers)
+        assert raw.content == SAMPLE_DUMP
+        assert [f for f in (dumps_dir / "tmp").iterdir() if f.is_file()] == []
+
+    def test_tar_gz(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que también se aceptan .tar.gz"""
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+            for name in ("a.txt", "b.txt"):
+                info = tarfile.TarInfo(name)
+                info.size = len(SAMPLE_DUMP)
+                tf.addfile(info, io.BytesIO(SAMPLE_DUMP))
+
+        res = _bulk(client, auth_headers, drone_id, buf.getvalue(), filename="fleet.tar.gz")
+        assert res.status_code == 200
+        assert res.json()["created"] == 2
+
+    def test_entry_limit(self, client, auth_headers, dumps_dir, drone_id, monkeypatch):
+        """Test que una entrada demasiado grande falla sola"""
+        import main
+
+        monkeypatch.setattr(main, "MAX_DUMP_UPLOAD_BYTES", 100)
+        res = _bulk(client, auth_headers, drone_id, _zip({"big.txt": b"x" * 101, "ok.txt": b"set a = 1\n"}))
+        assert res.status_code == 200
+        assert [(e["name"], e["status"], e.get("error")) for e in res.json()["entries"]] == [
+            ("big.txt", "failed", "Dump too large"),
+            ("ok.txt", "created", None),
+        ]
+
+    def test_total_limit(self, client, auth_headers, dumps_dir, drone_id, monkeypatch, test_engine):
+        """Test que pasarse del total descomprimido rechaza el archivo entero"""
+        import main
+
+        monkeypatch.setattr(main, "MAX_BULK_DECOMPRESSED_BYTES", 150)
+        res = _bulk(client, auth_headers, drone_id, _zip({"a.txt": b"x" * 100, "b.txt": b"y" * 100}))
+        assert res.status_code == 413
+        with Session(test_engine) as session:
+            assert session.scalars(select(DroneDump)).all() == []
+        assert [f for f in (dumps_dir / "tmp").iterdir() if f.is_file()] == []
+
+    def test_invalid_archive(self, client, auth_headers, dumps_dir, drone_id):
+        """Test que un fichero que no es zip ni tar da 400"""
+        res = _bulk(client, auth_headers, drone_id, b"just text")
+        assert res.status_code == 400
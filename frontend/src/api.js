@@ -109,5 +109,24 @@ api.interceptors.response.use(
   }
 );
 
+/**
+ * GET paginado por cursor: sigue la cabecera X-Next-Cursor hasta la última página
+ * y devuelve todos los elementos concatenados.
+ */
+async function getAllPages(url, { params = {}, maxPages = 50 } = {}) {
+  const items = [];
+  let cursor = null;
+
+  for (let page = 0; page < maxPages; page += 1) {
+    const res = await api.get(url, { params: cursor ? { ...params, cursor } : params });
+    if (Array.isArray(res.data)) items.push(...res.data);
+
+    cursor = res.headers?.["x-next-cursor"] || null;
+    if (!cursor) break;
+  }
+
+  return items;
+}
+
 export default api;
-export { API_BASE, SESSION_MSG_KEY, getToken, setSessionMessage, logoutAndRedirectToLogin };
+export { API_BASE, SESSION_MSG_KEY, getToken, setSessionMessage, logoutAndRedirectToLogin, getAllPages };
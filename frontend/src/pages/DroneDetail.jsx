@@ -1,7 +1,7 @@
 // frontend/src/pages/DroneDetail.jsx
 import { useEffect, useMemo, useRef, useState, useCallback } from "react";
 import { useNavigate, useParams } from "react-router-dom";
-import api from "../api";
+import api, { getAllPages } from "../api";
 import Button from "../ui/Button";
 import Card from "../ui/Card";
 import Input from "../ui/Input";
@@ -219,8 +219,7 @@ export default function DroneDetail() {
   async function fetchDumps({ silent = false } = {}) {
     if (!silent) clearDumpMsg();
     try {
-      const res = await api.get(API_LIST_DUMPS(droneId));
-      const arr = Array.isArray(res.data) ? res.data : [];
+      const arr = await getAllPages(API_LIST_DUMPS(droneId));
       arr.sort((a, b) => {
         const ad = a?.created_at ? new Date(a.created_at).getTime() : 0;
         const bd = b?.created_at ? new Date(b.created_at).getTime() : 0;
@@ -1,7 +1,7 @@
 // frontend/src/pages/Manage.jsx
 import { useEffect, useMemo, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import api from "../api";
+import api, { getAllPages } from "../api";
 import Button from "../ui/Button";
 import Card from "../ui/Card";
 import Input from "../ui/Input";
@@ -183,8 +183,7 @@ export default function Manage() {
     setLoading(true);
     clearMsg();
     try {
-      const res = await api.get("/drones");
-      const arr = Array.isArray(res.data) ? res.data : [];
+      const arr = await getAllPages("/drones");
       arr.sort((a, b) => (b.id ?? 0) - (a.id ?? 0));
       setDrones(arr);
     } catch (err) {